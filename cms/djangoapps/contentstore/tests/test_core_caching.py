@@ -1,20 +1,42 @@
-from cache_toolbox.core import get_cached_content, set_cached_content, del_cached_content
+from datetime import datetime
+
+from cache_toolbox.core import (
+    get_cached_content, set_cached_content, del_cached_content, get_cached_content_metadata,
+    local_content_cache, LocalContentCache
+)
+from mock import patch
 from opaque_keys.edx.locations import Location
+from django.core.cache import cache
 from django.test import TestCase
+from django.test.utils import override_settings
+
+from xmodule.contentstore import django as contentstore_django
 
 
 class Content(object):
     """
     Mock cached content
     """
-    def __init__(self, location, content):
+    def __init__(self, location, content, last_modified_at=None):
         self.location = location
         self.content = content
+        self.length = len(content)
+        self.content_type = 'text/plain'
+        self.last_modified_at = last_modified_at
 
     def get_id(self):
         return self.location.to_deprecated_son()
 
 
+class NoCacheContentStore(object):
+    """
+    A content store engine which doesn't take `invalidate_cached_content`.
+    """
+    def __init__(self, host, db):
+        self.host = host
+        self.db = db
+
+
 class CachingTestCase(TestCase):
     """
     Tests for https://edx.lighthouseapp.com/projects/102637/tickets/112-updating-asset-does-not-refresh-the-cached-copy
@@ -38,3 +60,90 @@ class CachingTestCase(TestCase):
                          'should not be stored in cache with unicodeLocation')
         self.assertEqual(None, get_cached_content(self.nonUnicodeLocation),
                          'should not be stored in cache with nonUnicodeLocation')
+
+    def test_metadata(self):
+        asset = Content(self.unicodeLocation, 'my content', last_modified_at=datetime(2015, 1, 1))
+        set_cached_content(asset)
+        metadata = get_cached_content_metadata(self.nonUnicodeLocation)
+        self.assertEqual(metadata.length, len('my content'))
+        self.assertEqual(metadata.last_modified_at, asset.last_modified_at)
+        self.assertFalse(metadata.locked)
+
+        del_cached_content(self.nonUnicodeLocation)
+        self.assertIsNone(get_cached_content_metadata(self.unicodeLocation))
+
+    def test_local_cache(self):
+        asset = Content(self.unicodeLocation, 'my content', last_modified_at=datetime(2015, 1, 1))
+        set_cached_content(asset)
+        metadata = get_cached_content_metadata(self.unicodeLocation)
+
+        # Served from the local cache, even once the shared cache has dropped it
+        cache.clear()
+        self.assertIs(asset, get_cached_content(self.unicodeLocation, metadata))
+        # ... but only if the content is known to be current
+        self.assertIsNone(get_cached_content(self.unicodeLocation))
+
+        # Content changed through another process isn't served from the local cache
+        changed_asset = Content(self.unicodeLocation, 'new content', last_modified_at=datetime(2015, 1, 2))
+        cache.set(unicode(self.unicodeLocation).encode("utf-8"), changed_asset)
+        metadata.last_modified_at = changed_asset.last_modified_at
+        self.assertEqual('new content', get_cached_content(self.unicodeLocation, metadata).content)
+        self.assertEqual('new content', local_content_cache.get(unicode(self.unicodeLocation)).content)
+
+
+class LocalContentCacheTestCase(TestCase):
+    """
+    Tests for the in-process content cache.
+    """
+    def setUp(self):
+        self.cache = LocalContentCache(max_bytes=20)
+
+    def content(self, name, length):
+        """
+        Returns mock content of the given length.
+        """
+        return Content(Location('c4x', 'mitX', '800', 'run', 'asset', name), 'x' * length)
+
+    def test_lru_eviction(self):
+        self.cache.set('a', self.content('a', 8))
+        self.cache.set('b', self.content('b', 8))
+        # Using a makes b the least recently used entry
+        self.assertIsNotNone(self.cache.get('a'))
+        self.cache.set('c', self.content('c', 8))
+
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('c'))
+
+    def test_content_larger_than_budget(self):
+        self.cache.set('a', self.content('a', 8))
+        self.cache.set('b', self.content('b', 21))
+
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+
+    def test_replace_and_delete(self):
+        self.cache.set('a', self.content('a', 15))
+        self.cache.set('a', self.content('a', 10))
+        self.cache.set('b', self.content('b', 10))
+        self.assertIsNotNone(self.cache.get('a'))
+
+        self.cache.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('c', self.content('c', 10))
+        self.assertIsNotNone(self.cache.get('b'))
+
+
+class ContentstoreEngineTestCase(TestCase):
+    """
+    Tests for creating the content store engines.
+    """
+    @override_settings(CONTENTSTORE={
+        'ENGINE': 'contentstore.tests.test_core_caching.NoCacheContentStore',
+        'DOC_STORE_CONFIG': {'host': 'localhost', 'db': 'test'},
+    })
+    def test_engine_without_cache_invalidation(self):
+        with patch.dict(contentstore_django._CONTENTSTORE, clear=True):  # pylint: disable=protected-access
+            store = contentstore_django.contentstore()
+        self.assertIsInstance(store, NoCacheContentStore)
+        self.assertEqual(store.db, 'test')
@@ -255,6 +255,7 @@ if AWS_SECRET_ACCESS_KEY == "":
 DATABASES = AUTH_TOKENS['DATABASES']
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
 CONTENTSTORE = AUTH_TOKENS['CONTENTSTORE']
+SPLIT_DOCUMENT_CACHE_MAX_BYTES = ENV_TOKENS.get('SPLIT_DOCUMENT_CACHE_MAX_BYTES', SPLIT_DOCUMENT_CACHE_MAX_BYTES)
 DOC_STORE_CONFIG = AUTH_TOKENS['DOC_STORE_CONFIG']
 # Datadog for events!
 DATADOG = AUTH_TOKENS.get("DATADOG", {})
@@ -313,6 +313,10 @@ XBLOCK_SELECT_FUNCTION = prefer_xmodules
 ############################ Modulestore Configuration ################################
 MODULESTORE_BRANCH = 'draft-preferred'
 
+# Budget (in bytes of BSON) of the in-process cache of split modulestore structures and
+# definitions. The 'split_documents' cache, if defined, backs it across processes.
+SPLIT_DOCUMENT_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
 MODULESTORE = {
     'default': {
         'ENGINE': 'xmodule.modulestore.mixed.MixedModuleStore',
@@ -730,6 +734,7 @@ INSTALLED_APPS = (
     'edx_jsme',    # Molecular Structure
 
     'openedx.core.djangoapps.content.course_structures',
+    'openedx.core.djangoapps.content.course_overviews',
 )
 
 
@@ -108,6 +108,9 @@ update_module_store_settings(
     },
 )
 
+# Tests count the mongo queries made, which mustn't depend on what earlier tests have cached
+SPLIT_DOCUMENT_CACHE_MAX_BYTES = 0
+
 CONTENTSTORE = {
     'ENGINE': 'xmodule.contentstore.mongo.MongoContentStore',
     'DOC_STORE_CONFIG': {
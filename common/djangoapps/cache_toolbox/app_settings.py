@@ -6,3 +6,11 @@ CACHE_TOOLBOX_DEFAULT_TIMEOUT = getattr(
     'CACHE_TOOLBOX_DEFAULT_TIMEOUT',
     60 * 60 * 24 * 3,
 )
+
+# Maximum total length of the static content cached in each process, in
+# front of the shared cache
+CACHE_TOOLBOX_LOCAL_CONTENT_CACHE_MAX_BYTES = getattr(
+    settings,
+    'CACHE_TOOLBOX_LOCAL_CONTENT_CACHE_MAX_BYTES',
+    32 * 1024 * 1024,
+)
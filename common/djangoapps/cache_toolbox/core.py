@@ -5,12 +5,14 @@ Core methods
 .. autofunction:: cache_toolbox.core.get_instance
 .. autofunction:: cache_toolbox.core.delete_instance
 .. autofunction:: cache_toolbox.core.instance_key
+.. autofunction:: cache_toolbox.core.get_cached_content
+.. autofunction:: cache_toolbox.core.get_cached_content_metadata
 
 """
-
 from django.core.cache import cache
 from django.db import DEFAULT_DB_ALIAS
 from opaque_keys import InvalidKeyError
+from xmodule.util.lru_cache import LRUCache
 
 from . import app_settings
 
@@ -110,12 +112,110 @@ def instance_key(model, instance_or_pk):
     )
 
 
+class LocalContentCache(LRUCache):
+    """
+    An in-process LRU cache of static content, in front of the shared cache.
+
+    The cache is bounded by the total length of the content it holds,
+    `max_bytes`. Content of unknown length is not cached.
+    """
+    def __init__(self, max_bytes):
+        super(LocalContentCache, self).__init__(max_bytes, size_of=lambda content: getattr(content, 'length', None))
+
+
+local_content_cache = LocalContentCache(app_settings.CACHE_TOOLBOX_LOCAL_CONTENT_CACHE_MAX_BYTES)
+
+
+class CachedContentMetadata(object):
+    """
+    The attributes of a piece of static content that are needed to check
+    access to it and to answer conditional requests, without its data.
+    """
+    def __init__(self, location, content_type, length, last_modified_at, locked, content_digest=None):
+        self.location = location
+        self.content_type = content_type
+        self.length = length
+        self.last_modified_at = last_modified_at
+        self.locked = locked
+        self.content_digest = content_digest
+
+    @classmethod
+    def from_content(cls, content):
+        """
+        Return the metadata of the StaticContent `content`.
+        """
+        return cls(
+            content.location,
+            content.content_type,
+            content.length,
+            content.last_modified_at,
+            # getattr b/c caching may mean some pickled instances don't have attr
+            getattr(content, 'locked', False),
+            getattr(content, 'content_digest', None),
+        )
+
+
+def _content_cache_key(location):
+    """
+    Returns the shared cache key of the content at `location`.
+    """
+    return unicode(location).encode("utf-8")
+
+
+def _content_metadata_cache_key(location):
+    """
+    Returns the shared cache key of the metadata of the content at `location`.
+    """
+    return 'metadata:' + _content_cache_key(location)
+
+
 def set_cached_content(content):
-    cache.set(unicode(content.location).encode("utf-8"), content)
+    """
+    Cache `content` in the shared cache and in this process' local cache.
+    The content's metadata is cached along with it.
+    """
+    key = _content_cache_key(content.location)
+    cache.set(key, content)
+    local_content_cache.set(key, content)
+    if getattr(content, 'last_modified_at', None) is not None:
+        set_cached_content_metadata(content)
 
 
-def get_cached_content(location):
-    return cache.get(unicode(location).encode("utf-8"))
+def get_cached_content(location, metadata=None):
+    """
+    Returns the cached content at `location`, or None.
+
+    If the content's current `metadata` (see `get_cached_content_metadata`)
+    is given, this process' local cache is looked at first. Local entries are
+    only used if they were last modified at the same time as `metadata` says,
+    since content may have been changed through another process.
+    """
+    key = _content_cache_key(location)
+    if metadata is not None:
+        content = local_content_cache.get(key)
+        if content is not None and content.last_modified_at == metadata.last_modified_at:
+            return content
+
+    content = cache.get(key)
+    if content is not None and metadata is not None and content.last_modified_at == metadata.last_modified_at:
+        local_content_cache.set(key, content)
+    return content
+
+
+def set_cached_content_metadata(content):
+    """
+    Cache the metadata of `content` and return it.
+    """
+    metadata = CachedContentMetadata.from_content(content)
+    cache.set(_content_metadata_cache_key(content.location), metadata)
+    return metadata
+
+
+def get_cached_content_metadata(location):
+    """
+    Returns the cached `CachedContentMetadata` of the content at `location`, or None.
+    """
+    return cache.get(_content_metadata_cache_key(location))
 
 
 def del_cached_content(location):
@@ -123,15 +223,18 @@ def del_cached_content(location):
     delete content for the given location, as well as for content with run=None.
     it's possible that the content could have been cached without knowing the
     course_key - and so without having the run.
-    """
-    def location_str(loc):
-        return unicode(loc).encode("utf-8")
 
-    locations = [location_str(location)]
+    The content's metadata is deleted too, which invalidates the local caches
+    of other processes.
+    """
+    locations = [location]
     try:
-        locations.append(location_str(location.replace(run=None)))
+        locations.append(location.replace(run=None))
     except InvalidKeyError:
         # although deprecated keys allowed run=None, new keys don't if there is no version.
         pass
 
-    cache.delete_many(locations)
+    keys = [_content_cache_key(loc) for loc in locations]
+    for key in keys:
+        local_content_cache.delete(key)
+    cache.delete_many(keys + [_content_metadata_cache_key(loc) for loc in locations])
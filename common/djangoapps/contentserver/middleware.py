@@ -2,19 +2,25 @@
 Middleware to serve assets.
 """
 
+import calendar
 import logging
+from uuid import uuid4
 
+from django.conf import settings
 from django.http import (
     HttpResponse, HttpResponseNotModified, HttpResponseForbidden
 )
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
-from cache_toolbox.core import get_cached_content, set_cached_content
+from cache_toolbox.core import (
+    get_cached_content, set_cached_content, get_cached_content_metadata, set_cached_content_metadata
+)
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -23,6 +29,9 @@ from xmodule.exceptions import NotFoundError
 
 log = logging.getLogger(__name__)
 
+# Assets smaller than this are cached in memory after they are read from the DB
+MAX_CACHED_CONTENT_LENGTH = 1048576
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -39,30 +48,19 @@ class StaticContentServer(object):
                 response.status_code = 400
                 return response
 
-            # first look in our cache so we don't have to round-trip to the DB
-            content = get_cached_content(loc)
-            if content is None:
+            # first look in our cache so we don't have to round-trip to the DB. The content's
+            # metadata is enough to check access and to answer conditional requests.
+            content = None
+            metadata = get_cached_content_metadata(loc)
+            if metadata is None:
                 # nope, not in cache, let's fetch from DB
-                try:
-                    content = AssetManager.find(loc, as_stream=True)
-                except (ItemNotFoundError, NotFoundError):
-                    response = HttpResponse()
-                    response.status_code = 404
-                    return response
-
-                # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
-                # this is because I haven't been able to find a means to stream data out of memcached
-                if content.length is not None:
-                    if content.length < 1048576:
-                        # since we've queried as a stream, let's read in the stream into memory to set in cache
-                        content = content.copy_to_in_mem()
-                        set_cached_content(content)
-            else:
-                # NOP here, but we may wish to add a "cache-hit" counter in the future
-                pass
+                content = self.find_content(loc)
+                if content is None:
+                    return HttpResponse(status=404)
+                metadata = set_cached_content_metadata(content)
 
             # Check that user has access to content
-            if getattr(content, "locked", False):
+            if metadata.locked:
                 if not hasattr(request, "user") or not request.user.is_authenticated():
                     return HttpResponseForbidden('Unauthorized')
                 if not request.user.is_staff:
@@ -75,29 +73,37 @@ class StaticContentServer(object):
                     ):
                         return HttpResponseForbidden('Unauthorized')
 
-            # convert over the DB persistent last modified timestamp to a HTTP compatible
-            # timestamp, so we can simply compare the strings
-            last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            # see if the client has cached this content, if so then compare its
+            # validators, if they still match then just return a 304 (Not Modified)
+            # Only the content's metadata has been read so far, so this doesn't touch its data.
+            if not_modified(request, metadata):
+                return set_validators(HttpResponseNotModified(), metadata)
+
+            if content is None:
+                # look in this process' cache, then in the shared one, and finally in the DB
+                content = get_cached_content(loc, metadata)
+                if content is None:
+                    content = self.find_content(loc)
+                    if content is None:
+                        return HttpResponse(status=404)
 
-            # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
+            # this is because I haven't been able to find a means to stream data out of memcached.
+            # Larger files are streamed from the DB chunk by chunk.
+            if isinstance(content, StaticContentStream) and content.length is not None:
+                if content.length < MAX_CACHED_CONTENT_LENGTH:
+                    # since we've queried as a stream, let's read in the stream into memory to set in cache
+                    content = content.copy_to_in_mem()
+                    set_cached_content(content)
 
-            # *** File streaming within a byte range ***
+            # *** File streaming within byte ranges ***
             # If a Range is provided, parse Range attribute of the request
             # Add Content-Range in the response if Range is structurally correct
-            # Request -> Range attribute structure: "Range: bytes=first-[last]"
+            # Request -> Range attribute structure: "Range: bytes=first-[last][, first-[last]]*"
             # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
             if request.META.get('HTTP_RANGE'):
-                # Data from cache (StaticContent) has no easy byte management, so we use the DB instead (StaticContentStream)
-                if type(content) == StaticContent:
-                    content = AssetManager.find(loc, as_stream=True)
-
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -110,41 +116,158 @@ class StaticContentServer(object):
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, unicode(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
-                        log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                        )
                     else:
-                        first, last = ranges[0]
+                        # Unsatisfiable ranges are left out of the response
+                        ranges = [(first, last) for first, last in ranges if 0 <= first <= last < content.length]
 
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
+                        if not ranges:
+                            log.warning(
+                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            )
+                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                        elif len(ranges) == 1:
+                            first, last = ranges[0]
+                            response = HttpResponse(
+                                content.stream_data_in_range(first, last), content_type=content.content_type
+                            )
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
                             response['Content-Length'] = str(last - first + 1)
                             response.status_code = 206  # Partial Content
                         else:
-                            log.warning(
-                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                            )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
+                            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
+                            response = multipart_byteranges_response(content, ranges)
 
             # If Range header is absent or syntactically invalid return a full content response.
+            # The content is passed as an iterator, so that it is streamed chunk by chunk.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                response = HttpResponse(content.stream_data(), content_type=content.content_type)
                 response['Content-Length'] = content.length
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
-            response['Last-Modified'] = last_modified_at_str
 
-            return response
+            return set_validators(response, metadata)
+
+    def find_content(self, loc):
+        """
+        Returns the content at `loc` from the DB as a StaticContentStream, or None if there is none.
+        """
+        try:
+            return AssetManager.find(loc, as_stream=True)
+        except (ItemNotFoundError, NotFoundError):
+            return None
+
+
+def content_etag(metadata):
+    """
+    Returns the (strong) ETag of the content described by `metadata`, or None if
+    its digest isn't known.
+    """
+    # getattr b/c caching may mean some pickled instances don't have attr
+    content_digest = getattr(metadata, 'content_digest', None)
+    if content_digest is None:
+        return None
+    return '"{}"'.format(content_digest)
+
+
+def legacy_last_modified_str(last_modified_at):
+    """
+    Returns the Last-Modified value we used to send for content last modified at
+    `last_modified_at`. Browsers may still send it back in If-Modified-Since.
+    """
+    return last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+
+
+def not_modified(request, metadata):
+    """
+    Returns whether the copy of the content described by `metadata` that the client
+    has cached is still current, per its If-None-Match or If-Modified-Since header.
+
+    See spec for details: http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.26
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since
+        etag = content_etag(metadata)
+        if etag is None:
+            return False
+        etags = parse_etags(if_none_match)
+        return '*' in etags or etag.strip('"') in etags
+
+    if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    if if_modified_since:
+        if if_modified_since == legacy_last_modified_str(metadata.last_modified_at):
+            return True
+        if_modified_since = parse_http_date_safe(if_modified_since)
+        if if_modified_since is not None:
+            return calendar.timegm(metadata.last_modified_at.utctimetuple()) <= if_modified_since
+
+    return False
+
+
+def set_validators(response, metadata):
+    """
+    Sets the Last-Modified, ETag and Cache-Control headers of `response`, for the
+    content described by `metadata`, and returns it.
+    """
+    response['Last-Modified'] = http_date(calendar.timegm(metadata.last_modified_at.utctimetuple()))
+    etag = content_etag(metadata)
+    if etag is not None:
+        response['ETag'] = etag
+    # Locked content must not be cached by shared caches, as it depends on the user's access
+    response['Cache-Control'] = '{}, max-age={}'.format(
+        'private' if metadata.locked else 'public',
+        getattr(settings, 'STATIC_CONTENT_CACHE_MAX_AGE', 0)
+    )
+    return response
+
+
+def multipart_byteranges_response(content, ranges):
+    """
+    Returns a 206 Partial Content response with the `ranges` ((first, last)
+    tuples of satisfiable byte ranges) of `content` as a multipart/byteranges
+    message.
+
+    The parts are streamed one after the other, so the content is never held
+    in memory as a whole.
+
+    See spec for details: http://www.w3.org/Protocols/rfc2616/rfc2616-sec19.html#sec19.2
+    """
+    boundary = uuid4().hex
+    part_headers = [
+        (
+            '--{boundary}\r\n'
+            'Content-Type: {content_type}\r\n'
+            'Content-Range: bytes {first}-{last}/{length}\r\n'
+            '\r\n'
+        ).format(
+            boundary=boundary, content_type=content.content_type, first=first, last=last, length=content.length
+        ).encode('utf-8')
+        for first, last in ranges
+    ]
+    closing = '--{boundary}--\r\n'.format(boundary=boundary)
+
+    def stream_parts():
+        """
+        Yield the multipart message, part by part.
+        """
+        for part_header, (first, last) in zip(part_headers, ranges):
+            yield part_header
+            for chunk in content.stream_data_in_range(first, last):
+                yield chunk
+            yield '\r\n'
+        yield closing
+
+    response = HttpResponse(stream_parts(), content_type='multipart/byteranges; boundary={}'.format(boundary))
+    response['Content-Length'] = str(
+        sum(len(part_header) + (last - first + 1) + 2 for part_header, (first, last) in zip(part_headers, ranges)) +
+        len(closing)
+    )
+    response.status_code = 206  # Partial Content
+    return response
 
 
 def parse_range_header(header_value, content_length):
@@ -1,14 +1,17 @@
 """
 Tests for StaticContentServer
 """
+import calendar
 import copy
 import ddt
 import logging
 import unittest
+from mock import patch
 from uuid import uuid4
 
 from django.conf import settings
 from django.test.client import Client
+from django.utils.http import http_date
 from django.test.utils import override_settings
 
 from xmodule.contentstore.django import contentstore
@@ -110,6 +113,82 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         resp = self.client.get(self.url_locked)
         self.assertEqual(resp.status_code, 200)
 
+    def test_locked_asset_lock_change(self):
+        """
+        Test that changing the lock of an asset takes effect, even if the asset has been cached.
+        """
+        self.client.logout()
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+
+        self.contentstore.set_attr(self.unlocked_asset, 'locked', True)
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 403)
+
+    def test_not_modified_from_metadata(self):
+        """
+        Test that conditional requests for cached assets are answered without fetching the asset.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+
+        with patch('contentserver.middleware.AssetManager.find') as mock_find:
+            with patch('contentserver.middleware.get_cached_content') as mock_get_cached_content:
+                resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE=resp['Last-Modified'])
+        self.assertEqual(resp.status_code, 304)
+        self.assertFalse(mock_find.called)
+        self.assertFalse(mock_get_cached_content.called)
+
+    def test_etag(self):
+        """
+        Test that assets are served with their digest as ETag and that
+        If-None-Match is honored.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        etag = resp['ETag']
+        self.assertEqual(etag, '"{}"'.format(self.contentstore.get_attr(self.unlocked_asset, 'md5')))
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other", {}'.format(etag))
+        self.assertEqual(resp.status_code, 304)
+
+        # If-None-Match takes precedence over If-Modified-Since
+        resp = self.client.get(
+            self.url_unlocked, HTTP_IF_NONE_MATCH='"other"', HTTP_IF_MODIFIED_SINCE=resp['Last-Modified']
+        )
+        self.assertEqual(resp.status_code, 200)
+
+    @ddt.data(
+        (0, 304),
+        (3600, 304),
+        (-3600, 200),
+    )
+    @ddt.unpack
+    def test_if_modified_since(self, offset, expected_status_code):
+        """
+        Test that If-Modified-Since dates are compared to the asset's last modification date.
+        """
+        last_modified_at = self.contentstore.get_attr(self.unlocked_asset, 'uploadDate')
+        if_modified_since = http_date(calendar.timegm(last_modified_at.utctimetuple()) + offset)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE=if_modified_since)
+        self.assertEqual(resp.status_code, expected_status_code)
+
+    def test_cache_control(self):
+        """
+        Test that locked assets are not cached by shared caches.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertTrue(resp['Cache-Control'].startswith('public'))
+
+        self.client.login(username=self.staff_usr, password=self.staff_pwd)
+        resp = self.client.get(self.url_locked)
+        self.assertTrue(resp['Cache-Control'].startswith('private'))
+
     def test_range_request_full_file(self):
         """
         Test that a range request from byte 0 to last,
@@ -146,17 +225,42 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart/byteranges message
+        with one part per range.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
-        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -100'.format(
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -10'.format(
             first=first_byte, last=last_byte)
         )
 
-        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
         self.assertNotIn('Content-Range', resp)
-        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+        content_type, boundary = resp['Content-Type'].split('; boundary=')
+        self.assertEqual(content_type, 'multipart/byteranges')
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+
+        data = self.contentstore.find(self.unlocked_asset).data
+        parts = resp.content.split('--{}'.format(boundary))
+        self.assertEqual(parts[0], '')
+        self.assertEqual(parts[-1], '--\r\n')
+        expected_ranges = [(first_byte, last_byte), (self.length_unlocked - 10, self.length_unlocked - 1)]
+        for part, (first, last) in zip(parts[1:-1], expected_ranges):
+            headers, body = part.split('\r\n\r\n', 1)
+            self.assertIn('Content-Range: bytes {}-{}/{}'.format(first, last, self.length_unlocked), headers)
+            self.assertEqual(body, data[first:last + 1] + '\r\n')
+
+    def test_range_request_multiple_ranges_one_satisfiable(self):
+        """
+        Test that unsatisfiable ranges are left out of the response.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-9, {first}-'.format(
+            first=self.length_unlocked)
+        )
+
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertEqual(resp['Content-Range'], 'bytes 0-9/{length}'.format(length=self.length_unlocked))
+        self.assertEqual(resp['Content-Length'], '10')
 
     @ddt.data(
         'bytes 0-',
@@ -33,8 +33,8 @@ class StringListField(serializers.CharField):
 class CourseField(serializers.RelatedField):
     """Read-Only representation of course enrollment information.
 
-    Aggregates course information from the CourseDescriptor as well as the Course Modes configured
-    for enrolling in the course.
+    Aggregates course information from the CourseDescriptor (or its CourseOverview) as well as the
+    Course Modes configured for enrolling in the course.
 
     """
 
@@ -75,7 +75,8 @@ class CourseEnrollmentSerializer(serializers.ModelSerializer):
         return [enrollment for enrollment in serialized_data if enrollment.get('course_details')]
 
     def get_course_details(self, model):
-        if model.course is None:
+        course_overview = model.course_overview
+        if course_overview is None:
             msg = u"Course '{0}' does not exist (maybe deleted), in which User (user_id: '{1}') is enrolled.".format(
                 model.course_id,
                 model.user.id
@@ -84,7 +85,7 @@ class CourseEnrollmentSerializer(serializers.ModelSerializer):
             return None
 
         field = CourseField()
-        return field.to_native(model.course)
+        return field.to_native(course_overview)
 
     def get_username(self, model):
         """Retrieves the username from the associated model."""
@@ -1,5 +1,8 @@
+import hashlib
 import logging
 import re
+import threading
+import weakref
 
 from staticfiles.storage import staticfiles_storage
 from staticfiles import finders
@@ -8,9 +11,31 @@ from django.conf import settings
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.contentstore.content import StaticContent
+from xmodule.util.lru_cache import LRUCache
 
 log = logging.getLogger(__name__)
 
+# How many staticfiles lookups are kept for each staticfiles storage.
+LOOKUP_CACHE_SIZE = 5000
+
+# How many bytes (characters, for unicode) of rewritten texts `replace_static_urls`
+# keeps for each staticfiles storage.
+REWRITE_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+# The bytes counted for each cached rewrite on top of the rewritten text, so
+# that the unchanged texts, which are not kept, still count for their keys.
+REWRITE_CACHE_ENTRY_BYTES = 256
+
+# The compiled `_url_replace_regex` of each prefix.
+_URL_REPLACE_PATTERNS = {}
+
+# The _StorageCache of each staticfiles storage.
+_STORAGE_CACHES = weakref.WeakKeyDictionary()
+_STORAGE_CACHES_LOCK = threading.Lock()
+
+# Marks the cache misses of a _StorageCache.
+_MISSING = object()
+
 
 def _url_replace_regex(prefix):
     """
@@ -28,13 +53,92 @@ def _url_replace_regex(prefix):
         """.format(prefix=prefix)
 
 
+def _url_replace_pattern(prefix):
+    """
+    Return the compiled `_url_replace_regex(prefix)`.
+    """
+    pattern = _URL_REPLACE_PATTERNS.get(prefix)
+    if pattern is None:
+        pattern = _URL_REPLACE_PATTERNS[prefix] = re.compile(_url_replace_regex(prefix))
+    return pattern
+
+
+class _StorageCache(object):
+    """
+    The lookups and the rewrites made with a staticfiles storage.
+
+    The static files don't change while a process runs, except in debug mode,
+    so these are kept by the process.  They are kept for each storage, since
+    a different storage has different files.
+    """
+    def __init__(self):
+        self.lookups = LRUCache(LOOKUP_CACHE_SIZE)
+        self.rewrites = LRUCache(REWRITE_CACHE_MAX_BYTES, size_of=self._rewrite_size)
+
+    @staticmethod
+    def _rewrite_size(rewritten):
+        """
+        The bytes counted for caching `rewritten`.
+        """
+        return REWRITE_CACHE_ENTRY_BYTES + len(rewritten or '')
+
+    @classmethod
+    def current(cls):
+        """
+        Return the _StorageCache of the current `staticfiles_storage`.
+        """
+        with _STORAGE_CACHES_LOCK:
+            storage_cache = _STORAGE_CACHES.get(staticfiles_storage)
+            if storage_cache is None:
+                storage_cache = _STORAGE_CACHES[staticfiles_storage] = cls()
+        return storage_cache
+
+    def lookup(self, method_name, path):
+        """
+        Return `staticfiles_storage.<method_name>(path)`.  Errors raise here,
+        and are not cached.
+        """
+        key = (method_name, path)
+        result = self.lookups.get(key, _MISSING)
+        if result is _MISSING:
+            result = getattr(staticfiles_storage, method_name)(path)
+            self.lookups.set(key, result)
+        return result
+
+    def rewrite(self, key, text, rewrite_function):
+        """
+        Return `rewrite_function(text)`, which must only depend on `text` and
+        `key`.  The most recent rewrites are kept, up to `REWRITE_CACHE_MAX_BYTES`.
+        """
+        text_hash = hashlib.md5(text.encode('utf-8') if isinstance(text, unicode) else text).hexdigest()
+        key = (text_hash,) + key
+        rewritten = self.rewrites.get(key, _MISSING)
+        if rewritten is not _MISSING:
+            # Most texts have nothing to rewrite, None stands for the text itself.
+            return text if rewritten is None else rewritten
+
+        rewritten = rewrite_function(text)
+        self.rewrites.set(key, None if rewritten == text else rewritten)
+        return rewritten
+
+
+def _staticfiles_lookup(method_name, path):
+    """
+    Return `staticfiles_storage.<method_name>(path)`, remembered by the process
+    unless in debug mode.
+    """
+    if settings.DEBUG:
+        return getattr(staticfiles_storage, method_name)(path)
+    return _StorageCache.current().lookup(method_name, path)
+
+
 def try_staticfiles_lookup(path):
     """
     Try to lookup a path in staticfiles_storage.  If it fails, return
     a dead link instead of raising an exception.
     """
     try:
-        url = staticfiles_storage.url(path)
+        url = _staticfiles_lookup('url', path)
     except Exception as err:
         log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
             path, str(err)))
@@ -69,7 +173,7 @@ def replace_jump_to_id_urls(text, course_id, jump_to_id_base_url):
         rest = match.group('rest')
         return "".join([quote, jump_to_id_base_url + rest, quote])
 
-    return re.sub(_url_replace_regex('/jump_to_id/'), replace_jump_to_id_url, text)
+    return _url_replace_pattern('/jump_to_id/').sub(replace_jump_to_id_url, text)
 
 
 def replace_course_urls(text, course_key):
@@ -89,7 +193,7 @@ def replace_course_urls(text, course_key):
         rest = match.group('rest')
         return "".join([quote, '/courses/' + course_id + '/', rest, quote])
 
-    return re.sub(_url_replace_regex('/course/'), replace_course_url, text)
+    return _url_replace_pattern('/course/').sub(replace_course_url, text)
 
 
 def process_static_urls(text, replacement_function, data_dir=None):
@@ -108,14 +212,11 @@ def process_static_urls(text, replacement_function, data_dir=None):
         rest = match.group('rest')
         return replacement_function(original, prefix, quote, rest)
 
-    return re.sub(
-        _url_replace_regex(u'(?:{static_url}|/static/)(?!{data_dir})'.format(
-            static_url=settings.STATIC_URL,
-            data_dir=data_dir
-        )),
-        wrap_part_extraction,
-        text
-    )
+    pattern = _url_replace_pattern(u'(?:{static_url}|/static/)(?!{data_dir})'.format(
+        static_url=settings.STATIC_URL,
+        data_dir=data_dir
+    ))
+    return pattern.sub(wrap_part_extraction, text)
 
 
 def make_static_urls_absolute(request, html):
@@ -146,7 +247,16 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
     data_directory: The directory in which course data is stored
     course_id: The course identifier used to distinguish static content for this course in studio
     static_asset_path: Path for static assets, which overrides data_directory and course_namespace, if nonempty
+
+    Outside of debug mode, the rewritten texts are kept by the process, so that
+    the same text is rewritten once.
     """
+    # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
+    use_course_assets = bool(
+        not static_asset_path and
+        course_id and
+        modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml
+    )
 
     def replace_static_url(original, prefix, quote, rest):
         """
@@ -160,22 +270,19 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
         # In debug mode, if we can find the url as is,
         if settings.DEBUG and finders.find(rest, True):
             return original
-        # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
-        elif (not static_asset_path) \
-                and course_id \
-                and modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml:
+        elif use_course_assets:
             # first look in the static file pipeline and see if we are trying to reference
             # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
 
             exists_in_staticfiles_storage = False
             try:
-                exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
+                exists_in_staticfiles_storage = _staticfiles_lookup('exists', rest)
             except Exception as err:
                 log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
                     rest, str(err)))
 
             if exists_in_staticfiles_storage:
-                url = staticfiles_storage.url(rest)
+                url = _staticfiles_lookup('url', rest)
             else:
                 # if not, then assume it's courseware specific content and then look in the
                 # Mongo-backed database
@@ -185,10 +292,10 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
             course_path = "/".join((static_asset_path or data_directory, rest))
 
             try:
-                if staticfiles_storage.exists(rest):
-                    url = staticfiles_storage.url(rest)
+                if _staticfiles_lookup('exists', rest):
+                    url = _staticfiles_lookup('url', rest)
                 else:
-                    url = staticfiles_storage.url(course_path)
+                    url = _staticfiles_lookup('url', course_path)
             # And if that fails, assume that it's course content, and add manually data directory
             except Exception as err:
                 log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
@@ -197,4 +304,13 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
 
         return "".join([quote, url, quote])
 
-    return process_static_urls(text, replace_static_url, data_dir=static_asset_path or data_directory)
+    def replace_all_static_urls(text):
+        """
+        Replace all the static urls of `text`.
+        """
+        return process_static_urls(text, replace_static_url, data_dir=static_asset_path or data_directory)
+
+    if settings.DEBUG:
+        return replace_all_static_urls(text)
+    key = (data_directory, course_id, static_asset_path, use_course_assets, settings.STATIC_URL)
+    return _StorageCache.current().rewrite(key, text, replace_all_static_urls)
@@ -161,3 +161,46 @@ def test_regex():
     for s in no:
         print 'Should not match: {0!r}'.format(s)
         assert_false(re.match(regex, s))
+
+
+@patch('static_replace.staticfiles_storage')
+def test_storage_lookups_cached(mock_storage):
+    mock_storage.exists.return_value = True
+    mock_storage.url.return_value = '/static/file.abcd1234.png'
+
+    for text in (STATIC_SOURCE, "'/static/file.png'"):
+        assert_true('/static/file.abcd1234.png' in replace_static_urls(text, DATA_DIRECTORY))
+    mock_storage.exists.assert_called_once_with('file.png')
+    mock_storage.url.assert_called_once_with('file.png')
+
+
+@patch('static_replace.staticfiles_storage')
+def test_rewrites_cached(mock_storage):
+    mock_storage.exists.return_value = False
+    mock_storage.url.side_effect = lambda path: '/static/' + path
+    text = 'text <img src="/static/image.png"/>'
+
+    for __ in range(2):
+        assert_equals('text <img src="/static/data_dir/image.png"/>', replace_static_urls(text, DATA_DIRECTORY))
+    assert_equals(mock_storage.url.call_count, 1)
+
+    # The text is rewritten again for another data directory.
+    assert_equals('text <img src="/static/other_dir/image.png"/>', replace_static_urls(text, 'other_dir'))
+    assert_equals(mock_storage.url.call_count, 2)
+
+    # Text without static urls is left alone.
+    assert_equals('text', replace_static_urls('text', DATA_DIRECTORY))
+    assert_equals('text', replace_static_urls('text', DATA_DIRECTORY))
+
+
+@patch('static_replace.REWRITE_CACHE_MAX_BYTES', 300)
+@patch('static_replace.staticfiles_storage')
+def test_rewrites_cache_bounded_by_size(mock_storage):
+    mock_storage.exists.return_value = False
+    mock_storage.url.side_effect = lambda path: '/static/' + path
+    long_text = 'a long text <img src="/static/image.png"/>' + 'x' * 300
+
+    # Rewrites larger than the cache are not kept.
+    for __ in range(2):
+        replace_static_urls(long_text, DATA_DIRECTORY)
+    assert_equals(mock_storage.url.call_count, 2)
@@ -26,8 +26,10 @@ from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.core.cache import cache
 from django.db import models, IntegrityError
 from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver, Signal
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.translation import ugettext_noop
@@ -54,6 +56,19 @@ import analytics
 
 UNENROLL_DONE = Signal(providing_args=["course_enrollment", "skip_refund"])
 log = logging.getLogger(__name__)
+
+# How long (in seconds) enrollment statuses are kept in the shared cache, 0 disables it
+ENROLLMENT_STATUS_CACHE_TIMEOUT = getattr(settings, 'ENROLLMENT_STATUS_CACHE_TIMEOUT', 0)
+# How long (in seconds) the status of an enrollment isn't cached after it changes. The change is
+# only visible to other requests once its transaction commits, so until then they could cache
+# the old status; this must be longer than the transactions which change enrollments.
+ENROLLMENT_STATUS_PENDING_TIMEOUT = getattr(settings, 'ENROLLMENT_STATUS_PENDING_TIMEOUT', 60)
+# Kept in the shared cache in place of the statuses of changed enrollments, for
+# ENROLLMENT_STATUS_PENDING_TIMEOUT, so that the statuses can't be cached (see cache.add) meanwhile
+_ENROLLMENT_STATUS_PENDING = 'pending'
+# Bumped whenever this process saves or deletes an enrollment, so that the enrollment
+# statuses cached on user objects for the rest of their request are dropped
+_enrollment_status_version = 0  # pylint: disable=invalid-name
 AUDIT_LOG = logging.getLogger("audit")
 SessionStore = import_module(settings.SESSION_ENGINE).SessionStore  # pylint: disable=invalid-name
 
@@ -76,6 +91,20 @@ class AnonymousUserId(models.Model):
     unique_together = (user, course_id)
 
 
+def _anonymous_id_digest(user_id, course_id):
+    """
+    Computes the anonymous id of the user with id `user_id` in the course (or globally if
+    `course_id` is None).
+    """
+    # include the secret key as a salt, and to make the ids unique across different LMS installs.
+    hasher = hashlib.md5()
+    hasher.update(settings.SECRET_KEY)
+    hasher.update(unicode(user_id))
+    if course_id:
+        hasher.update(course_id.to_deprecated_string().encode('utf-8'))
+    return hasher.hexdigest()
+
+
 def anonymous_id_for_user(user, course_id, save=True):
     """
     Return a unique id for a (user, course) pair, suitable for inserting
@@ -94,13 +123,7 @@ def anonymous_id_for_user(user, course_id, save=True):
     if cached_id is not None:
         return cached_id
 
-    # include the secret key as a salt, and to make the ids unique across different LMS installs.
-    hasher = hashlib.md5()
-    hasher.update(settings.SECRET_KEY)
-    hasher.update(unicode(user.id))
-    if course_id:
-        hasher.update(course_id.to_deprecated_string().encode('utf-8'))
-    digest = hasher.hexdigest()
+    digest = _anonymous_id_digest(user.id, course_id)
 
     if not hasattr(user, '_anonymous_id'):
         user._anonymous_id = {}  # pylint: disable=protected-access
@@ -133,6 +156,76 @@ def anonymous_id_for_user(user, course_id, save=True):
     return digest
 
 
+def anonymous_ids_for_users(users, course_id, save=True, chunk_size=1000):
+    """
+    Return a dict of user id -> anonymous id in the course of all the given users, which
+    is the bulk version of `anonymous_id_for_user`.
+
+    The ids are also cached on the user objects, so that later `anonymous_id_for_user`
+    calls for these users and course (e.g. when rendering their modules) are free.
+
+    Keyword arguments:
+    save -- Whether the missing AnonymousUserId objects should be created, with one
+        query per `chunk_size` users plus one bulk insert.
+    """
+    anonymous_ids = {}
+    for user in users:
+        if user.is_anonymous():
+            continue
+        if not hasattr(user, '_anonymous_id'):
+            user._anonymous_id = {}  # pylint: disable=protected-access
+        cached_ids = user._anonymous_id  # pylint: disable=protected-access
+        if course_id not in cached_ids:
+            cached_ids[course_id] = _anonymous_id_digest(user.id, course_id)
+        anonymous_ids[user.id] = cached_ids[course_id]
+
+    if save is False or not anonymous_ids:
+        return anonymous_ids
+
+    user_ids = anonymous_ids.keys()
+    missing_ids = []
+    for index in xrange(0, len(user_ids), chunk_size):
+        chunk = user_ids[index:index + chunk_size]
+        stored_ids = dict(
+            AnonymousUserId.objects.filter(user_id__in=chunk, course_id=course_id).values_list(
+                'user_id', 'anonymous_user_id'
+            )
+        )
+        for user_id in chunk:
+            if user_id not in stored_ids:
+                missing_ids.append(user_id)
+            elif stored_ids[user_id] != anonymous_ids[user_id]:
+                log.error(
+                    u"Stored anonymous user id %r for user %r "
+                    u"in course %r doesn't match computed id %r",
+                    stored_ids[user_id],
+                    user_id,
+                    course_id,
+                    anonymous_ids[user_id]
+                )
+
+    for index in xrange(0, len(missing_ids), chunk_size):
+        new_ids = [
+            AnonymousUserId(user_id=user_id, course_id=course_id, anonymous_user_id=anonymous_ids[user_id])
+            for user_id in missing_ids[index:index + chunk_size]
+        ]
+        try:
+            AnonymousUserId.objects.bulk_create(new_ids)
+        except IntegrityError:
+            # Another thread has created some of these entries, create the others one by one
+            for anonymous_user_id in new_ids:
+                try:
+                    AnonymousUserId.objects.get_or_create(
+                        defaults={'anonymous_user_id': anonymous_user_id.anonymous_user_id},
+                        user_id=anonymous_user_id.user_id,
+                        course_id=course_id
+                    )
+                except IntegrityError:
+                    pass
+
+    return anonymous_ids
+
+
 def user_by_anonymous_id(uid):
     """
     Return user by anonymous_user_id using AnonymousUserId lookup table.
@@ -1029,11 +1122,8 @@ class CourseEnrollment(models.Model):
 
         `course_id` is our usual course_id string (e.g. "edX/Test101/2013_Fall)
         """
-        try:
-            record = CourseEnrollment.objects.get(user=user, course_id=course_key)
-            return record.is_active
-        except cls.DoesNotExist:
-            return False
+        __, is_active = cls._enrollment_status(user, course_key)
+        return bool(is_active)
 
     @classmethod
     def is_enrolled_by_partial(cls, user, course_id_partial):
@@ -1054,15 +1144,24 @@ class CourseEnrollment(models.Model):
         assert not course_id_partial.run  # None or empty string
         course_key = SlashSeparatedCourseKey(course_id_partial.org, course_id_partial.course, '')
         querystring = unicode(course_key.to_deprecated_string())
-        try:
-            return CourseEnrollment.objects.filter(
-                user=user,
-                course_id__startswith=querystring,
-                is_active=1
-            ).exists()
-        except cls.DoesNotExist:
+        if user.id is None:
             return False
 
+        statuses = cls._enrollment_status_request_cache(user)
+        cache_key = cls._enrollment_status_cache_key(user.id, querystring, partial=True)
+        if cache_key not in statuses:
+            is_enrolled = cache.get(cache_key) if ENROLLMENT_STATUS_CACHE_TIMEOUT else None
+            if is_enrolled is None or is_enrolled == _ENROLLMENT_STATUS_PENDING:
+                is_enrolled = CourseEnrollment.objects.filter(
+                    user=user,
+                    course_id__startswith=querystring,
+                    is_active=1
+                ).exists()
+                if ENROLLMENT_STATUS_CACHE_TIMEOUT:
+                    cache.add(cache_key, is_enrolled, ENROLLMENT_STATUS_CACHE_TIMEOUT)
+            statuses[cache_key] = is_enrolled
+        return statuses[cache_key]
+
     @classmethod
     def enrollment_mode_for_user(cls, user, course_id):
         """
@@ -1075,12 +1174,117 @@ class CourseEnrollment(models.Model):
             and is_active is whether the enrollment is active.
         Returns (None, None) if the courseenrollment record does not exist.
         """
-        try:
-            record = CourseEnrollment.objects.get(user=user, course_id=course_id)
-            return (record.mode, record.is_active)
-        except cls.DoesNotExist:
+        return cls._enrollment_status(user, course_id)
+
+    @classmethod
+    def prime_enrollment_status_cache(cls, user, course_keys):
+        """
+        Loads the user's enrollment statuses in all the given courses at once, so that the
+        subsequent is_enrolled and enrollment_mode_for_user calls for these courses during
+        this request don't query the database.
+        """
+        if user.id is None:
+            return
+
+        statuses = cls._enrollment_status_request_cache(user)
+        cache_keys = {
+            cls._enrollment_status_cache_key(user.id, course_key): course_key
+            for course_key in course_keys
+        }
+        missing_keys = set(cache_keys).difference(statuses)
+        if ENROLLMENT_STATUS_CACHE_TIMEOUT and missing_keys:
+            cached_statuses = {
+                cache_key: status
+                for cache_key, status in cache.get_many(missing_keys).iteritems()
+                if status != _ENROLLMENT_STATUS_PENDING
+            }
+            statuses.update(cached_statuses)
+            missing_keys.difference_update(cached_statuses)
+        if not missing_keys:
+            return
+
+        loaded_statuses = dict.fromkeys(missing_keys, (None, None))
+        enrollments = CourseEnrollment.objects.filter(
+            user=user,
+            course_id__in=[cache_keys[cache_key] for cache_key in missing_keys]
+        )
+        for enrollment in enrollments:
+            loaded_statuses[cls._enrollment_status_cache_key(user.id, enrollment.course_id)] = (
+                enrollment.mode, enrollment.is_active
+            )
+        statuses.update(loaded_statuses)
+        if ENROLLMENT_STATUS_CACHE_TIMEOUT:
+            for cache_key, status in loaded_statuses.iteritems():
+                cache.add(cache_key, status, ENROLLMENT_STATUS_CACHE_TIMEOUT)
+
+    @classmethod
+    def _enrollment_status(cls, user, course_key):
+        """
+        Returns the (mode, is_active) of the user's enrollment in the course, or (None, None)
+        if there is none, from the request or shared cache if possible.
+        """
+        if user.id is None:
             return (None, None)
 
+        statuses = cls._enrollment_status_request_cache(user)
+        cache_key = cls._enrollment_status_cache_key(user.id, course_key)
+        if cache_key not in statuses:
+            status = cache.get(cache_key) if ENROLLMENT_STATUS_CACHE_TIMEOUT else None
+            if status is None or status == _ENROLLMENT_STATUS_PENDING:
+                try:
+                    record = CourseEnrollment.objects.get(user=user, course_id=course_key)
+                    status = (record.mode, record.is_active)
+                except cls.DoesNotExist:
+                    status = (None, None)
+                if ENROLLMENT_STATUS_CACHE_TIMEOUT:
+                    cache.add(cache_key, status, ENROLLMENT_STATUS_CACHE_TIMEOUT)
+            statuses[cache_key] = status
+        return statuses[cache_key]
+
+    @classmethod
+    def _enrollment_status_request_cache(cls, user):
+        """
+        Returns the dict of enrollment statuses cached on the user object, which lives as
+        long as the request. It's emptied whenever this process changes an enrollment.
+        """
+        version, statuses = getattr(user, '_enrollment_statuses', (None, None))
+        if version != _enrollment_status_version:
+            statuses = {}
+            user._enrollment_statuses = (_enrollment_status_version, statuses)  # pylint: disable=protected-access
+        return statuses
+
+    @classmethod
+    def _enrollment_status_cache_key(cls, user_id, course_key, partial=False):
+        """
+        Returns the shared cache key of the user's enrollment status in the course, or of
+        whether the user is enrolled in a run of the partial course id `course_key`.
+        """
+        return u"student.enrollment_status.{}.{}{}".format(user_id, 'partial.' if partial else '', course_key)
+
+    @classmethod
+    def invalidate_enrollment_status_cache(cls, user_id, course_key):
+        """
+        Drops the cached statuses of the user's enrollment in the course.
+
+        This runs within the transaction which changes the enrollment, so the shared cache
+        keeps the statuses pending for ENROLLMENT_STATUS_PENDING_TIMEOUT rather than just
+        dropping them, to keep other requests from caching the old status meanwhile.
+        """
+        global _enrollment_status_version  # pylint: disable=global-statement, invalid-name
+        _enrollment_status_version += 1
+
+        course_id_partial = SlashSeparatedCourseKey(course_key.org, course_key.course, '')
+        cache.set_many(
+            dict.fromkeys(
+                [
+                    cls._enrollment_status_cache_key(user_id, course_key),
+                    cls._enrollment_status_cache_key(user_id, course_id_partial.to_deprecated_string(), partial=True),
+                ],
+                _ENROLLMENT_STATUS_PENDING
+            ),
+            ENROLLMENT_STATUS_PENDING_TIMEOUT
+        )
+
     @classmethod
     def enrollments_for_user(cls, user):
         return CourseEnrollment.objects.filter(user=user, is_active=1)
@@ -1166,6 +1370,19 @@ class CourseEnrollment(models.Model):
     def course(self):
         return modulestore().get_course(self.course_id)
 
+    @property
+    def course_overview(self):
+        """
+        Returns the CourseOverview of this enrollment's course, or None if the course
+        doesn't exist or doesn't load.
+        """
+        # Import here to avoid a circular import, course overviews check enrollments for access.
+        from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+        try:
+            return CourseOverview.get_from_id(self.course_id)
+        except CourseOverview.DoesNotExist:
+            return None
+
     def is_verified_enrollment(self):
         """
         Check the course enrollment mode is verified or not
@@ -1173,6 +1390,16 @@ class CourseEnrollment(models.Model):
         return CourseMode.is_verified_slug(self.mode)
 
 
+@receiver(post_save, sender=CourseEnrollment)
+@receiver(post_delete, sender=CourseEnrollment)
+def invalidate_enrollment_status(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate the cached status of an enrollment whenever it's saved (e.g. by
+    update_enrollment) or deleted.
+    """
+    CourseEnrollment.invalidate_enrollment_status_cache(instance.user_id, instance.course_id)
+
+
 class CourseEnrollmentAllowed(models.Model):
     """
     Table of users (specified by email address strings) who are allowed to enroll in a specified course.
@@ -36,7 +36,14 @@ class CertificateDisplayTest(ModuleStoreTestCase):
         self._create_certificate(enrollment_mode)
         self._check_can_download_certificate()
 
-    def _create_certificate(self, enrollment_mode):
+    def test_display_notpassing_certificate(self):
+        self._create_certificate('honor', status='notpassing', grade=0.4)
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, u'<span class="grade-value">40%</span>')
+        # the lowest passing grade of the course
+        self.assertContains(response, u'50%</span>')
+
+    def _create_certificate(self, enrollment_mode, status="downloadable", grade=0.98):
         """Simulate that the user has a generated certificate. """
         CourseEnrollmentFactory.create(user=self.user, course_id=self.course.id, mode=enrollment_mode)
         GeneratedCertificateFactory(
@@ -44,8 +51,8 @@ class CertificateDisplayTest(ModuleStoreTestCase):
             course_id=self.course.id,
             mode=enrollment_mode,
             download_url=self.DOWNLOAD_URL,
-            status="downloadable",
-            grade=0.98,
+            status=status,
+            grade=grade,
         )
 
     def _check_can_download_certificate(self):
@@ -14,6 +14,7 @@ import ddt
 from django.conf import settings
 from django.contrib.auth.models import User, AnonymousUser
 from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache as default_cache
 from django.core.urlresolvers import reverse
 from django.test import TestCase
 from django.test.client import RequestFactory, Client
@@ -21,7 +22,7 @@ from mock import Mock, patch
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
 from student.models import (
-    anonymous_id_for_user, user_by_anonymous_id, CourseEnrollment, unique_id_for_user,
+    anonymous_id_for_user, anonymous_ids_for_users, user_by_anonymous_id, CourseEnrollment, unique_id_for_user,
     LinkedInAddToProfileConfiguration
 )
 from student.views import (process_survey_link, _cert_info,
@@ -720,6 +721,88 @@ class EnrollInCourseTest(EnrollmentEventTestMixin, TestCase):
         self.assert_enrollment_mode_change_event_was_emitted(user, course_id, "honor")
 
 
+@patch('student.models.ENROLLMENT_STATUS_CACHE_TIMEOUT', 60)
+class EnrollmentStatusCacheTest(TestCase):
+    """Tests the caching of enrollment statuses."""
+
+    def setUp(self):
+        super(EnrollmentStatusCacheTest, self).setUp()
+        default_cache.clear()
+        self.user = UserFactory.create()
+        self.course_ids = [SlashSeparatedCourseKey("edX", "Test{}".format(index), "2013") for index in range(3)]
+        CourseEnrollment.enroll(self.user, self.course_ids[0], "verified")
+        CourseEnrollment.enroll(self.user, self.course_ids[1])
+        CourseEnrollment.unenroll(self.user, self.course_ids[1])
+        # As if these changes were made longer than ENROLLMENT_STATUS_PENDING_TIMEOUT ago
+        default_cache.clear()
+        self.course_id_partial = SlashSeparatedCourseKey("edX", "Test0", None)
+
+    def _fresh_user(self):
+        """Returns a new instance of the user, as the next request would get."""
+        return User.objects.get(id=self.user.id)
+
+    def test_status_cached_for_request(self):
+        user = self._fresh_user()
+        with self.assertNumQueries(1):
+            self.assertTrue(CourseEnrollment.is_enrolled(user, self.course_ids[0]))
+            self.assertEqual(CourseEnrollment.enrollment_mode_for_user(user, self.course_ids[0]), ("verified", True))
+        with self.assertNumQueries(1):
+            self.assertFalse(CourseEnrollment.is_enrolled(user, self.course_ids[2]))
+            self.assertEqual(CourseEnrollment.enrollment_mode_for_user(user, self.course_ids[2]), (None, None))
+
+    def test_status_shared_between_requests(self):
+        CourseEnrollment.is_enrolled(self._fresh_user(), self.course_ids[0])
+        CourseEnrollment.is_enrolled_by_partial(self._fresh_user(), self.course_id_partial)
+        user = self._fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(CourseEnrollment.is_enrolled(user, self.course_ids[0]))
+            self.assertTrue(CourseEnrollment.is_enrolled_by_partial(user, self.course_id_partial))
+
+    def test_status_invalidated_on_change(self):
+        user = self._fresh_user()
+        self.assertTrue(CourseEnrollment.is_enrolled(user, self.course_ids[0]))
+        self.assertTrue(CourseEnrollment.is_enrolled_by_partial(user, self.course_id_partial))
+
+        # Unenroll through another instance of the user, e.g. from another request
+        CourseEnrollment.unenroll(self._fresh_user(), self.course_ids[0])
+        for user in (user, self._fresh_user()):
+            self.assertFalse(CourseEnrollment.is_enrolled(user, self.course_ids[0]))
+            self.assertFalse(CourseEnrollment.is_enrolled_by_partial(user, self.course_id_partial))
+
+        CourseEnrollment.enroll(self._fresh_user(), self.course_ids[0], "audit")
+        self.assertEqual(CourseEnrollment.enrollment_mode_for_user(user, self.course_ids[0]), ("audit", True))
+
+    def test_status_not_cached_while_change_pending(self):
+        CourseEnrollment.unenroll(self._fresh_user(), self.course_ids[0])
+
+        # A request which read the enrollment before the change was committed can't cache its old status
+        with patch.object(CourseEnrollment.objects, 'get', return_value=Mock(mode="verified", is_active=True)):
+            self.assertTrue(CourseEnrollment.is_enrolled(self._fresh_user(), self.course_ids[0]))
+        with self.assertNumQueries(1):
+            self.assertFalse(CourseEnrollment.is_enrolled(self._fresh_user(), self.course_ids[0]))
+
+        user = self._fresh_user()
+        with self.assertNumQueries(1):
+            CourseEnrollment.prime_enrollment_status_cache(user, self.course_ids)
+            self.assertFalse(CourseEnrollment.is_enrolled(user, self.course_ids[0]))
+
+    def test_prime_enrollment_status_cache(self):
+        user = self._fresh_user()
+        with self.assertNumQueries(1):
+            CourseEnrollment.prime_enrollment_status_cache(user, self.course_ids)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [CourseEnrollment.enrollment_mode_for_user(user, course_id) for course_id in self.course_ids],
+                [("verified", True), ("honor", False), (None, None)]
+            )
+
+        # The next request gets them from the shared cache
+        user = self._fresh_user()
+        with self.assertNumQueries(0):
+            CourseEnrollment.prime_enrollment_status_cache(user, self.course_ids)
+            self.assertTrue(CourseEnrollment.is_enrolled(user, self.course_ids[0]))
+
+
 @unittest.skipUnless(settings.ROOT_URLCONF == 'lms.urls', 'Test only valid in lms')
 class ChangeEnrollmentViewTest(ModuleStoreTestCase):
     """Tests the student.views.change_enrollment view"""
@@ -869,3 +952,31 @@ class AnonymousLookupTable(ModuleStoreTestCase):
         real_user = user_by_anonymous_id(anonymous_id)
         self.assertEqual(self.user, real_user)
         self.assertEqual(anonymous_id, anonymous_id_for_user(self.user, course2.id, save=False))
+
+    def test_bulk_anonymous_ids(self):
+        users = [UserFactory() for __ in range(5)]
+        # One of the ids is already stored
+        stored_id = anonymous_id_for_user(users[0], self.course.id)
+        users = list(User.objects.filter(id__in=[user.id for user in users]))
+
+        # Two chunks of users to look up, and the four missing ids to insert
+        with self.assertNumQueries(4):
+            anonymous_ids = anonymous_ids_for_users(users + [AnonymousUser()], self.course.id, chunk_size=3)
+
+        self.assertEqual(anonymous_ids[users[0].id], stored_id)
+        for user in users:
+            self.assertEqual(user_by_anonymous_id(anonymous_ids[user.id]), user)
+            # The ids are cached on the users
+            with self.assertNumQueries(0):
+                self.assertEqual(anonymous_id_for_user(user, self.course.id), anonymous_ids[user.id])
+            self.assertEqual(
+                anonymous_ids[user.id],
+                anonymous_id_for_user(User(id=user.id), self.course.id, save=False)
+            )
+
+    def test_bulk_anonymous_ids_without_saving(self):
+        users = [UserFactory() for __ in range(3)]
+        with self.assertNumQueries(0):
+            anonymous_ids = anonymous_ids_for_users(users, None, save=False)
+        self.assertEqual(len(anonymous_ids), 3)
+        self.assertIsNone(user_by_anonymous_id(anonymous_ids[users[0].id]))
@@ -5,30 +5,52 @@ from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from opaque_keys.edx.keys import CourseKey
 from opaque_keys import InvalidKeyError
 from util.request import COURSE_REGEX
+from xmodule.util.lru_cache import LRUCache
 
 log = logging.getLogger(__name__)
 
+# The course contexts of recently tracked course ids, so that they don't have
+# to be parsed again for every request
+COURSE_CONTEXT_CACHE_SIZE = 1000
+_course_context_cache = LRUCache(COURSE_CONTEXT_CACHE_SIZE)
+
 
 def course_context_from_url(url):
     """
     Extracts the course_context from the given `url` and passes it on to
     `course_context_from_course_id()`.
+
+    The contexts of recently seen course ids are cached; a new dict is
+    returned for every call, so callers are free to modify it.
     """
     url = url or ''
 
     match = COURSE_REGEX.match(url)
+    if not match or match.group('course_id') is None:
+        return course_context_from_course_id(None)
+
+    course_id_string = match.group('course_id')
+    context = _course_context_cache.get(course_id_string)
+    if context is None:
+        context = _parse_course_context(course_id_string)
+        _course_context_cache.set(course_id_string, context)
+    return dict(context)
+
+
+def _parse_course_context(course_id_string):
+    """
+    Returns the course context of the course id string matched in a url.
+    """
     course_id = None
-    if match:
-        course_id_string = match.group('course_id')
-        try:
-            course_id = SlashSeparatedCourseKey.from_deprecated_string(course_id_string)
-        except InvalidKeyError:
-            log.warning(
-                'unable to parse course_id "{course_id}"'.format(
-                    course_id=course_id_string
-                ),
-                exc_info=True
-            )
+    try:
+        course_id = SlashSeparatedCourseKey.from_deprecated_string(course_id_string)
+    except InvalidKeyError:
+        log.warning(
+            'unable to parse course_id "{course_id}"'.format(
+                course_id=course_id_string
+            ),
+            exc_info=True
+        )
 
     return course_context_from_course_id(course_id)
 
@@ -17,6 +17,7 @@ from django.conf import settings
 
 from track import views
 from track import contexts
+from xmodule.util.lru_cache import LRUCache
 from eventtracking import tracker
 
 
@@ -34,6 +35,9 @@ META_KEY_TO_CONTEXT_KEY = {
     'HTTP_ACCEPT_LANGUAGE': 'accept_language',
 }
 
+# The encrypted keys of recently seen sessions, see `TrackMiddleware.encrypt_session_key()`
+ENCRYPTED_SESSION_KEY_CACHE_SIZE = 10000
+
 
 class TrackMiddleware(object):
     """
@@ -41,6 +45,10 @@ class TrackMiddleware(object):
     emitted events.
     """
 
+    def __init__(self):
+        self._hmac_keys = {}
+        self._encrypted_session_keys = LRUCache(ENCRYPTED_SESSION_KEY_CACHE_SIZE)
+
     def process_request(self, request):
         try:
             self.enter_request_context(request)
@@ -164,10 +172,26 @@ class TrackMiddleware(object):
             return ''
 
     def encrypt_session_key(self, session_key):
-        """Encrypts a Django session key to another 32-character hex value."""
+        """
+        Encrypts a Django session key to another 32-character hex value.
+
+        The encrypted keys of recently seen sessions are cached, since the same
+        session makes many requests.
+        """
         if not session_key:
             return ''
 
+        cache_key = (settings.SECRET_KEY, session_key)
+        encrypted_session_key = self._encrypted_session_keys.get(cache_key)
+        if encrypted_session_key is None:
+            encrypted_session_key = hmac.new(
+                self._get_hmac_key(), msg=session_key, digestmod=hashlib.md5
+            ).hexdigest()
+            self._encrypted_session_keys.set(cache_key, encrypted_session_key)
+        return encrypted_session_key
+
+    def _get_hmac_key(self):
+        """Returns the key used to encrypt session keys, derived from the SECRET_KEY setting."""
         # Follow the model of django.utils.crypto.salted_hmac() and
         # django.contrib.sessions.backends.base._hash() but use MD5
         # instead of SHA1 so that the result has the same length (32)
@@ -177,10 +201,10 @@ class TrackMiddleware(object):
         # If necessary, drop the last little bit of the hash to make it the same length.
         # Using a known-insecure hash to shorten is silly.
         # Also, why do we need same length?
-        key_salt = "common.djangoapps.track" + self.__class__.__name__
-        key = hashlib.md5(key_salt + settings.SECRET_KEY).digest()
-        encrypted_session_key = hmac.new(key, msg=session_key, digestmod=hashlib.md5).hexdigest()
-        return encrypted_session_key
+        if settings.SECRET_KEY not in self._hmac_keys:
+            key_salt = "common.djangoapps.track" + self.__class__.__name__
+            self._hmac_keys = {settings.SECRET_KEY: hashlib.md5(key_salt + settings.SECRET_KEY).digest()}
+        return self._hmac_keys[settings.SECRET_KEY]
 
     def get_user_primary_key(self, request):
         """Gets the primary key of the logged in Django user"""
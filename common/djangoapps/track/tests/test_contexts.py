@@ -2,6 +2,8 @@
 
 from unittest import TestCase
 
+from mock import patch
+
 from track import contexts
 
 
@@ -42,3 +44,31 @@ class TestContexts(TestCase):
 
     def test_no_url(self):
         self.assert_empty_context_for_url(None)
+
+    def test_cached_context(self):
+        url = 'http://foo.bar.com/courses/{course_id}/cached'.format(course_id=self.COURSE_ID)
+        contexts.course_context_from_url(url)['course_id'] = 'modified'
+
+        with patch('track.contexts.SlashSeparatedCourseKey.from_deprecated_string') as mock_from_string:
+            self.assertEquals(
+                contexts.course_context_from_url(url),
+                {
+                    'course_id': self.COURSE_ID,
+                    'org_id': self.ORG_ID
+                }
+            )
+            self.assertFalse(mock_from_string.called)
+
+    def test_cached_context_ignores_query_string(self):
+        url = 'http://foo.bar.com/courses/{course_id}/query?page={page}'
+        contexts.course_context_from_url(url.format(course_id=self.COURSE_ID, page=1))
+
+        with patch('track.contexts.SlashSeparatedCourseKey.from_deprecated_string') as mock_from_string:
+            self.assertEquals(
+                contexts.course_context_from_url(url.format(course_id=self.COURSE_ID, page=2)),
+                {
+                    'course_id': self.COURSE_ID,
+                    'org_id': self.ORG_ID
+                }
+            )
+            self.assertFalse(mock_from_string.called)
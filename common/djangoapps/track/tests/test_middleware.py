@@ -132,6 +132,16 @@ class TrackMiddlewareTestCase(TestCase):
         encrypted_session_key = self.track_middleware.encrypt_session_key(session_key)
         self.assertEquals(encrypted_session_key, expected_session_key)
 
+    def test_encrypted_session_key_cache(self):
+        session_key = '665924b49a93e22b46ee9365abf28c2a'
+        with override_settings(SECRET_KEY='85920908f28904ed733fe576320db18cabd7b6cd'):
+            first_key = self.track_middleware.encrypt_session_key(session_key)
+            self.assertEquals(self.track_middleware.encrypt_session_key(session_key), first_key)
+
+        # Changing the secret key must not return the keys encrypted with the old one
+        with override_settings(SECRET_KEY='a different secret key'):
+            self.assertNotEquals(self.track_middleware.encrypt_session_key(session_key), first_key)
+
     def test_request_headers(self):
         ip_address = '10.0.0.0'
         user_agent = 'UnitTest/1.0'
@@ -5,7 +5,8 @@ Unit tests for calc.py
 import unittest
 import numpy
 import calc
-from pyparsing import ParseException
+from mock import patch
+from pyparsing import ParseException, ParserElement, Word, nums
 
 # numpy's default behavior when it evaluates a function outside its domain
 # is to raise a warning (not an exception) which is then printed to STDOUT.
@@ -559,3 +560,61 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+    def test_parse_cache(self):
+        """
+        Check that an expression is parsed once, and evaluated with any variables
+        """
+        parsed = calc.parse_algebra_cached("x^2+f(y)")
+        self.assertIs(parsed, calc.parse_algebra_cached("x^2+f(y)"))
+        self.assertIsNot(parsed, calc.parse_algebra_cached("x^2+f(y)", case_sensitive=True))
+        self.assertEqual(parsed.variables_used, set(['x', 'y']))
+        self.assertEqual(parsed.functions_used, set(['f']))
+
+        functions = {'f': lambda x: 10 * x}
+        self.assertEqual(calc.evaluator({'x': 2, 'y': 1}, functions, "x^2+f(y)"), 14)
+        self.assertEqual(calc.evaluator({'x': 3, 'y': 2}, functions, "x^2+f(y)"), 29)
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'y'):
+            calc.evaluator({'x': 3}, functions, "x^2+f(y)")
+
+    def test_parse_cache_size(self):
+        """
+        Check that the least recently used parses are dropped from the cache
+        """
+        with patch('calc.calc.PARSE_CACHE_SIZE', 2):
+            first = calc.parse_algebra_cached("1+1")
+            second = calc.parse_algebra_cached("2+2")
+            self.assertIs(first, calc.parse_algebra_cached("1+1"))
+            calc.parse_algebra_cached("3+3")
+
+            self.assertIs(first, calc.parse_algebra_cached("1+1"))
+            self.assertIsNot(second, calc.parse_algebra_cached("2+2"))
+
+    def test_packrat_scoped_to_grammar(self):
+        """
+        Check that packrat parsing is enabled for the calc grammar only
+        """
+        self.assertEqual(calc.calc.GRAMMAR._parse, calc.calc.GRAMMAR._parseCache)
+        self.assertFalse(ParserElement._packratEnabled)
+        other_element = Word(nums)
+        self.assertEqual(other_element._parse, other_element._parseNoCache)
+
+    def test_vectorized_evaluation(self):
+        """
+        Check that evaluating with arrays of variables gives the results of
+        evaluating each of their values
+        """
+        x_values = numpy.array([0.5, 1.0, 2.5, -1.5])
+        y_values = numpy.array([1.0, 0.0, 3.0, 2.0])
+        expressions = [
+            "x^2+y", "sin(x)*cos(y)/2", "x||y", "arccot(x)", "sec(x)+coth(y+1)",
+            "x^y^2", "-x+3*y-2", "5k*x", "x*i + y", "sqrt(x)", "ln(y+1)*10%",
+        ]
+        for expression in expressions:
+            results = calc.evaluator({'x': x_values, 'y': y_values}, {}, expression)
+            for x_value, y_value, result in zip(x_values, y_values, results):
+                expected = calc.evaluator({'x': x_value, 'y': y_value}, {}, expression)
+                if numpy.isnan(expected):
+                    self.assertTrue(numpy.isnan(result), expression)
+                else:
+                    self.assertAlmostEqual(result, expected, msg=expression)
@@ -30,6 +30,7 @@ import capa.responsetypes as responsetypes
 from capa.util import contextualize_text, convert_files_to_filenames
 import capa.xqueue_interface as xqueue_interface
 from capa.safe_exec import safe_exec
+from xmodule.util.lru_cache import LRUCache
 
 
 # extra things displayed after "show answers" is pressed
@@ -58,6 +59,11 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+# How many problem templates to keep, see `LoncapaProblem._get_problem_template`.
+PROBLEM_TEMPLATE_CACHE_SIZE = 1024
+
+_PROBLEM_TEMPLATES = LRUCache(PROBLEM_TEMPLATE_CACHE_SIZE)
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -159,17 +165,15 @@ class LoncapaProblem(object):
         problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
         self.problem_text = problem_text
 
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
+        # parse problem XML file into an element tree, with the <include file="foo">
+        # tags handled and the IDs assigned, or copy it from a cached template
+        self.tree = self._get_problem_template()
 
         # construct script processor context (eg for customresponse problems)
         self.context = self._extract_context(self.tree)
 
-        # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
-        # transformations.  This also creates the dict (self.responders) of Response
+        # Pre-parse the XML tree: the responses may perform some in-place
+        # transformations.  This creates the dict (self.responders) of Response
         # instances for each question in the problem. The dict has keys = xml subtree of
         # Response, values = Response instance
         self._preprocess_problem(self.tree)
@@ -529,6 +533,38 @@ class LoncapaProblem(object):
 
     # ======= Private Methods Below ========
 
+    def _get_problem_template(self):
+        """
+        Return a copy of the parsed XML tree of the problem, with the includes
+        handled and the IDs assigned.
+
+        Every problem built from the same text and id has the same template, so
+        the last `PROBLEM_TEMPLATE_CACHE_SIZE` templates are kept, and each
+        problem gets its own copy of the tree to transform.  Problems with
+        <include> tags read files from the course, which can change under the
+        same text, so they are parsed every time.
+        """
+        if '<include' in self.problem_text:
+            return self._build_problem_template()
+
+        key = (self.problem_id, self.problem_text)
+        template = _PROBLEM_TEMPLATES.get(key)
+        if template is None:
+            # Errors raise here, and are not cached.
+            template = self._build_problem_template()
+            _PROBLEM_TEMPLATES.set(key, template)
+        return deepcopy(template)
+
+    def _build_problem_template(self):
+        """
+        Parse the problem XML, handle any <include file="foo"> tags and assign
+        the IDs, and return the tree.
+        """
+        self.tree = etree.XML(self.problem_text)
+        self._process_includes()
+        self._assign_ids(self.tree)
+        return self.tree
+
     def _process_includes(self):
         """
         Handle any <include file="foo"> tags by reading in the specified file and inserting it
@@ -777,39 +813,56 @@ class LoncapaProblem(object):
 
         return tree
 
-    def _preprocess_problem(self, tree):  # private
+    def _assign_ids(self, tree):
         """
         Assign IDs to all the responses
-        Assign sub-IDs to all entries (textline, schematic, etc.)
-        Annoted correctness and value
-        In-place transformation
-
-        Also create capa Response instances for each responsetype and save as self.responders
-
-        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        Assign sub-IDs to all entries (textline, schematic, etc.) and solutions
+        In-place transformation, which only depends on the problem text and id
         """
         response_id = 1
-        self.responders = {}
         for response in tree.xpath('//' + "|//".join(responsetypes.registry.registered_tags())):
             response_id_str = self.problem_id + "_" + str(response_id)
             # create and save ID for this response
             response.set('id', response_id_str)
             response_id += 1
 
-            answer_id = 1
-            input_tags = inputtypes.registry.registered_tags()
-            inputfields = tree.xpath(
-                "|".join(['//' + response.tag + '[@id=$id]//' + x for x in (input_tags + solution_tags)]),
-                id=response_id_str
-            )
-
             # assign one answer_id for each input type or solution type
-            for entry in inputfields:
+            answer_id = 1
+            for entry in self._get_inputfields(tree, response):
                 entry.attrib['response_id'] = str(response_id)
                 entry.attrib['answer_id'] = str(answer_id)
                 entry.attrib['id'] = "%s_%i_%i" % (self.problem_id, response_id, answer_id)
                 answer_id = answer_id + 1
 
+        # <solution>...</solution> may not be associated with any specific response; give
+        # IDs for those separately
+        # TODO: We should make the namespaces consistent and unique (e.g. %s_problem_%i).
+        solution_id = 1
+        for solution in tree.findall('.//solution'):
+            solution.attrib['id'] = "%s_solution_%i" % (self.problem_id, solution_id)
+            solution_id += 1
+
+    def _get_inputfields(self, tree, response):
+        """
+        Return the entries (input types and solutions) of `response` in `tree`.
+        """
+        input_tags = inputtypes.registry.registered_tags()
+        return tree.xpath(
+            "|".join(['//' + response.tag + '[@id=$id]//' + x for x in (input_tags + solution_tags)]),
+            id=response.get('id')
+        )
+
+    def _preprocess_problem(self, tree):  # private
+        """
+        Create capa Response instances for each responsetype and save as self.responders,
+        in the tree with the IDs assigned by _assign_ids.
+
+        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        """
+        self.responders = {}
+        for response in tree.xpath('//' + "|//".join(responsetypes.registry.registered_tags())):
+            inputfields = self._get_inputfields(tree, response)
+
             # instantiate capa Response
             responsetype_cls = responsetypes.registry.get_class_for_tag(response.tag)
             responder = responsetype_cls(response, inputfields, self.context, self.capa_system)
@@ -826,11 +879,3 @@ class LoncapaProblem(object):
                 log.debug('responder %s failed to properly return get_answers()',
                           self.responders[response])  # FIXME
                 raise
-
-        # <solution>...</solution> may not be associated with any specific response; give
-        # IDs for those separately
-        # TODO: We should make the namespaces consistent and unique (e.g. %s_problem_%i).
-        solution_id = 1
-        for solution in tree.findall('.//solution'):
-            solution.attrib['id'] = "%s_solution_%i" % (self.problem_id, solution_id)
-            solution_id += 1
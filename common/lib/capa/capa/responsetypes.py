@@ -2390,6 +2390,11 @@ class FormulaResponse(LoncapaResponse):
         """
         _ = self.capa_system.i18n.ugettext
 
+        out = self.evaluate_samples(answer, var_dict_list)
+        if out is not None:
+            return out
+
+        # Evaluate the samples one by one, to raise the appropriate error.
         out = []
         for var_dict in var_dict_list:
             try:
@@ -2441,6 +2446,36 @@ class FormulaResponse(LoncapaResponse):
                 )
         return out
 
+    def evaluate_samples(self, answer, var_dict_list):
+        """
+        Evaluates `answer` for all the test cases of `var_dict_list` at once,
+        with each variable bound to the array of its values in the test cases.
+
+        Returns the list of the results, or None if the answer can't be
+        evaluated this way (e.g. it uses `fact`), or if any result is not
+        finite. In those cases, evaluating the test cases one by one gives
+        the result or the error of each of them.
+        """
+        if not var_dict_list:
+            return []
+
+        variables = {
+            var: numpy.array([var_dict[var] for var_dict in var_dict_list])
+            for var in var_dict_list[0]
+        }
+        try:
+            with numpy.errstate(all='ignore'):
+                results = evaluator(variables, dict(), answer, case_sensitive=self.case_sensitive)
+                # The answer may not depend on all (or any) of the variables.
+                results = numpy.asarray(results) + numpy.zeros(len(var_dict_list))
+                finite = numpy.all(numpy.isfinite(results))
+        except Exception:  # pylint: disable=broad-except
+            return None
+
+        if results.shape != (len(var_dict_list),) or not finite:
+            return None
+        return list(results)
+
     def randomize_variables(self, samples):
         """
         Returns a list of dictionaries mapping variables to random values in range,
@@ -2473,8 +2508,9 @@ class FormulaResponse(LoncapaResponse):
         student_result = self.tupleize_answers(given, var_dict_list)
         instructor_result = self.tupleize_answers(expected, var_dict_list)
 
-        correct = all(compare_with_tolerance(student, instructor, self.tolerance)
-                      for student, instructor in zip(student_result, instructor_result))
+        correct = numpy.all(compare_with_tolerance(
+            numpy.array(student_result), numpy.array(instructor_result), self.tolerance
+        ))
         if correct:
             return "correct"
         else:
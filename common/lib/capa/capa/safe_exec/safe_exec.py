@@ -3,7 +3,7 @@
 from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
-from . import lazymod
+from . import lazymod, worker_pool
 from dogapi import dog_stats_api
 
 import hashlib
@@ -46,6 +46,33 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# The pool of warm sandbox workers to run the code in, see configure_worker_pool.
+WORKER_POOL = None
+
+
+def configure_worker_pool(python_bin, user=None, size=4, limits=None):
+    """
+    Run the sandboxed code in a pool of `size` warm workers (see worker_pool.py),
+    instead of a new jailed process for each execution.
+
+    `python_bin` and `user` are the sandboxed Python and the user to run it
+    as, like codejail's configuration; `limits` are codejail's limits.  If
+    `python_bin` is None, the pool isn't used anymore.
+    """
+    global WORKER_POOL  # pylint: disable=global-statement
+    if WORKER_POOL is not None:
+        WORKER_POOL.close()
+        WORKER_POOL = None
+    if python_bin is None:
+        return
+
+    cmdline = [python_bin, "-E", "-B"]
+    if user:
+        cmdline = ["sudo", "-u", user] + cmdline
+    WORKER_POOL = worker_pool.WorkerPool(
+        cmdline, size, limits, module_names=[modname for __, modname in ASSUMED_IMPORTS],
+    )
+
 
 def update_hash(hasher, obj):
     """
@@ -127,9 +154,12 @@ def safe_exec(
     # Create the complete code we'll run.
     code_prolog = CODE_PROLOG % random_seed
 
-    # Decide which code executor to use.
+    # Decide which code executor to use.  The workers can't copy files into
+    # the sandbox, so code which needs them gets a new jailed process.
     if unsafely:
         exec_fn = codejail_not_safe_exec
+    elif WORKER_POOL is not None and not python_path and not extra_files:
+        exec_fn = WORKER_POOL.safe_exec
     else:
         exec_fn = codejail_safe_exec
 
@@ -0,0 +1,139 @@
+"""A warm sandbox worker, for the worker pool in worker_pool.py.
+
+This file isn't imported: its source is run by the sandboxed Python with
+`python -c`, with the names of the modules to import up front as arguments.
+
+The worker reads jobs from stdin, one JSON object per line, with the code to
+run, its globals and the limits to run it with.  Each job is run in a process
+forked from the worker, so that it starts from the same state as every other
+job, with the modules already imported, and can't change the worker.  Note
+that the memory limit of a job (RLIMIT_AS) counts the modules imported by the
+worker, whether or not the code uses them.  The result is written to stdout
+as one JSON object per line: either the globals left by the code, or the error
+it raised.
+
+"""
+
+import json
+import os
+import random
+import resource
+import select
+import signal
+import sys
+import time
+import traceback
+
+
+def jsonable(value):
+    """Can `value` be sent back as JSON?"""
+    try:
+        json.dumps(value)
+    except Exception:  # pylint: disable=broad-except
+        return False
+    return True
+
+
+def set_limits(limits):
+    """Set the resource limits of the current process, as codejail does."""
+    if limits.get('CPU'):
+        resource.setrlimit(resource.RLIMIT_CPU, (limits['CPU'], limits['CPU']))
+    if limits.get('VMEM'):
+        resource.setrlimit(resource.RLIMIT_AS, (limits['VMEM'], limits['VMEM']))
+    # No subprocesses.
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+
+def run_in_child(job, write_fd):
+    """Run `job` in the forked process, and write its result to `write_fd`."""
+    # The output of the code mustn't mix with the results on stdout.
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    sys.stdin = sys.stdout = open(os.devnull, 'r+')
+
+    # Every job is forked with the worker's random state, so reseed it from
+    # the OS: otherwise each job would draw the same unseeded random numbers.
+    random.seed()
+    if 'numpy' in sys.modules:
+        sys.modules['numpy'].random.seed()
+
+    try:
+        set_limits(job['limits'])
+        globals_dict = job['globals']
+        exec compile(job['code'], '<jailed code>', 'exec') in globals_dict
+        result = {'globals': dict(
+            (name, value) for name, value in globals_dict.iteritems()
+            if not name.startswith('__') and jsonable(value)
+        )}
+    except BaseException:  # pylint: disable=broad-except
+        result = {'error': traceback.format_exc()}
+
+    output = json.dumps(result)
+    while output:
+        output = output[os.write(write_fd, output):]
+
+
+def run_job(job):
+    """Run `job` in a forked process, and return its result."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            run_in_child(job, write_fd)
+        finally:
+            os._exit(0)  # pylint: disable=protected-access
+
+    os.close(write_fd)
+    realtime = job['limits'].get('REALTIME')
+    deadline = time.time() + realtime if realtime else None
+    chunks = []
+    while True:
+        timeout = max(deadline - time.time(), 0) if deadline is not None else None
+        if not select.select([read_fd], [], [], timeout)[0]:
+            # Out of time.
+            os.kill(pid, signal.SIGKILL)
+            break
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(read_fd)
+
+    _, status = os.waitpid(pid, 0)
+    if status != 0:
+        if os.WIFSIGNALED(status):
+            reason = "killed by signal {}".format(os.WTERMSIG(status))
+        else:
+            reason = "exited with status {}".format(os.WEXITSTATUS(status))
+        return {'error': "Jailed code was {}".format(reason)}
+    try:
+        return json.loads("".join(chunks))
+    except ValueError:
+        return {'error': "Jailed code returned an invalid result"}
+
+
+def main(module_names):
+    """Import `module_names`, then run the jobs from stdin until it's closed."""
+    for module_name in module_names:
+        try:
+            __import__(module_name)
+        except Exception:  # pylint: disable=broad-except
+            # The code will get the error if it uses the module.
+            pass
+
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        try:
+            result = run_job(json.loads(line))
+        except Exception:  # pylint: disable=broad-except
+            result = {'error': traceback.format_exc()}
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -4,12 +4,13 @@ import hashlib
 import os
 import os.path
 import random
+import sys
 import textwrap
 import unittest
 
 from nose.plugins.skip import SkipTest
 
-from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec import safe_exec, update_hash, configure_worker_pool
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
@@ -90,6 +91,76 @@ class TestSafeOrNot(unittest.TestCase):
         self.assertEqual(g['files'], os.listdir('/'))
 
 
+class TestSafeExecWorkerPool(unittest.TestCase):
+    """Test safe_exec with a pool of local, unsandboxed, workers."""
+
+    def setUp(self):
+        super(TestSafeExecWorkerPool, self).setUp()
+        configure_worker_pool(sys.executable, size=2, limits={'CPU': 1, 'REALTIME': 2})
+        self.addCleanup(configure_worker_pool, None)
+
+    def test_set_values(self):
+        g = {'b': 3}
+        safe_exec("a = b/2", g)
+        self.assertEqual(g['a'], 1.5)
+        self.assertEqual(g['b'], 3)
+
+    def test_assumed_imports(self):
+        g = {}
+        safe_exec("a = int(math.pi)", g)
+        self.assertEqual(g['a'], 3)
+
+    def test_random_seeding(self):
+        r = random.Random(17)
+        rnums = [r.randint(0, 999) for _ in xrange(100)]
+        g = {}
+        safe_exec("rnums = [random.randint(0, 999) for _ in xrange(100)]", g, random_seed=17)
+        self.assertEqual(g['rnums'], rnums)
+
+    def test_raising_exceptions(self):
+        with self.assertRaises(SafeExecException) as cm:
+            safe_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+    def test_numpy_random_reseeded(self):
+        # The executions are forked from the same worker, but don't share its random state.
+        draws = []
+        for __ in xrange(2):
+            g = {}
+            safe_exec("rnums = list(numpy.random.randint(0, 1000000, 10))", g)
+            draws.append(g['rnums'])
+        self.assertNotEqual(draws[0], draws[1])
+
+    def test_worker_environment(self):
+        # Like codejail, the workers don't get the environment or directory of this process.
+        g = {}
+        safe_exec("import os; env = dict(os.environ); cwd = os.getcwd()", g)
+        self.assertEqual(g['env'], {})
+        self.assertNotEqual(g['cwd'], os.getcwd())
+
+    def test_executions_are_isolated(self):
+        # The changes made by an execution aren't seen by the next ones.
+        for __ in xrange(3):
+            g = {}
+            safe_exec("a = hasattr(math, 'changed'); math.changed = True", g)
+            self.assertFalse(g['a'])
+
+    def test_limits(self):
+        with self.assertRaises(SafeExecException):
+            safe_exec("while True: pass", {})
+        # The worker is still usable.
+        g = {}
+        safe_exec("a = 17", g)
+        self.assertEqual(g['a'], 17)
+
+    def test_python_lib(self):
+        # Files can't be copied into the workers, so this uses codejail.
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        g = {}
+        safe_exec("import constant; a = constant.THE_CONST", g, python_path=[pylib])
+        self.assertEqual(g['a'], 23)
+
+
 class DictCache(object):
     """A cache implementation over a simple dict, for testing."""
 
@@ -0,0 +1,179 @@
+"""A pool of warm sandbox workers for safe_exec.
+
+Most of the time codejail takes to run a problem's code goes into starting a
+jailed Python process, and importing numpy and the other sandbox packages in
+it.  A worker is a jailed Python process, started with the same command line
+as codejail's, which imports those packages once, then runs each execution in
+a process forked from itself, with codejail's resource limits (see
+sandbox_worker.py).  Each execution still starts from a pristine state.
+
+The workers of a pool are started on first use in each process, and replaced
+after `max_jobs` executions, or when anything goes wrong with them.
+
+"""
+
+import json
+import logging
+import os
+import Queue
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from codejail.safe_exec import json_safe, SafeExecException
+
+from . import sandbox_worker
+
+log = logging.getLogger(__name__)
+
+# The workers run the code of sandbox_worker.py, so read it now.
+sandbox_worker_py_file = sandbox_worker.__file__
+if sandbox_worker_py_file.endswith("c"):
+    sandbox_worker_py_file = sandbox_worker_py_file[:-1]
+
+sandbox_worker_py = open(sandbox_worker_py_file).read()
+
+# codejail's default limits, overridden by the ones the pool is created with.
+DEFAULT_LIMITS = {
+    # CPU seconds of an execution.
+    'CPU': 1,
+    # Real-time seconds of an execution.
+    'REALTIME': 1,
+    # Bytes of memory of an execution, 0 for no limit.
+    'VMEM': 0,
+}
+
+# How many seconds to wait for a worker, on top of the REALTIME limit of the
+# execution, which the worker enforces itself.
+WORKER_GRACE_TIME = 5
+
+
+class WorkerError(Exception):
+    """The worker can't be used anymore."""
+    pass
+
+
+class SandboxWorker(object):
+    """A jailed Python process running the jobs it is sent."""
+
+    def __init__(self, cmdline, module_names):
+        # Like codejail, run the worker in an empty directory the sandbox user
+        # can read, without the environment and stderr of this process.
+        self.tmpdir = tempfile.mkdtemp(prefix="codejail-worker-")
+        os.chmod(self.tmpdir, 0755)
+        with open(os.devnull, 'w') as devnull:
+            self.process = subprocess.Popen(
+                cmdline + ["-c", sandbox_worker_py] + list(module_names),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=devnull,
+                cwd=self.tmpdir,
+                env={},
+                close_fds=True,
+            )
+        self.jobs = 0
+
+    def execute(self, code, globals_dict, limits):
+        """
+        Run `code` with the JSON-safe `globals_dict` in the worker, and return
+        the result, a dict with either the resulting 'globals' or an 'error'.
+        """
+        job = json.dumps({'code': code, 'globals': globals_dict, 'limits': limits})
+        timeout = limits['REALTIME'] + WORKER_GRACE_TIME if limits.get('REALTIME') else None
+        try:
+            self.process.stdin.write(job + "\n")
+            self.process.stdin.flush()
+            if not select.select([self.process.stdout], [], [], timeout)[0]:
+                raise WorkerError("The sandbox worker timed out")
+            line = self.process.stdout.readline()
+        except (IOError, OSError) as exc:
+            raise WorkerError("The sandbox worker failed: {}".format(exc))
+        if not line:
+            raise WorkerError("The sandbox worker exited with status {}".format(self.process.poll()))
+
+        self.jobs += 1
+        return json.loads(line)
+
+    def close(self):
+        """Stop the worker."""
+        try:
+            self.process.stdin.close()
+            self.process.kill()
+        except (IOError, OSError):
+            pass
+        self.process.wait()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+class WorkerPool(object):
+    """
+    A pool of `size` SandboxWorkers started with `cmdline`, which import
+    `module_names` and run the code with `limits`.
+    """
+
+    def __init__(self, cmdline, size, limits=None, module_names=(), max_jobs=100):
+        self.cmdline = list(cmdline)
+        self.size = size
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self.module_names = list(module_names)
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._pid = None
+        self._idle_workers = None
+
+    def _idle_queue(self):
+        """
+        Return the queue of the idle workers of the current process, starting
+        them if needed: workers aren't shared with forked processes.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._idle_workers = Queue.Queue()
+                for __ in xrange(self.size):
+                    self._idle_workers.put(SandboxWorker(self.cmdline, self.module_names))
+            return self._idle_workers
+
+    def close(self):
+        """Stop the idle workers of the current process."""
+        with self._lock:
+            if self._pid == os.getpid():
+                while not self._idle_workers.empty():
+                    self._idle_workers.get_nowait().close()
+            self._pid = None
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute `code` in a worker, like codejail.safe_exec.safe_exec.
+
+        The changes to the globals are visible in `globals_dict` when this
+        function returns.  The workers can't copy files into the sandbox, so
+        `python_path` and `extra_files` aren't supported.
+        """
+        assert not python_path and not extra_files
+        idle_workers = self._idle_queue()
+        try:
+            worker = idle_workers.get_nowait()
+        except Queue.Empty:
+            # All the workers are busy, start an extra one for this execution.
+            worker = SandboxWorker(self.cmdline, self.module_names)
+
+        try:
+            result = worker.execute(code, json_safe(globals_dict), self.limits)
+        except WorkerError as exc:
+            log.warning("Sandbox worker failed running %s: %s", slug, exc)
+            worker.close()
+            raise SafeExecException("Couldn't execute jailed code: {}".format(exc))
+
+        # Workers are replaced on demand, when none is idle.
+        if worker.jobs >= self.max_jobs or idle_workers.qsize() >= self.size:
+            worker.close()
+        else:
+            idle_workers.put(worker)
+
+        if 'error' in result:
+            raise SafeExecException("Couldn't execute jailed code: {}".format(result['error']))
+        globals_dict.update(result['globals'])
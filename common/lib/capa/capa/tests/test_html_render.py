@@ -6,6 +6,7 @@ import textwrap
 import mock
 
 from .response_xml_factory import StringResponseXMLFactory, CustomResponseXMLFactory
+from capa.capa_problem import LoncapaProblem
 from . import test_capa_system, new_loncapa_problem
 
 
@@ -272,6 +273,43 @@ class CapaHtmlRenderTest(unittest.TestCase):
         the_html = problem.get_html()
         self.assertRegexpMatches(the_html, r"<div>\s+</div>")
 
+    def test_problem_template_is_shared(self):
+        xml_str = textwrap.dedent("""
+            <problem>
+            <p>A problem with a shared template</p>
+            <multiplechoiceresponse>
+              <choicegroup type="MultipleChoice" shuffle="true">
+                <choice correct="false">Apple</choice>
+                <choice correct="false">Banana</choice>
+                <choice correct="false">Chocolate</choice>
+                <choice correct ="true">Donut</choice>
+              </choicegroup>
+            </multiplechoiceresponse>
+            </problem>
+        """)
+
+        build_problem_template = LoncapaProblem._build_problem_template
+        with mock.patch.object(
+            LoncapaProblem, '_build_problem_template', autospec=True, side_effect=build_problem_template
+        ) as mock_build:
+            problems = [new_loncapa_problem(xml_str, seed=seed) for seed in (0, 1, 0)]
+        self.assertEqual(mock_build.call_count, 1)
+
+        # Each problem transforms its own copy of the tree.
+        self.assertIsNot(problems[0].tree, problems[2].tree)
+        self.assertEqual(problems[0].get_html(), problems[2].get_html())
+        self.assertNotEqual(problems[0].get_html(), problems[1].get_html())
+        self.assertEqual(problems[0].tree.find('.//choicegroup').get('id'), '1_2_1')
+
+    def test_problem_template_not_shared_with_includes(self):
+        self._create_test_file('test_include.xml', '<test>Test include</test>')
+        xml_str = '<problem><include file="test_include.xml"/></problem>'
+        new_loncapa_problem(xml_str, capa_system=self.capa_system)
+
+        self._create_test_file('test_include.xml', '<test>Changed include</test>')
+        problem = new_loncapa_problem(xml_str, capa_system=self.capa_system)
+        self.assertEqual(etree.XML(problem.get_html()).find("test").text, "Changed include")
+
     def _create_test_file(self, path, content_str):
         test_fp = self.capa_system.filestore.open(path, "w")
         test_fp.write(content_str)
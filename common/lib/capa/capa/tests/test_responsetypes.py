@@ -529,6 +529,35 @@ class FormulaResponseTest(ResponseTest):
         self.assertTrue(problem.responders.values()[0].validate_answer('14*x'))
         self.assertFalse(problem.responders.values()[0].validate_answer('3*y+2*x'))
 
+    def test_grade_samples_at_once(self):
+        """
+        Test that the samples of each formula are evaluated together.
+        """
+        sample_dict = {'x': (-10, 10), 'y': (-10, 10)}
+        problem = self.build_problem(sample_dict=sample_dict,
+                                     num_samples=20,
+                                     tolerance=0.01,
+                                     answer="x+2*y")
+
+        with mock.patch('capa.responsetypes.evaluator', wraps=calc.evaluator) as mock_evaluator:
+            self.assert_grade(problem, "2*x - x + y + y", "correct")
+        # Once for the student's formula, and once for the instructor's
+        self.assertEqual(mock_evaluator.call_count, 2)
+
+    def test_grade_factorial(self):
+        """
+        Test that formulas which can't be evaluated for all the samples at
+        once are evaluated one sample at a time.
+        """
+        sample_dict = {'x': (1, 2)}
+        problem = self.build_problem(sample_dict=sample_dict,
+                                     num_samples=10,
+                                     tolerance="1%",
+                                     answer="x")
+        input_dict = {'1_2_1': 'fact(x)'}
+        with self.assertRaisesRegexp(StudentInputError, 'factorial function not permitted'):
+            problem.grade_answers(input_dict)
+
 
 class StringResponseTest(ResponseTest):
     xml_factory_class = StringResponseXMLFactory
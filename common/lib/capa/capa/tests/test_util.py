@@ -3,6 +3,8 @@ Tests capa util
 """
 import unittest
 
+import numpy
+
 from . import test_capa_system
 from capa.util import compare_with_tolerance, sanitize_html
 
@@ -81,6 +83,15 @@ class UtilTest(unittest.TestCase):
         self.assertFalse(result)
         result = compare_with_tolerance(infinity, infinity, '1.0', False)
         self.assertTrue(result)
+        ##### Arrays of values #####
+        student = numpy.array([100.0, 109.9, 110.1, infinity, infinity])
+        instructor = numpy.array([100.0, 100.0, 100.0, 100.0, infinity])
+        result = compare_with_tolerance(student, instructor, '10%', False)
+        self.assertEqual(result.tolist(), [True, True, False, False, True])
+        result = compare_with_tolerance(student, instructor, 0.1, True)
+        self.assertEqual(result.tolist(), [True, True, True, False, True])
+        result = compare_with_tolerance(student, instructor)
+        self.assertEqual(result.tolist(), [True, False, False, False, True])
 
     def test_sanitize_html(self):
         """
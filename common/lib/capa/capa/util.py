@@ -2,6 +2,7 @@
 Utility functions for capa.
 """
 import bleach
+import numpy
 
 from calc import evaluator
 from cmath import isinf
@@ -35,6 +36,10 @@ def compare_with_tolerance(student_complex, instructor_complex, tolerance=defaul
      This is typically used internally to compare float, with a
      default_tolerance = '0.001%'.
 
+     student_complex and instructor_complex may also be numpy arrays of results,
+     e.g. of the samples of a formularesponse, which are compared elementwise
+     into an array of booleans.
+
      Default tolerance of 1e-3% is added to compare two floats for
      near-equality (to handle machine representation errors).
      Default tolerance is relative, as the acceptable difference between two
@@ -56,6 +61,17 @@ def compare_with_tolerance(student_complex, instructor_complex, tolerance=defaul
         else:
             tolerance = evaluator(dict(), dict(), tolerance)
 
+    if numpy.ndim(student_complex) or numpy.ndim(instructor_complex):
+        student_complex = numpy.asarray(student_complex)
+        instructor_complex = numpy.asarray(instructor_complex)
+        if relative_tolerance:
+            tolerance = tolerance * numpy.maximum(abs(student_complex), abs(instructor_complex))
+        with numpy.errstate(invalid='ignore'):
+            within_tolerance = abs(student_complex - instructor_complex) <= tolerance
+        # As below, infinite results are compared directly.
+        infinite = numpy.isinf(student_complex) | numpy.isinf(instructor_complex)
+        return numpy.where(infinite, student_complex == instructor_complex, within_tolerance)
+
     if relative_tolerance:
         tolerance = tolerance * max(abs(student_complex), abs(instructor_complex))
 
@@ -1,8 +1,17 @@
 from __future__ import absolute_import
 from importlib import import_module
+import inspect
 
 from django.conf import settings
 
+try:
+    # We may not always have the cache_toolbox module available
+    from cache_toolbox.core import del_cached_content
+
+    HAS_CONTENT_CACHE = True
+except ImportError:
+    HAS_CONTENT_CACHE = False
+
 _CONTENTSTORE = {}
 
 
@@ -21,6 +30,9 @@ def contentstore(name='default'):
     if name not in _CONTENTSTORE:
         class_ = load_function(settings.CONTENTSTORE['ENGINE'])
         options = {}
+        if HAS_CONTENT_CACHE and 'invalidate_cached_content' in inspect.getargspec(class_.__init__).args:
+            # drop the cached copies of assets as they're changed
+            options['invalidate_cached_content'] = del_cached_content
         options.update(settings.CONTENTSTORE['DOC_STORE_CONFIG'])
         if 'ADDITIONAL_OPTIONS' in settings.CONTENTSTORE:
             if name in settings.CONTENTSTORE['ADDITIONAL_OPTIONS']:
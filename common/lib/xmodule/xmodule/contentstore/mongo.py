@@ -1,3 +1,6 @@
+import datetime
+from multiprocessing.pool import ThreadPool
+
 import pymongo
 import gridfs
 from gridfs.errors import NoFile
@@ -12,18 +15,29 @@ from fs.osfs import OSFS
 import os
 import json
 from bson.son import SON
+from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import AssetKey
 from xmodule.modulestore.django import ASSET_IGNORE_REGEX
 
 
 class MongoContentStore(ContentStore):
 
+    # Chunks of copied files are inserted in batches of about this many bytes
+    CHUNK_BATCH_BYTES = 4 * 1024 * 1024
+    # The files documents of copied files are inserted in batches of this many documents
+    FILES_BATCH_SIZE = 100
+    # Fields of the files documents which don't change when the file is copied
+    COPIED_FILE_FIELDS = ['md5', 'length', 'contentType', 'displayname', 'thumbnail_location', 'import_path', 'locked']
+
     # pylint: disable=unused-argument
-    def __init__(self, host, db, port=27017, user=None, password=None, bucket='fs', collection=None, **kwargs):
+    def __init__(self, host, db, port=27017, user=None, password=None, bucket='fs', collection=None,
+                 invalidate_cached_content=None, **kwargs):
         """
         Establish the connection with the mongo backend and connect to the collections
 
         :param collection: ignores but provided for consistency w/ other doc_store_config patterns
+        :param invalidate_cached_content: optional function taking an AssetKey, called whenever the
+            asset at that location is changed or deleted so that cached copies of it can be dropped
         """
         logging.debug('Using MongoDB for static content serving at host={0} port={1} db={2}'.format(host, port, db))
         _db = pymongo.database.Database(
@@ -42,6 +56,8 @@ class MongoContentStore(ContentStore):
         self.fs = gridfs.GridFS(_db, bucket)
 
         self.fs_files = _db[bucket + ".files"]  # the underlying collection GridFS uses
+        self.fs_chunks = _db[bucket + ".chunks"]  # the underlying collection of the files' data
+        self.invalidate_cached_content = invalidate_cached_content
 
     def close_connections(self):
         """
@@ -63,7 +79,7 @@ class MongoContentStore(ContentStore):
         # The way to version files in gridFS is to not use the file id as the _id but just as the filename.
         # Then you can upload as many versions as you like and access by date or version. Because we use
         # the location as the _id, we must delete before adding (there's no replace method in gridFS)
-        self.delete(content_id)  # delete is a noop if the entry doesn't exist; so, don't waste time checking
+        self.fs.delete(content_id)  # delete is a noop if the entry doesn't exist; so, don't waste time checking
 
         thumbnail_location = content.thumbnail_location.to_deprecated_list_repr() if content.thumbnail_location else None
         with self.fs.new_file(_id=content_id, filename=unicode(content.location), content_type=content.content_type,
@@ -78,13 +94,41 @@ class MongoContentStore(ContentStore):
             else:
                 fp.write(content.data)
 
+        # GridFS records the md5 of the data when the file is closed
+        content.content_digest = fp.md5
+        self._invalidate_cached_content(content.location)
         return content
 
     def delete(self, location_or_id):
         if isinstance(location_or_id, AssetKey):
+            location = location_or_id
             location_or_id, _ = self.asset_db_key(location_or_id)
+        elif self.invalidate_cached_content is not None:
+            location = self._location_of(self.fs_files.find_one({'_id': location_or_id}, fields=['filename']))
+        else:
+            location = None
         # Deletes of non-existent files are considered successful
         self.fs.delete(location_or_id)
+        self._invalidate_cached_content(location)
+
+    def _location_of(self, fs_entry):
+        """
+        Returns the AssetKey of the file described by `fs_entry`, an element returned by
+        self.fs_files.find, or None if it can't be determined.
+        """
+        if fs_entry is None or 'filename' not in fs_entry:
+            return None
+        try:
+            return StaticContent.get_location_from_path(fs_entry['filename'])
+        except InvalidKeyError:
+            return None
+
+    def _invalidate_cached_content(self, location):
+        """
+        Drops the cached copies of the asset at `location` (an AssetKey or None).
+        """
+        if location is not None and self.invalidate_cached_content is not None:
+            self.invalidate_cached_content(location)
 
     def find(self, location, throw_on_not_found=True, as_stream=False):
         content_id, __ = self.asset_db_key(location)
@@ -102,7 +146,8 @@ class MongoContentStore(ContentStore):
                     location, fp.displayname, fp.content_type, fp, last_modified_at=fp.uploadDate,
                     thumbnail_location=thumbnail_location,
                     import_path=getattr(fp, 'import_path', None),
-                    length=fp.length, locked=getattr(fp, 'locked', False)
+                    length=fp.length, locked=getattr(fp, 'locked', False),
+                    content_digest=getattr(fp, 'md5', None)
                 )
             else:
                 with self.fs.get(content_id) as fp:
@@ -116,7 +161,8 @@ class MongoContentStore(ContentStore):
                         location, fp.displayname, fp.content_type, fp.read(), last_modified_at=fp.uploadDate,
                         thumbnail_location=thumbnail_location,
                         import_path=getattr(fp, 'import_path', None),
-                        length=fp.length, locked=getattr(fp, 'locked', False)
+                        length=fp.length, locked=getattr(fp, 'locked', False),
+                        content_digest=getattr(fp, 'md5', None)
                     )
         except NoFile:
             if throw_on_not_found:
@@ -193,6 +239,7 @@ class MongoContentStore(ContentStore):
             assets_to_delete = assets_to_delete + items.count()
             for asset in items:
                 self.fs.delete(asset[prefix])
+                self._invalidate_cached_content(self._location_of(asset))
 
             self.fs_files.remove(query)
         return assets_to_delete
@@ -278,6 +325,8 @@ class MongoContentStore(ContentStore):
         result = self.fs_files.update({'_id': asset_db_key}, {"$set": attr_dict}, upsert=False)
         if not result.get('updatedExisting', True):
             raise NotFoundError(asset_db_key)
+        # cached copies may have a stale lock state
+        self._invalidate_cached_content(location)
 
     def get_attrs(self, location):
         """
@@ -295,44 +344,114 @@ class MongoContentStore(ContentStore):
             raise NotFoundError(asset_db_key)
         return item
 
-    def copy_all_course_assets(self, source_course_key, dest_course_key):
+    def get_all_content_summaries_for_course(self, course_key):
+        """
+        See :meth:`.ContentStore.get_all_content_summaries_for_course`
+        """
+        fields = ['filename'] + self.COPIED_FILE_FIELDS
+        return {
+            asset['filename']: asset
+            for asset in self.fs_files.find(query_for_course(course_key), fields=fields)
+            if 'filename' in asset
+        }
+
+    def copy_all_course_assets(self, source_course_key, dest_course_key, max_workers=4):
         """
         See :meth:`.ContentStore.copy_all_course_assets`
 
-        This implementation fairly expensively copies all of the data
+        The data is copied on the db, chunk by chunk, without reading whole files into memory;
+        up to `max_workers` files are copied concurrently. Assets which already exist in the
+        destination course with the same data and attributes (e.g. on a re-run) are left as
+        they are.
         """
-        source_query = query_for_course(source_course_key)
-        # it'd be great to figure out how to do all of this on the db server and not pull the bits over
-        for asset in self.fs_files.find(source_query):
-            asset_key = self.make_id_son(asset)
-            # don't convert from string until fs access
-            source_content = self.fs.get(asset_key)
-            if isinstance(asset_key, basestring):
-                asset_key = AssetKey.from_string(asset_key)
-                __, asset_key = self.asset_db_key(asset_key)
-            asset_key['org'] = dest_course_key.org
-            asset_key['course'] = dest_course_key.course
-            if getattr(dest_course_key, 'deprecated', False):  # remove the run if exists
-                if 'run' in asset_key:
-                    del asset_key['run']
-                asset_id = asset_key
-            else:  # add the run, since it's the last field, we're golden
-                asset_key['run'] = dest_course_key.run
-                asset_id = unicode(
-                    dest_course_key.make_asset_key(asset_key['category'], asset_key['name']).for_branch(None)
-                )
+        def dest_files():
+            """
+            Yield the (source _id, destination files document) of every asset to copy.
+            """
+            for asset in self.fs_files.find(query_for_course(source_course_key)):
+                source_id = self.make_id_son(asset)
+                # don't convert from string until fs access
+                if isinstance(source_id, basestring):
+                    __, asset_key = self.asset_db_key(AssetKey.from_string(source_id))
+                else:
+                    asset_key = SON(source_id)
+                asset_key['org'] = dest_course_key.org
+                asset_key['course'] = dest_course_key.course
+                dest_asset_key = dest_course_key.make_asset_key(asset_key['category'], asset_key['name'])
+                if getattr(dest_course_key, 'deprecated', False):  # remove the run if exists
+                    if 'run' in asset_key:
+                        del asset_key['run']
+                    asset_id = asset_key
+                else:  # add the run, since it's the last field, we're golden
+                    asset_key['run'] = dest_course_key.run
+                    asset_id = unicode(dest_asset_key.for_branch(None))
 
-            self.fs.put(
-                source_content.read(),
-                _id=asset_id, filename=asset['filename'], content_type=asset['contentType'],
-                displayname=asset['displayname'], content_son=asset_key,
                 # thumbnail is not technically correct but will be functionally correct as the code
                 # only looks at the name which is not course relative.
-                thumbnail_location=asset['thumbnail_location'],
-                import_path=asset['import_path'],
-                # getattr b/c caching may mean some pickled instances don't have attr
-                locked=asset.get('locked', False)
-            )
+                dest_file = dict(asset)
+                dest_file.update({
+                    '_id': asset_id,
+                    'filename': unicode(dest_asset_key),
+                    'content_son': asset_key,
+                    'uploadDate': datetime.datetime.utcnow(),
+                    'locked': asset.get('locked', False),
+                })
+                yield source_id, dest_file
+
+        pool = ThreadPool(max_workers)
+        try:
+            files_batch = []
+            for dest_file in pool.imap_unordered(self._copy_file_data, dest_files()):
+                if dest_file is None:
+                    continue
+                files_batch.append(dest_file)
+                if len(files_batch) >= self.FILES_BATCH_SIZE:
+                    self._insert_copied_files(files_batch)
+                    files_batch = []
+            if files_batch:
+                self._insert_copied_files(files_batch)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _copy_file_data(self, source_id_and_dest_file):
+        """
+        Given a (source_id, dest_file) tuple, copy the chunks of the file `source_id` to the
+        file described by `dest_file` and return `dest_file`, or return None if that file
+        already exists with the same data and attributes.
+
+        The files document itself isn't inserted, so the copy isn't visible until it is.
+        """
+        source_id, dest_file = source_id_and_dest_file
+        existing_file = self.fs_files.find_one({'_id': dest_file['_id']})
+        if existing_file is not None:
+            if all(existing_file.get(field) == dest_file.get(field) for field in self.COPIED_FILE_FIELDS):
+                return None
+            self.fs.delete(dest_file['_id'])
+        else:
+            # drop the chunks left by an earlier copy which failed before its files document was inserted
+            self.fs_chunks.remove({'files_id': dest_file['_id']})
+
+        chunks_batch = []
+        batch_bytes = 0
+        for chunk in self.fs_chunks.find({'files_id': source_id}, sort=[('n', pymongo.ASCENDING)]):
+            chunks_batch.append({'files_id': dest_file['_id'], 'n': chunk['n'], 'data': chunk['data']})
+            batch_bytes += len(chunk['data'])
+            if batch_bytes >= self.CHUNK_BATCH_BYTES:
+                self.fs_chunks.insert(chunks_batch)
+                chunks_batch = []
+                batch_bytes = 0
+        if chunks_batch:
+            self.fs_chunks.insert(chunks_batch)
+        return dest_file
+
+    def _insert_copied_files(self, files):
+        """
+        Insert the files documents of copied files, making them visible.
+        """
+        self.fs_files.insert(files)
+        for dest_file in files:
+            self._invalidate_cached_content(self._location_of(dest_file))
 
     def delete_all_course_assets(self, course_key):
         """
@@ -345,6 +464,7 @@ class MongoContentStore(ContentStore):
         for asset in matching_assets:
             asset_key = self.make_id_son(asset)
             self.fs.delete(asset_key)
+            self._invalidate_cached_content(self._location_of(asset))
 
     # codifying the original order which pymongo used for the dicts coming out of location_to_dict
     # stability of order is more important than sanity of order as any changes to order make things
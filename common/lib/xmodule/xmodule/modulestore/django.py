@@ -23,6 +23,8 @@ import django.utils
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.draft_and_published import BranchSettingMixin
 from xmodule.modulestore.mixed import MixedModuleStore
+from xmodule.modulestore.split_mongo.mongo_connection import DocumentCache
+from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.util.django import get_current_request_hostname
 import xblock.reference.plugins
 
@@ -47,6 +49,11 @@ except ImportError:
 log = logging.getLogger(__name__)
 ASSET_IGNORE_REGEX = getattr(settings, "ASSET_IGNORE_REGEX", r"(^\._.*$)|(^\.DS_Store$)|(^.*~$)")
 
+# Split structures and definitions never change once written, so all the split modulestores
+# of the process share one cache of them. It's disabled unless given a budget.
+SPLIT_DOCUMENT_CACHE_MAX_BYTES = getattr(settings, "SPLIT_DOCUMENT_CACHE_MAX_BYTES", 0)
+_SPLIT_DOCUMENT_CACHE = DocumentCache(SPLIT_DOCUMENT_CACHE_MAX_BYTES) if SPLIT_DOCUMENT_CACHE_MAX_BYTES else None
+
 
 class SignalHandler(object):
     """
@@ -80,9 +87,11 @@ class SignalHandler(object):
 
     """
     course_published = django.dispatch.Signal(providing_args=["course_key"])
+    course_deleted = django.dispatch.Signal(providing_args=["course_key"])
 
     _mapping = {
-        "course_published": course_published
+        "course_published": course_published,
+        "course_deleted": course_deleted,
     }
 
     def __init__(self, modulestore_class):
@@ -146,6 +155,13 @@ def create_modulestore_instance(
     if issubclass(class_, MixedModuleStore):
         _options['create_modulestore_instance'] = create_modulestore_instance
 
+    if issubclass(class_, SplitMongoModuleStore) and _SPLIT_DOCUMENT_CACHE is not None:
+        _options['document_cache'] = _SPLIT_DOCUMENT_CACHE
+        try:
+            _options['document_cache_subsystem'] = get_cache('split_documents')
+        except InvalidCacheBackendError:
+            pass
+
     if issubclass(class_, BranchSettingMixin):
         _options['branch_setting_func'] = _get_modulestore_branch_setting
 
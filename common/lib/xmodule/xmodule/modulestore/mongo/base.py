@@ -13,9 +13,9 @@ structure:
 """
 
 import pymongo
+import random
 import sys
 import logging
-import copy
 import re
 from uuid import uuid4
 
@@ -28,6 +28,7 @@ from pytz import UTC
 from contracts import contract, new_contract
 
 from importlib import import_module
+from itertools import chain
 from opaque_keys.edx.keys import UsageKey, CourseKey, AssetKey
 from opaque_keys.edx.locations import Location, BlockUsageLocator
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
@@ -187,7 +188,7 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         default_class: The default_class to use when loading an
             XModuleDescriptor from the module_data
 
-        cached_metadata: the cache for handling inheritance computation. internal use only
+        cached_metadata: the MetadataInheritanceTree for handling inheritance computation. internal use only
 
         resources_fs: a filesystem, as per MakoDescriptorSystem
 
@@ -243,7 +244,8 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                 parent = None
                 if self.cached_metadata is not None:
                     # fish the parent out of here if it's available
-                    parent_url = self.cached_metadata.get(unicode(location), {}).get('parent', {}).get(
+                    parent_url = self.cached_metadata.get_parent(
+                        unicode(location),
                         ModuleStoreEnum.Branch.published_only if location.revision is None
                         else ModuleStoreEnum.Branch.draft_preferred
                     )
@@ -509,6 +511,142 @@ class ParentLocationCache(dict):
             del self[key]
 
 
+class MetadataInheritanceTree(object):
+    """
+    The inheritable metadata of a course's containers, for internal use.
+
+    Only each container's own inheritable metadata and children, and the parent of each block are
+    stored. The metadata a block inherits is merged down from the course root on first lookup and
+    shared with every descendant which doesn't override any of it, so that neither computing nor
+    patching the tree copies metadata down the whole course.
+    """
+    def __init__(self, branch=None):
+        # the branch setting the tree was computed for
+        self.branch = branch
+        self.root = None
+        # container url -> {revision: (its own inheritable metadata, [child urls])}
+        self.containers = {}
+        # block url -> parent container url
+        self.parents = {}
+        # block url -> the metadata it passes down to its children, or None if it's not in the course tree
+        self._inherited = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_inherited'] = {}
+        return state
+
+    def keys(self):
+        return self.parents.keys()
+
+    def _own_metadata(self, url):
+        """
+        Returns the inheritable metadata set on the container `url`, preferring its draft revision
+        """
+        revisions = self.containers.get(url, {})
+        for revision in (MongoRevisionKey.draft, MongoRevisionKey.published):
+            if revision in revisions:
+                return revisions[revision][0]
+        return None
+
+    def _children(self, url):
+        """
+        Returns the urls of the children of all revisions of the container `url`
+        """
+        return set(chain.from_iterable(children for __, children in self.containers.get(url, {}).itervalues()))
+
+    def _set_revision(self, url, revision, value):
+        """
+        Set (or remove if value is None) the (metadata, children) of the given revision of the container `url`.
+
+        Returns whether that changed what any block inherits or which parent it has.
+        """
+        old_metadata = self._own_metadata(url)
+        old_children = self._children(url)
+        revisions = self.containers.setdefault(url, {})
+        if value is None:
+            revisions.pop(revision, None)
+            if not revisions:
+                del self.containers[url]
+        else:
+            revisions[revision] = value
+        new_children = self._children(url)
+
+        changed = self._own_metadata(url) != old_metadata
+        for child in old_children - new_children:
+            if self.parents.get(child) == url:
+                del self.parents[child]
+                changed = True
+        for child in new_children - old_children:
+            self.parents[child] = url
+            changed = True
+
+        if changed:
+            self._inherited = {}
+        return changed
+
+    def update_container(self, url, revision, metadata, children, is_root=False):
+        """
+        Record the inheritable metadata and the children of the given revision of the container `url`.
+
+        Returns whether that changed what any block inherits or which parent it has.
+        """
+        changed = self._set_revision(url, revision, (metadata, children))
+        if is_root and self.root != url:
+            self.root = url
+            self._inherited = {}
+            changed = True
+        return changed
+
+    def remove_container(self, url, revision):
+        """
+        Forget the given revision of the container `url`.
+
+        Returns whether that changed what any block inherits or which parent it has.
+        """
+        return self._set_revision(url, revision, None)
+
+    def _inherited_by(self, url):
+        """
+        Returns the metadata the block `url` passes down to its children, or None if it isn't in the course tree
+        """
+        lineage = []
+        inherited = None
+        current = url
+        while current is not None and current not in lineage:
+            if current in self._inherited:
+                inherited = self._inherited[current]
+                break
+            lineage.append(current)
+            if current == self.root:
+                inherited = {}
+                break
+            current = self.parents.get(current)
+
+        for ancestor in reversed(lineage):
+            own_metadata = self._own_metadata(ancestor)
+            if inherited is not None and own_metadata:
+                inherited = inherited.copy()
+                inherited.update(own_metadata)
+            self._inherited[ancestor] = inherited
+        return inherited
+
+    def get(self, url, default=None):
+        """
+        Returns the metadata inherited by the block `url`, which must not be modified
+        """
+        inherited = None if url == self.root else self._inherited_by(url)
+        return default if inherited is None else inherited
+
+    def get_parent(self, url, branch):
+        """
+        Returns the url of the parent of the block `url` if the tree was computed for `branch`
+        """
+        if branch != self.branch or url == self.root or self._inherited_by(url) is None:
+            return None
+        return self.parents.get(url)
+
+
 class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, MongoBulkOpsMixin):
     """
     A Mongodb backed ModuleStore
@@ -684,67 +822,32 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         # it's ok to keep these as deprecated strings b/c the overall cache is indexed by course_key and this
         # is a dictionary relative to that course
-        results_by_url = {}
-        root = None
+        tree = MetadataInheritanceTree(self.get_branch_setting())
 
-        # now go through the results and order them by the location url
+        # now go through the results and record them by the location url
         for result in resultset:
             # manually pick it apart b/c the db has tag and we want as_published revision regardless
             location = as_published(Location._from_deprecated_son(result['_id'], course_id.run))
 
-            location_url = unicode(location)
-            if location_url in results_by_url:
-                # found either draft or live to complement the other revision
-                # FIXME this is wrong. If the child was moved in draft from one parent to the other, it will
-                # show up under both in this logic: https://openedx.atlassian.net/browse/TNL-1075
-                existing_children = results_by_url[location_url].get('definition', {}).get('children', [])
-                additional_children = result.get('definition', {}).get('children', [])
-                total_children = existing_children + additional_children
-                # use set to get rid of duplicates. We don't care about order; so, it shouldn't matter.
-                results_by_url[location_url].setdefault('definition', {})['children'] = set(total_children)
-            else:
-                results_by_url[location_url] = result
-            if location.category == 'course':
-                root = location_url
-
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
-
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata.copy()
-                # WARNING: 'parent' is not part of inherited metadata, but
-                # we're piggybacking on this recursive traversal to grab
-                # and cache the child's parent, as a performance optimization.
-                # The 'parent' key will be popped out of the dictionary during
-                # CachingDescriptorSystem.load_item
-                metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
-
-        if root is not None:
-            _compute_inherited_metadata(root)
+            # the draft and live revisions of a container complement each other's children
+            # FIXME this is wrong. If the child was moved in draft from one parent to the other, it will
+            # show up under both in this logic: https://openedx.atlassian.net/browse/TNL-1075
+            tree.update_container(
+                unicode(location),
+                result['_id'].get('revision'),
+                result.get('metadata', {}),
+                result.get('definition', {}).get('children', []),
+                is_root=location.category == 'course',
+            )
 
-        return metadata_to_inherit
+        return tree
 
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
         Compute the metadata inheritance for the course.
         '''
-        tree = {}
+        tree = None
+        version = None
 
         course_id = self.fill_in_run(course_id)
         if not force_refresh:
@@ -754,24 +857,41 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
             # then look in any caching subsystem (e.g. memcached)
             if self.metadata_inheritance_cache_subsystem is not None:
-                tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
+                version = self._metadata_inheritance_tree_version(course_id)
+                tree = self.metadata_inheritance_cache_subsystem.get(
+                    self._metadata_inheritance_tree_key(course_id, version)
+                )
             else:
                 logging.warning(
                     'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
                     OK in localdev and testing environment. Not OK in production.'
                 )
+        elif self.metadata_inheritance_cache_subsystem is not None:
+            # bump the version before computing, so that the computed tree holds every change
+            # made up to that version
+            version = self._bump_metadata_inheritance_tree_version(course_id)
 
-        if not tree:
+        if not isinstance(tree, MetadataInheritanceTree):
             # if not in subsystem, or we are on force refresh, then we have to compute
             tree = self._compute_metadata_inheritance_tree(course_id)
 
             # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+            if self.metadata_inheritance_cache_subsystem is not None and version is not None:
+                self.metadata_inheritance_cache_subsystem.set(
+                    self._metadata_inheritance_tree_key(course_id, version), tree
+                )
 
         # now populate a request_cache, if available. NOTE, we are outside of the
         # scope of the above if: statement so that after a memcache hit, it'll get
         # put into the request_cache
+        self._request_cache_metadata_inheritance_tree(course_id, tree)
+
+        return tree
+
+    def _request_cache_metadata_inheritance_tree(self, course_id, tree):
+        """
+        Put the metadata inheritance tree of the course into the request_cache, if available
+        """
         if self.request_cache is not None:
             # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
             # defined
@@ -779,20 +899,117 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 self.request_cache.data['metadata_inheritance'] = {}
             self.request_cache.data['metadata_inheritance'][unicode(course_id)] = tree
 
+    @staticmethod
+    def _metadata_inheritance_tree_key(course_id, version):
+        """
+        The key of the given version of the course's tree in the metadata_inheritance_cache_subsystem
+        """
+        return u'{}@{}'.format(course_id, version)
+
+    def _metadata_inheritance_tree_version(self, course_id):
+        """
+        Return the current version of the course's tree in the metadata_inheritance_cache_subsystem.
+
+        Every write to the course that changes its tree bumps the version after it is persisted, so
+        the tree cached for a version holds every change made up to that version, and is never
+        overwritten by one missing any of them.
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        version_key = u'{}@version'.format(course_id)
+        # start from a random version rather than 0, so that if the version is evicted the trees
+        # still cached for the earlier versions aren't picked up again
+        cache.add(version_key, random.getrandbits(48))
+        return cache.get(version_key)
+
+    def _bump_metadata_inheritance_tree_version(self, course_id):
+        """
+        Atomically increment and return the version of the course's tree in the
+        metadata_inheritance_cache_subsystem, or None if the version was evicted meanwhile.
+        """
+        self._metadata_inheritance_tree_version(course_id)
+        try:
+            return self.metadata_inheritance_cache_subsystem.incr(u'{}@version'.format(course_id))
+        except ValueError:
+            return None
+
+    def _patch_cached_metadata_inheritance_tree(self, course_id, updated_xblock=None, deleted_locations=()):
+        """
+        Patch the cached metadata inheritance tree for the course with the inheritable metadata and
+        children just persisted for updated_xblock and the containers just deleted, rather than
+        recomputing it for the whole course.
+
+        Returns the patched tree, or None if there isn't a cached tree computed for the current
+        branch setting to patch, or if another process changed the cached tree meanwhile.
+        """
+        course_id = self.fill_in_run(course_id)
+        # prefer the shared copy so that edits made by other processes since this request cached
+        # the tree aren't dropped
+        if self.metadata_inheritance_cache_subsystem is not None:
+            version = self._metadata_inheritance_tree_version(course_id)
+            tree = self.metadata_inheritance_cache_subsystem.get(
+                self._metadata_inheritance_tree_key(course_id, version)
+            )
+        elif self.request_cache is not None:
+            tree = self.request_cache.data.get('metadata_inheritance', {}).get(unicode(course_id))
+        else:
+            tree = None
+        if not isinstance(tree, MetadataInheritanceTree) or tree.branch != self.get_branch_setting():
+            return None
+
+        # leaves don't pass anything down, the tree only changes with the containers
+        changed = False
+        if updated_xblock is not None and updated_xblock.location.category in BLOCK_TYPES_WITH_CHILDREN:
+            location = updated_xblock.scope_ids.usage_id
+            metadata = {
+                field_name: value
+                for field_name, value in self._serialize_scope(updated_xblock, Scope.settings).iteritems()
+                if field_name in InheritanceMixin.fields
+            }
+            children = [unicode(child) for child in updated_xblock.children] if updated_xblock.has_children else []
+            changed = tree.update_container(
+                unicode(as_published(location)),
+                location.revision,
+                metadata,
+                children,
+                is_root=location.category == 'course',
+            )
+        for location in deleted_locations:
+            if location.category in BLOCK_TYPES_WITH_CHILDREN:
+                changed = tree.remove_container(unicode(as_published(location)), location.revision) or changed
+
+        if changed and self.metadata_inheritance_cache_subsystem is not None:
+            # only write the patched tree back if no other process bumped the version since it was
+            # read, otherwise it would be missing their change: recompute it instead
+            if self._bump_metadata_inheritance_tree_version(course_id) != version + 1:
+                return None
+            self.metadata_inheritance_cache_subsystem.set(
+                self._metadata_inheritance_tree_key(course_id, version + 1), tree
+            )
+        self._request_cache_metadata_inheritance_tree(course_id, tree)
         return tree
 
-    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
+    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None, updated_xblock=None,
+                                                 deleted_locations=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
         for location
 
+        If told which xblock was just persisted or which locations were just deleted, the cached tree
+        is patched for those changes if possible instead of being recomputed.
+
         If given a runtime, it replaces the cached_metadata in that runtime. NOTE: failure to provide
         a runtime may mean that some objects report old values for inherited data.
         """
         course_id = course_id.for_branch(None)
         if not self._is_in_bulk_operation(course_id):
             # below is done for side effects when runtime is None
-            cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
+            cached_metadata = None
+            if updated_xblock is not None or deleted_locations:
+                cached_metadata = self._patch_cached_metadata_inheritance_tree(
+                    course_id, updated_xblock, deleted_locations or ()
+                )
+            if cached_metadata is None:
+                cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
@@ -885,7 +1102,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         root = self.fs_root / data_dir
         resource_fs = _OSFS_INSTANCE.setdefault(root, OSFS(root, create=True))
 
-        cached_metadata = {}
+        cached_metadata = MetadataInheritanceTree()
         if apply_cached_metadata:
             cached_metadata = self._get_cached_metadata_inheritance_tree(course_key)
 
@@ -916,7 +1133,8 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         else:
             system = using_descriptor_system
             system.module_data.update(data_cache)
-            system.cached_metadata.update(cached_metadata)
+            if apply_cached_metadata:
+                system.cached_metadata = cached_metadata
 
         return system.load_item(location)
 
@@ -1254,7 +1472,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 resources_fs=None,
                 error_tracker=self.error_tracker,
                 render_template=self.render_template,
-                cached_metadata={},
+                cached_metadata=MetadataInheritanceTree(),
                 mixins=self.xblock_mixins,
                 select=self.xblock_select,
                 services=services,
@@ -1439,7 +1657,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             xblock._edit_info = payload['edit_info']
 
             # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            self.refresh_cached_metadata_inheritance_tree(
+                xblock.scope_ids.usage_id.course_key, xblock.runtime, updated_xblock=xblock
+            )
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
@@ -604,9 +604,12 @@ class DraftModuleStore(MongoModuleStore):
             return next_tier
 
         first_tier = [as_func(location) for as_func in as_functions]
-        self._breadth_first(_delete_item, first_tier)
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(location.course_key)
+        deleted = self._breadth_first(_delete_item, first_tier)
+        # update the metadata inheritance tree which is cached
+        self.refresh_cached_metadata_inheritance_tree(
+            location.course_key,
+            deleted_locations=[Location._from_deprecated_son(son, course_key.run) for son in deleted]
+        )
 
     def _breadth_first(self, function, root_usages):
         """
@@ -614,14 +617,13 @@ class DraftModuleStore(MongoModuleStore):
         function should return a list of SON for any next tier items to process and should
         add the SON for any items to delete to the to_be_deleted array.
 
-        At the end, it mass deletes the to_be_deleted items and refreshes the cached metadata inheritance
-        tree.
+        At the end, it mass deletes the to_be_deleted items and returns them.
 
         :param function: a function taking (item, to_be_deleted) and returning [SON] for next_tier invocation
         :param root_usages: the usage keys for the root items (ensure they have the right revision set)
         """
         if len(root_usages) == 0:
-            return
+            return []
         to_be_deleted = []
 
         def _internal(tier):
@@ -638,6 +640,7 @@ class DraftModuleStore(MongoModuleStore):
             bulk_record = self._get_bulk_ops_record(root_usages[0].course_key)
             bulk_record.dirty = True
             self.collection.remove({'_id': {'$in': to_be_deleted}}, safe=self.collection.safe)
+        return to_be_deleted
 
     @MongoModuleStore.memoize_request_cache
     def has_changes(self, xblock):
@@ -142,6 +142,81 @@ class CrossStoreXMLRoundtrip(unittest.TestCase):
                             raise_on_failure=True,
                         )
 
+                    # Unchanged assets are skipped when importing the course again.
+                    with CodeBlockTimer("reimport"):
+                        import_course_from_xml(
+                            dest_store,
+                            'test_user',
+                            self.export_dir,
+                            source_dirs=['exported_source_course'],
+                            static_content_store=dest_content,
+                            target_id=dest_course_key,
+                            create_if_not_present=True,
+                            raise_on_failure=True,
+                        )
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class CopyAssetsTest(unittest.TestCase):
+    """
+    This class exists to time copying all the assets of a course, as done for course
+    reruns, in different modulestore classes with different amounts of asset metadata.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    @ddt.data(*itertools.product(
+        MODULESTORE_SETUPS,
+        ASSET_AMOUNT_PER_TEST,
+    ))
+    @ddt.unpack
+    def test_generate_copy_timings(self, source_ms, num_assets):
+        """
+        Generate timings for different amounts of asset metadata and different modulestores.
+        """
+        if CodeBlockTimer is None:
+            raise SkipTest("CodeBlockTimer undefined.")
+
+        desc = "CopyAssetsTest:{}:{}".format(
+            SHORT_NAME_MAP[source_ms],
+            num_assets,
+        )
+
+        with CodeBlockTimer(desc):
+
+            with CodeBlockTimer("fake_assets"):
+                # First, make the fake asset metadata.
+                make_asset_xml(num_assets, ASSET_XML_PATH)
+                validate_xml(ASSET_XSD_PATH, ASSET_XML_PATH)
+
+            with source_ms.build() as (source_content, source_store):
+                source_course_key = source_store.make_course_key('a', 'course', 'course')
+                dest_course_key = source_store.make_course_key('a', 'course', 'rerun')
+
+                with CodeBlockTimer("initial_import"):
+                    import_course_from_xml(
+                        source_store,
+                        'test_user',
+                        TEST_DATA_ROOT,
+                        source_dirs=TEST_COURSE,
+                        static_content_store=source_content,
+                        target_id=source_course_key,
+                        create_if_not_present=True,
+                        raise_on_failure=True,
+                    )
+
+                with CodeBlockTimer("copy_assets"):
+                    source_content.copy_all_course_assets(source_course_key, dest_course_key)
+
+                # Nothing changed, so no data is copied this time.
+                with CodeBlockTimer("copy_unchanged_assets"):
+                    source_content.copy_all_course_assets(source_course_key, dest_course_key)
+
 
 @ddt.ddt
 # Eventually, exclude this attribute from regular unittests while running *only* tests
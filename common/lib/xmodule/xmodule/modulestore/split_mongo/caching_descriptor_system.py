@@ -87,6 +87,13 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                 parent_map[child] = block_key
         return parent_map
 
+    @lazy
+    def _inherited_settings_map(self):
+        """
+        The settings inherited by each block of the structure, or None if they can't be precomputed.
+        """
+        return self.modulestore.get_inherited_settings_map(self.course_entry.course_key, self.course_entry.structure)
+
     @contract(usage_key="BlockUsageLocator | BlockKey", course_entry_override="CourseEnvelope | None")
     def _load_item(self, usage_key, course_entry_override=None, **kwargs):
         """
@@ -206,15 +213,21 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
             parent = course_key.make_usage_key(parent_key.type, parent_key.id)
         else:
             parent = None
+        if self._inherited_settings_map is not None:
+            inherited_settings = self._inherited_settings_map.get(block_key)
+        else:
+            inherited_settings = None
         kvs = SplitMongoKVS(
             definition_loader,
             converted_fields,
             converted_defaults,
             parent=parent,
-            field_decorator=kwargs.get('field_decorator')
+            field_decorator=kwargs.get('field_decorator'),
+            inherited_settings=inherited_settings,
         )
 
-        if InheritanceMixin in self.modulestore.xblock_mixins:
+        if InheritanceMixin in self.modulestore.xblock_mixins and inherited_settings is None:
+            # look the inherited values up in the ancestors when they're needed
             field_data = inheriting_field_data(kvs)
         else:
             field_data = KvsFieldData(kvs)
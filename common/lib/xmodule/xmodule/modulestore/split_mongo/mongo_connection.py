@@ -2,7 +2,9 @@
 Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
 """
 import re
+import zlib
 from mongodb_proxy import autoretry_read, MongoProxy
+import bson
 import pymongo
 
 # Import this just to export it
@@ -12,6 +14,7 @@ from contracts import check, new_contract
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.util.lru_cache import LRUCache
 import datetime
 import pytz
 
@@ -70,16 +73,81 @@ def structure_to_mongo(structure):
     return new_structure
 
 
+class DocumentCache(object):
+    """
+    A process-wide cache of immutable split documents (structures and definitions),
+    optionally backed by a shared cache such as memcached.
+
+    Documents are kept BSON encoded and every read decodes a fresh copy, since
+    callers modify the structures and definitions they load (e.g. by merging the
+    definition fields into the blocks). The in-process cache evicts the least
+    recently used documents once their total size exceeds `max_bytes`. The shared
+    cache gets the documents zlib compressed.
+    """
+    def __init__(self, max_bytes):
+        self._local_cache = LRUCache(max_bytes, size_of=len)
+
+    @property
+    def max_bytes(self):
+        """
+        The total size of the documents the in-process cache can hold.
+        """
+        return self._local_cache.max_size
+
+    @property
+    def size(self):
+        """
+        The total size of the documents in the in-process cache.
+        """
+        return self._local_cache.size
+
+    def get(self, key, shared_cache=None):
+        """
+        Returns the BSON of the document cached for `key`, or None.
+        """
+        data = self._local_cache.get(key)
+        if data is not None:
+            return data
+
+        if shared_cache is not None:
+            compressed_data = shared_cache.get(key)
+            if compressed_data is not None:
+                data = zlib.decompress(compressed_data)
+                self._local_cache.set(key, data)
+                return data
+        return None
+
+    def set(self, key, data, shared_cache=None):
+        """
+        Caches `data`, the BSON of the document for `key`.
+        """
+        self._local_cache.set(key, data)
+        if shared_cache is not None:
+            shared_cache.set(key, zlib.compress(data))
+
+    def clear(self):
+        """
+        Removes all the documents from the in-process cache.
+        """
+        self._local_cache.clear()
+
+
 class MongoConnection(object):
     """
     Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
     """
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, document_cache=None, document_cache_subsystem=None,
+        **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        :param document_cache: an optional DocumentCache of structures and definitions. As these
+            never change once written, the same cache can be shared by all connections of the process.
+        :param document_cache_subsystem: an optional cache shared between processes (with a
+            django cache interface) backing `document_cache`
         """
         self.database = MongoProxy(
             pymongo.database.Database(
@@ -109,6 +177,10 @@ class MongoConnection(object):
         self.structures.write_concern = {'w': 1}
         self.definitions.write_concern = {'w': 1}
 
+        self.tz_aware = tz_aware
+        self.document_cache = document_cache
+        self.document_cache_subsystem = document_cache_subsystem
+
     def heartbeat(self):
         """
         Check that the db is reachable.
@@ -118,13 +190,63 @@ class MongoConnection(object):
         else:
             raise HeartbeatFailure("Can't connect to {}".format(self.database.name))
 
+    def _document_cache_key(self, collection, key):
+        """
+        Returns the key of the document whose id is `key` in the document cache.
+        """
+        return u'split_document:{}:{}'.format(collection.full_name, key)
+
+    def _get_cached_documents(self, collection, ids):
+        """
+        Returns the documents with the given `ids` from the document cache, and the ids of
+        the documents which aren't cached.
+        """
+        if self.document_cache is None:
+            return [], ids
+
+        documents = []
+        missing_ids = []
+        for key in ids:
+            data = self.document_cache.get(self._document_cache_key(collection, key), self.document_cache_subsystem)
+            if data is None:
+                missing_ids.append(key)
+            else:
+                documents.append(bson.BSON(data).decode(tz_aware=self.tz_aware))
+        return documents, missing_ids
+
+    def _cache_document(self, collection, document):
+        """
+        Adds `document` (as loaded from `collection`) to the document cache.
+        """
+        if self.document_cache is None:
+            return
+        self.document_cache.set(
+            self._document_cache_key(collection, document['_id']),
+            bson.BSON.encode(document),
+            self.document_cache_subsystem
+        )
+
+    @autoretry_read()
+    def _find_documents_by_id(self, collection, ids):
+        """
+        Returns the documents in `collection` whose ids are listed in `ids`, reading them
+        from the document cache whenever possible.
+        """
+        documents, missing_ids = self._get_cached_documents(collection, ids)
+        if missing_ids:
+            query = {'_id': missing_ids[0]} if len(missing_ids) == 1 else {'_id': {'$in': missing_ids}}
+            for document in collection.find(query):
+                self._cache_document(collection, document)
+                documents.append(document)
+        return documents
+
     def get_structure(self, key):
         """
         Get the structure from the persistence mechanism whose id is the given key
         """
-        return structure_from_mongo(self.structures.find_one({'_id': key}))
+        structures = self._find_documents_by_id(self.structures, [key])
+        return structure_from_mongo(structures[0]) if structures else None
 
-    @autoretry_read()
     def find_structures_by_id(self, ids):
         """
         Return all structures that specified in ``ids``.
@@ -132,7 +254,7 @@ class MongoConnection(object):
         Arguments:
             ids (list): A list of structure ids
         """
-        return [structure_from_mongo(structure) for structure in self.structures.find({'_id': {'$in': ids}})]
+        return [structure_from_mongo(structure) for structure in self._find_documents_by_id(self.structures, ids)]
 
     @autoretry_read()
     def find_structures_derived_from(self, ids):
@@ -258,13 +380,14 @@ class MongoConnection(object):
         """
         Get the definition from the persistence mechanism whose id is the given key
         """
-        return self.definitions.find_one({'_id': key})
+        definitions = self._find_documents_by_id(self.definitions, [key])
+        return definitions[0] if definitions else None
 
     def get_definitions(self, definitions):
         """
         Retrieve all definitions listed in `definitions`.
         """
-        return self.definitions.find({'_id': {'$in': definitions}})
+        return self._find_documents_by_id(self.definitions, definitions)
 
     def insert_definition(self, definition):
         """
@@ -57,6 +57,7 @@ import copy
 import datetime
 import hashlib
 import logging
+import threading
 from contracts import contract, new_contract
 from importlib import import_module
 from mongodb_proxy import autoretry_read
@@ -82,7 +83,7 @@ from .caching_descriptor_system import CachingDescriptorSystem
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
 from xmodule.error_module import ErrorDescriptor
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from types import NoneType
 from xmodule.assetstore import AssetMetadata
 
@@ -110,6 +111,9 @@ log = logging.getLogger(__name__)
 # When blacklists are this, all children should be excluded
 EXCLUDE_ALL = '*'
 
+# The number of structures whose block indexes are kept, see `_get_structure_indexes`
+STRUCTURE_INDEXES_CACHE_SIZE = 10
+
 
 new_contract('BlockUsageLocator', BlockUsageLocator)
 new_contract('BlockKey', BlockKey)
@@ -451,7 +455,10 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
 
         # If we have an active bulk write, and it's already been edited, then just use that structure
         if bulk_write_record.active and course_key.branch in bulk_write_record.dirty_branches:
-            return bulk_write_record.structure_for_branch(course_key.branch)
+            structure = bulk_write_record.structure_for_branch(course_key.branch)
+            # The caller is going to edit the structure without maintaining its parent index
+            self._clear_structure_indexes(structure)
+            return structure
 
         # Otherwise, make a new structure
         new_structure = copy.deepcopy(structure)
@@ -635,14 +642,21 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  i18n_service=None, fs_service=None, user_service=None,
-                 services=None, signal_handler=None, **kwargs):
+                 services=None, signal_handler=None, document_cache=None, document_cache_subsystem=None,
+                 **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param document_cache: an optional DocumentCache keeping the structures and definitions across requests
+        :param document_cache_subsystem: an optional cache shared between processes backing `document_cache`
         """
 
         super(SplitMongoModuleStore, self).__init__(contentstore, **kwargs)
 
-        self.db_connection = MongoConnection(**doc_store_config)
+        self.db_connection = MongoConnection(
+            document_cache=document_cache,
+            document_cache_subsystem=document_cache_subsystem,
+            **doc_store_config
+        )
         self.db = self.db_connection.database
 
         if default_class is not None:
@@ -666,6 +680,10 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         self.signal_handler = signal_handler
 
+        # structure id -> indexes of the structure's blocks
+        self._structure_indexes = OrderedDict()
+        self._structure_indexes_lock = threading.Lock()
+
     def close_connections(self):
         """
         Closes any open connections to the underlying databases
@@ -1067,34 +1085,42 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             return []
 
         course = self._lookup_course(course_locator)
-        items = []
+        blocks = course.structure['blocks']
         qualifiers = qualifiers.copy() if qualifiers else {}  # copy the qualifiers (destructively manipulated here)
 
-        def _block_matches_all(block_data):
+        def _matching_block_keys(block_keys):
             """
-            Check that the block matches all the criteria
+            Return the keys of the blocks which match all the criteria
             """
             # do the checks which don't require loading any additional data
-            if (  # pylint: disable=bad-continuation
-                self._block_matches(block_data, qualifiers) and
-                self._block_matches(block_data.fields, settings)
-            ):
-                if content:
-                    definition_block = self.get_definition(course_locator, block_data.definition)
-                    return self._block_matches(definition_block['fields'], content)
-                else:
-                    return True
+            items = [
+                block_key for block_key in block_keys
+                if block_key in blocks and
+                self._block_matches(blocks[block_key], qualifiers) and
+                self._block_matches(blocks[block_key].fields, settings)
+            ]
+            if content and items:
+                # then load all the remaining candidates' definitions at once
+                definitions = {
+                    definition['_id']: definition
+                    for definition in self.get_definitions(
+                        course_locator, [blocks[block_key].definition for block_key in items]
+                    )
+                }
+                items = [
+                    block_key for block_key in items
+                    if blocks[block_key].definition in definitions and
+                    self._block_matches(definitions[blocks[block_key].definition]['fields'], content)
+                ]
+            return items
 
         if settings is None:
             settings = {}
+        indexes = self._get_structure_indexes(course.structure)
         if 'name' in qualifiers:
             # odd case where we don't search just confirm
             block_name = qualifiers.pop('name')
-            block_ids = []
-            for block_id, block in course.structure['blocks'].iteritems():
-                if block_name == block_id.id and _block_matches_all(block):
-                    block_ids.append(block_id)
-
+            block_ids = _matching_block_keys(indexes['block_id'].get(block_name, ()))
             return self._load_items(course, block_ids, **kwargs)
 
         if 'category' in qualifiers:
@@ -1103,9 +1129,19 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         # don't expect caller to know that children are in fields
         if 'children' in qualifiers:
             settings['children'] = qualifiers.pop('children')
-        for block_id, value in course.structure['blocks'].iteritems():
-            if _block_matches_all(value):
-                items.append(block_id)
+
+        # only check the blocks of the requested type(s) when the type is given explicitly
+        block_type = qualifiers.get('block_type')
+        if isinstance(block_type, basestring):
+            candidates = indexes['block_type'].get(block_type, ())
+        elif (
+            isinstance(block_type, dict) and block_type.keys() == ['$in'] and
+            all(isinstance(type_name, basestring) for type_name in block_type['$in'])
+        ):
+            candidates = set().union(*(indexes['block_type'].get(type_name, ()) for type_name in block_type['$in']))
+        else:
+            candidates = blocks.iterkeys()
+        items = _matching_block_keys(candidates)
 
         if len(items) > 0:
             return self._load_items(course, items, depth=0, **kwargs)
@@ -1582,6 +1618,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                     kwargs.get('position'),
                     BlockKey.from_usage_key(xblock.location)
                 )
+            self._index_block(new_structure, block_id, parent)
 
             if parent.edit_info.update_version != new_structure['_id']:
                 # if the parent hadn't been previously changed in this bulk transaction, indicate that it's
@@ -2419,51 +2456,46 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         # in case the course is later restored.
         # super(SplitMongoModuleStore, self).delete_course(course_key, user_id)
 
-    @contract(block_map="dict(BlockKey: dict)", block_key=BlockKey)
-    def inherit_settings(
-        self, block_map, block_key, inherited_settings_map, inheriting_settings=None, inherited_from=None
-    ):
-        """
-        Updates block_data with any inheritable setting set by an ancestor and recurses to children.
+    def get_inherited_settings_map(self, course_key, structure):
         """
-        if block_key not in block_map:
-            return
-        block_data = block_map[block_key]
-
-        if inheriting_settings is None:
-            inheriting_settings = {}
-
-        if inherited_from is None:
-            inherited_from = []
+        Returns the settings each block of the structure inherits, as a dict
+        {BlockKey: {field_name: json value set by the nearest ancestor setting it}}, or None
+        if the structure is being edited in a bulk operation.
 
-        # the currently passed down values take precedence over any previously cached ones
-        # NOTE: this should show the values which all fields would have if inherited: i.e.,
-        # not set to the locally defined value but to value set by nearest ancestor who sets it
-        inherited_settings_map.setdefault(block_key, {}).update(inheriting_settings)
+        The map is computed once per structure version and cached with the structure's indexes.
+        Blocks which inherit the same settings as their parent share its dict.
+        """
+        bulk_write_record = self._get_bulk_ops_record(course_key)
+        if structure['_id'] in bulk_write_record.structures and structure['_id'] not in bulk_write_record.structures_in_db:
+            # the structure may still change
+            return None
 
-        # update the inheriting w/ what should pass to children
-        inheriting_settings = inherited_settings_map[block_key].copy()
-        block_fields = block_data.fields
-        for field_name in inheritance.InheritanceMixin.fields:
-            if field_name in block_fields:
-                inheriting_settings[field_name] = block_fields[field_name]
+        indexes = self._get_structure_indexes(structure)
+        inherited_settings_map = indexes.get('inherited_settings')
+        if inherited_settings_map is None:
+            inherited_settings_map = {}
+            blocks = structure['blocks']
+            # start from the root and any orphaned subtree
+            stack = [(block_key, {}) for block_key in blocks if not indexes['parents'].get(block_key)]
+            while stack:
+                block_key, inherited_settings = stack.pop()
+                if block_key in inherited_settings_map or block_key not in blocks:
+                    continue
+                inherited_settings_map[block_key] = inherited_settings
 
-        for child in block_fields.get('children', []):
-            try:
-                if child in inherited_from:
-                    raise Exception(u'Infinite loop detected when inheriting to {}, having already inherited from {}'.format(child, inherited_from))
-                self.inherit_settings(
-                    block_map,
-                    BlockKey(*child),
-                    inherited_settings_map,
-                    inheriting_settings,
-                    inherited_from + [child]
-                )
-            except KeyError:
-                # here's where we need logic for looking up in other structures when we allow cross pointers
-                # but it's also getting this during course creation if creating top down w/ children set or
-                # migration where the old mongo published had pointers to privates
-                pass
+                # update the inheriting w/ what should pass to children
+                block_fields = blocks[block_key].fields
+                set_fields = [
+                    field_name for field_name in inheritance.InheritanceMixin.fields if field_name in block_fields
+                ]
+                if set_fields:
+                    inherited_settings = inherited_settings.copy()
+                    for field_name in set_fields:
+                        inherited_settings[field_name] = block_fields[field_name]
+                for child in block_fields.get('children', []):
+                    stack.append((BlockKey(*child), inherited_settings))
+            indexes['inherited_settings'] = inherited_settings_map
+        return inherited_settings_map
 
     def descendants(self, block_map, block_id, depth, descendent_map):
         """
@@ -2873,12 +2905,78 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         Given a structure, find block_key's parent in that structure. Note returns
         the encoded format for parent
         """
+        blocks = structure['blocks']
+        # The index may still list parents which have since been deleted or lost the child
         return [
             parent_block_key
-            for parent_block_key, value in structure['blocks'].iteritems()
-            if block_key in value.fields.get('children', [])
+            for parent_block_key in self._get_structure_indexes(structure)['parents'].get(block_key, [])
+            if parent_block_key in blocks and block_key in blocks[parent_block_key].fields.get('children', [])
         ]
 
+    def _get_structure_indexes(self, structure):
+        """
+        Returns the indexes of the blocks of the structure, building them if they're not already cached:
+            'parents': {child BlockKey: [parent BlockKey]}
+            'block_type': {block_type: set([BlockKey])}
+            'block_id': {block_id: set([BlockKey])}
+        plus the lazily computed 'inherited_settings', see `get_inherited_settings_map`.
+
+        The indexes are kept for the few most recently used structure versions. Stored structures
+        never change, but the one being edited in a bulk operation does. So the indexes are only
+        extended by `_index_block`: structure edits removing blocks or children may leave stale
+        entries in them, and edits adding blocks or children other than by `_update_block_in_structure`
+        and `create_child` must happen after `version_structure` (which drops the indexes).
+        """
+        structure_id = structure['_id']
+        with self._structure_indexes_lock:
+            indexes = self._structure_indexes.pop(structure_id, None)
+            if indexes is not None:
+                # Mark the indexes as the most recently used ones
+                self._structure_indexes[structure_id] = indexes
+                return indexes
+
+        indexes = {
+            'parents': defaultdict(list),
+            'block_type': defaultdict(set),
+            'block_id': defaultdict(set),
+        }
+        for block_key, block in structure['blocks'].iteritems():
+            self._add_block_to_indexes(indexes, block_key, block)
+
+        with self._structure_indexes_lock:
+            self._structure_indexes[structure_id] = indexes
+            if len(self._structure_indexes) > STRUCTURE_INDEXES_CACHE_SIZE:
+                self._structure_indexes.popitem(last=False)
+        return indexes
+
+    @staticmethod
+    def _add_block_to_indexes(indexes, block_key, block):
+        """
+        Adds the block and its children to the structure indexes.
+        """
+        indexes['block_type'][block_key.type].add(block_key)
+        indexes['block_id'][block_key.id].add(block_key)
+        for child in block.fields.get('children', []):
+            parents = indexes['parents'][BlockKey(*child)]
+            if block_key not in parents:
+                parents.append(block_key)
+
+    def _index_block(self, structure, block_key, block):
+        """
+        Adds the block and its children to the structure's indexes, if it has any.
+        """
+        with self._structure_indexes_lock:
+            indexes = self._structure_indexes.get(structure['_id'])
+            if indexes is not None:
+                self._add_block_to_indexes(indexes, block_key, block)
+
+    def _clear_structure_indexes(self, structure):
+        """
+        Drops the indexes of the structure, if it has any.
+        """
+        with self._structure_indexes_lock:
+            self._structure_indexes.pop(structure['_id'], None)
+
     def _sync_children(self, source_parent, destination_parent, new_child):
         """
         Reorder destination's children to the same as source's and remove any no longer in source.
@@ -3028,6 +3126,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         be a json dict key.
         """
         structure['blocks'][block_key] = content
+        self._index_block(structure, block_key, content)
 
     @autoretry_read()
     def find_courses_by_search_target(self, field_name, field_value):
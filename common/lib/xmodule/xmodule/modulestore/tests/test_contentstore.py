@@ -9,6 +9,9 @@ from tempfile import mkdtemp
 import path
 import shutil
 
+from mock import patch
+from pymongo.errors import AutoReconnect
+
 from opaque_keys.edx.locator import CourseLocator, AssetLocator
 from opaque_keys.edx.keys import AssetKey
 from xmodule.tests import DATA_DIR
@@ -191,12 +194,66 @@ class TestContentstore(unittest.TestCase):
             dest_key = dest_course.make_asset_key('asset', filename)
             source = self.contentstore.find(asset_key)
             copied = self.contentstore.find(dest_key)
-            for propname in ['name', 'content_type', 'length', 'locked']:
+            for propname in ['name', 'content_type', 'length', 'locked', 'data', 'content_digest']:
                 self.assertEqual(getattr(source, propname), getattr(copied, propname))
 
         __, count = self.contentstore.get_all_content_for_course(dest_course)
         self.assertEqual(count, len(self.course1_files))
 
+    @ddt.data(True, False)
+    def test_copy_assets_again(self, deprecated):
+        """
+        copy_all_course_assets only copies the assets which changed since they were last copied
+        """
+        self.set_up_assets(deprecated)
+        dest_course = CourseLocator('test', 'destination', 'copy')
+        self.contentstore.copy_all_course_assets(self.course1_key, dest_course)
+        unchanged_key = dest_course.make_asset_key('asset', self.course1_files[0])
+        changed_key = dest_course.make_asset_key('asset', self.course1_files[1])
+        unchanged_upload_date = self.contentstore.get_attr(unchanged_key, 'uploadDate')
+
+        # change the data of one of the assets
+        source_key = self.course1_key.make_asset_key('asset', self.course1_files[1])
+        self.save_asset(self.course1_files[2], source_key, self.course1_files[1], False)
+        self.contentstore.copy_all_course_assets(self.course1_key, dest_course)
+
+        self.assertEqual(self.contentstore.get_attr(unchanged_key, 'uploadDate'), unchanged_upload_date)
+        self.assertEqual(self.contentstore.find(changed_key).data, self.contentstore.find(source_key).data)
+        __, count = self.contentstore.get_all_content_for_course(dest_course)
+        self.assertEqual(count, len(self.course1_files))
+
+    @ddt.data(True, False)
+    def test_copy_assets_after_failure(self, deprecated):
+        """
+        copy_all_course_assets copies the assets again after a copy which failed part way
+        """
+        self.set_up_assets(deprecated)
+        dest_course = CourseLocator('test', 'destination', 'copy')
+        # the chunks are copied, but the files documents never make it
+        with patch.object(self.contentstore, '_insert_copied_files', side_effect=AutoReconnect):
+            with self.assertRaises(AutoReconnect):
+                self.contentstore.copy_all_course_assets(self.course1_key, dest_course)
+
+        self.contentstore.copy_all_course_assets(self.course1_key, dest_course)
+        for filename in self.course1_files:
+            source = self.contentstore.find(self.course1_key.make_asset_key('asset', filename))
+            copied = self.contentstore.find(dest_course.make_asset_key('asset', filename))
+            self.assertEqual(source.data, copied.data)
+
+    @ddt.data(True, False)
+    def test_get_all_content_summaries(self, deprecated):
+        """
+        Test get_all_content_summaries_for_course
+        """
+        self.set_up_assets(deprecated)
+        summaries = self.contentstore.get_all_content_summaries_for_course(self.course1_key)
+        self.assertEqual(len(summaries), len(self.course1_files))
+        for filename in self.course1_files:
+            asset_key = self.course1_key.make_asset_key('asset', filename)
+            summary = summaries[unicode(asset_key)]
+            self.assertEqual(summary['md5'], self.contentstore.get_attr(asset_key, 'md5'))
+            self.assertEqual(summary['displayname'], filename)
+
     @ddt.data(True, False)
     def test_delete_assets(self, deprecated):
         """
@@ -76,6 +76,28 @@ class MemoryCache(object):
         """
         self._data[key] = value
 
+    def add(self, key, value):
+        """
+        Set a key in the cache, unless it is already set.
+
+        Args:
+            key: The key to add.
+            value: The value to add.
+        """
+        self._data.setdefault(key, value)
+
+    def incr(self, key):
+        """
+        Increment the value of a key in the cache, and return it.
+
+        Args:
+            key: The key to increment, which must have been set previously.
+        """
+        if key not in self._data:
+            raise ValueError("Key '{}' not found".format(key))
+        self._data[key] += 1
+        return self._data[key]
+
 
 class MongoContentstoreBuilder(object):
     """
@@ -11,6 +11,8 @@ from nose.tools import assert_equals, assert_raises, \
 from path import path
 import pymongo
 import logging
+from mock import patch
+import pickle
 import shutil
 from tempfile import mkdtemp
 from uuid import uuid4
@@ -39,8 +41,9 @@ from nose.tools import assert_in
 from xmodule.exceptions import NotFoundError
 from git.test.lib.asserts import assert_not_none
 from xmodule.x_module import XModuleMixin
-from xmodule.modulestore.mongo.base import as_draft
+from xmodule.modulestore.mongo.base import as_draft, MetadataInheritanceTree
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
+from xmodule.modulestore.tests.test_cross_modulestore_import_export import MemoryCache
 from xmodule.modulestore.tests.utils import LocationMixin
 from xmodule.modulestore.edit_info import EditInfoMixin
 from xmodule.modulestore.exceptions import ItemNotFoundError
@@ -778,6 +781,44 @@ class TestMongoModuleStore(TestMongoModuleStoreBase):
         # Clean up the data so we don't break other tests which apparently expect a particular state
         self.draft_store.delete_course(course.id, self.dummy_user)
 
+    def test_patch_cached_inheritance_tree(self):
+        """
+        The cached inheritance tree is patched for an edit, unless another process changed it meanwhile
+        """
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        store = self.draft_store
+        with patch.object(store, 'metadata_inheritance_cache_subsystem', MemoryCache()):
+            store._get_cached_metadata_inheritance_tree(course_key)
+            chapter = store.get_item(course_key.make_usage_key('chapter', 'Overview'))
+            child_id = unicode(chapter.children[0])
+
+            # the edit is patched into the cached tree
+            chapter.days_early_for_beta = 2.0
+            with patch.object(store, '_compute_metadata_inheritance_tree') as mock_compute:
+                store.refresh_cached_metadata_inheritance_tree(course_key, updated_xblock=chapter)
+                tree = store._get_cached_metadata_inheritance_tree(course_key)
+            self.assertFalse(mock_compute.called)
+            self.assertEqual(tree.get(child_id)['days_early_for_beta'], 2.0)
+
+            # another process changes the tree while this one patches it
+            def concurrent_update(tree, *args, **kwargs):
+                """
+                Bump the version of the cached tree, as another process would
+                """
+                store._bump_metadata_inheritance_tree_version(course_key)
+                return update_container(tree, *args, **kwargs)
+
+            update_container = MetadataInheritanceTree.update_container
+            chapter.days_early_for_beta = 3.0
+            with patch.object(MetadataInheritanceTree, 'update_container', autospec=True) as mock_update:
+                mock_update.side_effect = concurrent_update
+                with patch.object(store, '_compute_metadata_inheritance_tree') as mock_compute:
+                    mock_compute.return_value = MetadataInheritanceTree(store.get_branch_setting())
+                    store.refresh_cached_metadata_inheritance_tree(course_key, updated_xblock=chapter)
+                    tree = store._get_cached_metadata_inheritance_tree(course_key)
+            self.assertEqual(mock_compute.call_count, 1)
+            self.assertIs(tree, mock_compute.return_value)
+
 
 class TestMongoModuleStoreWithNoAssetCollection(TestMongoModuleStore):
     '''
@@ -883,6 +924,62 @@ class TestMongoKeyValueStore(unittest.TestCase):
                 self.kvs.delete(KeyValueStore.Key(scope, None, None, 'foo'))
 
 
+class TestMetadataInheritanceTree(unittest.TestCase):
+    """
+    Tests for MetadataInheritanceTree.
+    """
+
+    def setUp(self):
+        super(TestMetadataInheritanceTree, self).setUp()
+        self.tree = MetadataInheritanceTree(ModuleStoreEnum.Branch.draft_preferred)
+        self.tree.update_container('course', None, {'graceperiod': '1 hour'}, ['chapter'], is_root=True)
+        self.tree.update_container('chapter', None, {}, ['sequential'])
+        self.tree.update_container('sequential', None, {'due': '2014-01-01'}, ['problem'])
+
+    def test_inheritance(self):
+        assert_equals(self.tree.get('course', {}), {})
+        assert_equals(self.tree.get('chapter'), {'graceperiod': '1 hour'})
+        assert_equals(self.tree.get('problem'), {'graceperiod': '1 hour', 'due': '2014-01-01'})
+        # blocks which don't override anything share what they inherit
+        assert_true(self.tree.get('chapter') is self.tree._inherited_by('chapter'))
+        assert_true(self.tree.get('problem') is self.tree.get('sequential'))
+        assert_is_none(self.tree.get('orphan'))
+
+    def test_parents(self):
+        assert_equals(self.tree.get_parent('problem', ModuleStoreEnum.Branch.draft_preferred), 'sequential')
+        assert_is_none(self.tree.get_parent('problem', ModuleStoreEnum.Branch.published_only))
+        assert_is_none(self.tree.get_parent('course', ModuleStoreEnum.Branch.draft_preferred))
+
+    def test_update_container(self):
+        assert_equals(self.tree.get('problem')['due'], '2014-01-01')
+        assert_true(self.tree.update_container('chapter', 'draft', {'graceperiod': '2 hours'}, ['sequential']))
+        assert_equals(self.tree.get('problem'), {'graceperiod': '2 hours', 'due': '2014-01-01'})
+        # nothing inheritable changed
+        assert_false(self.tree.update_container('chapter', 'draft', {'graceperiod': '2 hours'}, ['sequential']))
+
+        # the draft revision drops the sequential, but the published one still has it
+        assert_false(self.tree.update_container('chapter', 'draft', {'graceperiod': '2 hours'}, []))
+        assert_equals(self.tree.get_parent('sequential', ModuleStoreEnum.Branch.draft_preferred), 'chapter')
+        assert_true(self.tree.update_container('chapter', None, {}, []))
+        assert_is_none(self.tree.get_parent('sequential', ModuleStoreEnum.Branch.draft_preferred))
+        assert_is_none(self.tree.get('problem'))
+
+    def test_remove_container(self):
+        assert_true(self.tree.update_container('chapter', 'draft', {'graceperiod': '2 hours'}, ['sequential']))
+        assert_true(self.tree.remove_container('chapter', 'draft'))
+        assert_equals(self.tree.get('problem'), {'graceperiod': '1 hour', 'due': '2014-01-01'})
+        assert_false(self.tree.remove_container('chapter', 'draft'))
+        assert_true(self.tree.remove_container('course', None))
+        assert_is_none(self.tree.get_parent('chapter', ModuleStoreEnum.Branch.draft_preferred))
+        assert_is_none(self.tree.get('chapter'))
+
+    def test_pickle(self):
+        self.tree.get('problem')
+        tree = pickle.loads(pickle.dumps(self.tree))
+        assert_equals(tree._inherited, {})
+        assert_equals(tree.get('problem'), {'graceperiod': '1 hour', 'due': '2014-01-01'})
+
+
 def _build_requested_filter(requested_filter):
     """
     Returns requested filter_params string.
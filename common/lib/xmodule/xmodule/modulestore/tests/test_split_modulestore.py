@@ -10,7 +10,9 @@ import unittest
 import uuid
 
 from contracts import contract
+from mock import Mock, patch
 from nose.plugins.attrib import attr
+import pymongo
 
 from openedx.core.lib import tempdir
 from xblock.fields import Reference, ReferenceList, ReferenceValueDict
@@ -26,6 +28,7 @@ from xmodule.modulestore.inheritance import InheritanceMixin
 from xmodule.x_module import XModuleMixin
 from xmodule.fields import Date, Timedelta
 from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
+from xmodule.modulestore.split_mongo.mongo_connection import DocumentCache
 from xmodule.modulestore.tests.test_modulestore import check_has_course_method
 from xmodule.modulestore.split_mongo import BlockKey
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
@@ -967,6 +970,19 @@ class SplitModuleItemTests(SplitModuleTest):
         self.assertEqual(len(matches), 1)
         matches = modulestore().get_items(locator, settings={'group_access': {'$exists': False}})
         self.assertEqual(len(matches), 6)
+        matches = modulestore().get_items(locator, qualifiers={'category': {'$in': ['chapter', 'course']}})
+        self.assertEqual(len(matches), 4)
+        matches = modulestore().get_items(locator, qualifiers={'name': 'chapter1'})
+        self.assertEqual([match.location.block_id for match in matches], ['chapter1'])
+
+        # the definitions are loaded all at once to check the content fields
+        store = modulestore()
+        with patch.object(store, 'get_definitions', wraps=store.get_definitions) as mock_get_definitions:
+            matches = modulestore().get_items(
+                locator, content={'grading_policy': lambda grading_policy: 'GRADER' in grading_policy}
+            )
+        self.assertEqual([match.location.block_id for match in matches], ['head12345'])
+        self.assertEqual(mock_get_definitions.call_count, 1)
 
     def test_get_parents(self):
         '''
@@ -989,6 +1005,50 @@ class SplitModuleItemTests(SplitModuleTest):
         parent = modulestore().get_parent_location(locator)
         self.assertIsNone(parent)
 
+    def test_get_parents_while_editing(self):
+        """
+        The parents stay correct as the course gets edited within a bulk operation
+        """
+        course_key = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        store = modulestore()
+
+        def create_child(parent, block_type):
+            """
+            Creates a child of parent and returns its usage key (without version)
+            """
+            block_id = store.create_child(self.user_id, parent, block_type).location.block_id
+            return course_key.make_usage_key(block_type, block_id)
+
+        def parent_id(location):
+            """
+            Returns the block_id of location's parent, if any
+            """
+            parent = store.get_parent_location(location)
+            return parent.block_id if parent else None
+
+        chapter1 = course_key.make_usage_key('chapter', 'chapter1')
+        chapter2 = course_key.make_usage_key('chapter', 'chapter2')
+        with store.bulk_operations(course_key):
+            self.assertEqual(parent_id(chapter1), 'head12345')
+            sequential = create_child(chapter1, 'sequential')
+            self.assertEqual(parent_id(sequential), 'chapter1')
+            vertical = create_child(sequential, 'vertical')
+            self.assertEqual(parent_id(vertical), sequential.block_id)
+
+            # move the vertical to another sequential
+            other_sequential = create_child(chapter2, 'sequential')
+            other_sequential_block = store.get_item(other_sequential, depth=0)
+            other_sequential_block.children = [vertical]
+            store.update_item(other_sequential_block, self.user_id)
+            sequential_block = store.get_item(sequential, depth=0)
+            sequential_block.children = []
+            store.update_item(sequential_block, self.user_id)
+            self.assertEqual(parent_id(vertical), other_sequential.block_id)
+
+            store.delete_item(other_sequential, self.user_id)
+            self.assertIsNone(parent_id(vertical))
+        self.assertEqual(parent_id(sequential), 'chapter1')
+
     def test_get_children(self):
         """
         Test the existing get_children method on xdescriptors
@@ -1726,6 +1786,34 @@ class TestInheritance(SplitModuleTest):
         # overridden
         self.assertEqual(node.graceperiod, datetime.timedelta(hours=4))
 
+    def test_inherited_settings_map(self):
+        """
+        The inherited settings are computed once per structure version, but not while it's being edited
+        """
+        course_key = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        store = modulestore()
+        structure = store._lookup_course(course_key).structure  # pylint: disable=protected-access
+        inherited_settings_map = store.get_inherited_settings_map(course_key, structure)
+        self.assertEqual(inherited_settings_map[structure['root']], {})
+        self.assertEqual(
+            self._time_delta_field.from_json(inherited_settings_map[BlockKey('problem', 'problem3_2')]['graceperiod']),
+            datetime.timedelta(hours=2)
+        )
+        self.assertIs(
+            store.get_inherited_settings_map(
+                course_key, store._lookup_course(course_key).structure  # pylint: disable=protected-access
+            ),
+            inherited_settings_map
+        )
+
+        with store.bulk_operations(course_key):
+            store.create_child(self.user_id, course_key.make_usage_key('chapter', 'chapter3'), 'problem')
+            structure = store._lookup_course(course_key).structure  # pylint: disable=protected-access
+            self.assertIsNone(store.get_inherited_settings_map(course_key, structure))
+            # so the values are looked up in the ancestors
+            problem = store.get_item(course_key.make_usage_key('problem', 'problem3_2'))
+            self.assertEqual(problem.graceperiod, datetime.timedelta(hours=2))
+
     def test_inheritance_not_saved(self):
         """
         Was saving inherited settings with updated blocks causing inheritance to be sticky
@@ -1978,6 +2066,84 @@ class TestSchema(SplitModuleTest):
             )
 
 
+class TestDocumentCache(SplitModuleTest):
+    """
+    Test caching the structures and definitions across requests
+    """
+    def setUp(self):
+        super(TestDocumentCache, self).setUp()
+        self.db_connection = modulestore().db_connection
+        self.db_connection.document_cache = DocumentCache(1024 * 1024)
+        self.addCleanup(setattr, self.db_connection, 'document_cache', None)
+
+        course = modulestore().get_course(
+            CourseLocator(org='testx', course='GreekHero', run='run', branch=BRANCH_NAME_DRAFT)
+        )
+        self.structure_id = course.location.version_guid
+        self.definition_id = course.definition_locator.definition_id
+
+    def test_get_structure(self):
+        structure = self.db_connection.get_structure(self.structure_id)
+        with patch('pymongo.message.query', wraps=pymongo.message.query) as mock_query:
+            cached_structure = self.db_connection.get_structure(self.structure_id)
+            self.assertEqual(self.db_connection.find_structures_by_id([self.structure_id])[0]['_id'], self.structure_id)
+        self.assertFalse(mock_query.called)
+        self.assertEqual(cached_structure['_id'], structure['_id'])
+        self.assertEqual(cached_structure['blocks'].keys(), structure['blocks'].keys())
+
+        # every read gets its own copy
+        self.assertIsNot(cached_structure, structure)
+        block_key = cached_structure['root']
+        cached_structure['blocks'][block_key].fields['display_name'] = 'Changed'
+        self.assertNotEqual(
+            self.db_connection.get_structure(self.structure_id)['blocks'][block_key].fields['display_name'],
+            'Changed'
+        )
+
+    def test_get_definitions(self):
+        definition = self.db_connection.get_definition(self.definition_id)
+        with patch('pymongo.message.query', wraps=pymongo.message.query) as mock_query:
+            self.assertEqual(self.db_connection.get_definitions([self.definition_id]), [definition])
+        self.assertFalse(mock_query.called)
+
+    def test_shared_cache(self):
+        self.db_connection.document_cache_subsystem = shared_cache = Mock(get=Mock(return_value=None))
+        self.addCleanup(setattr, self.db_connection, 'document_cache_subsystem', None)
+        structure = self.db_connection.get_structure(self.structure_id)
+        self.assertTrue(shared_cache.set.called)
+
+        # another process finds the structure in the shared cache
+        cache_key, compressed_data = shared_cache.set.call_args[0]
+        shared_cache.get.return_value = compressed_data
+        self.db_connection.document_cache.clear()
+        with patch('pymongo.message.query', wraps=pymongo.message.query) as mock_query:
+            self.assertEqual(self.db_connection.get_structure(self.structure_id)['_id'], structure['_id'])
+        self.assertFalse(mock_query.called)
+        shared_cache.get.assert_called_with(cache_key)
+
+
+class DocumentCacheTestCase(unittest.TestCase):
+    """
+    Test the in-process document cache
+    """
+    def test_evicts_least_recently_used(self):
+        cache = DocumentCache(10)
+        cache.set('a', '1234')
+        cache.set('b', '1234')
+        self.assertEqual(cache.get('a'), '1234')
+        cache.set('c', '1234')
+        self.assertEqual(cache.get('a'), '1234')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), '1234')
+        self.assertEqual(cache.size, 8)
+
+    def test_larger_than_budget(self):
+        cache = DocumentCache(10)
+        cache.set('a', '12345678901')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size, 0)
+
+
 # ===========================================
 def modulestore():
     """
@@ -20,6 +20,7 @@ Modulestore virtual   |          XML physical (draft, published)
              (a, a)   |  (a, a) | (x, a) | (x, x) | (x, y) | (a, x)
              (a, b)   |  (a, b) | (x, b) | (x, x) | (x, y) | (a, x)
 """
+import hashlib
 import logging
 from abc import abstractmethod
 from opaque_keys.edx.locator import LibraryLocator
@@ -75,6 +76,13 @@ def import_static_content(
     mimetypes.add_type('application/octet-stream', '.srt')
     mimetypes_list = mimetypes.types_map.values()
 
+    # the digests and attributes of the assets already in the course, so that
+    # unchanged assets aren't saved again on re-import
+    try:
+        stored_summaries = static_content_store.get_all_content_summaries_for_course(target_id)
+    except NotImplementedError:
+        stored_summaries = {}
+
     for dirname, _, filenames in os.walk(static_dir):
         for filename in filenames:
 
@@ -113,6 +121,18 @@ def import_static_content(
             # Check extracted contentType in list of all valid mimetypes
             if not mime_type or mime_type not in mimetypes_list:
                 mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
+            # store the remapping information which will be needed
+            # to subsitute in the module data
+            remap_dict[fullname_with_subpath] = asset_key
+
+            stored_summary = stored_summaries.get(unicode(asset_key))
+            if stored_summary is not None and _is_unchanged_asset(
+                stored_summary, hashlib.md5(data).hexdigest(), displayname, mime_type, locked, fullname_with_subpath
+            ):
+                if verbose:
+                    log.debug('skipping unchanged static content %s...', content_path)
+                continue
+
             content = StaticContent(
                 asset_key, displayname, mime_type, data,
                 import_path=fullname_with_subpath, locked=locked
@@ -132,13 +152,23 @@ def import_static_content(
                     fullname_with_subpath, err
                 ))
 
-            # store the remapping information which will be needed
-            # to subsitute in the module data
-            remap_dict[fullname_with_subpath] = asset_key
-
     return remap_dict
 
 
+def _is_unchanged_asset(stored_summary, md5, displayname, content_type, locked, import_path):
+    """
+    Returns whether the asset summarized by `stored_summary` (see
+    `ContentStore.get_all_content_summaries_for_course`) has the given data digest and attributes.
+    """
+    return (
+        stored_summary.get('md5') == md5 and
+        stored_summary.get('displayname') == displayname and
+        stored_summary.get('contentType') == content_type and
+        stored_summary.get('locked', False) == locked and
+        stored_summary.get('import_path') == import_path
+    )
+
+
 class ImportManager(object):
     """
     Import xml-based courselikes from data_dir into modulestore.
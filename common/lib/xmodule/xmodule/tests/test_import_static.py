@@ -1,8 +1,10 @@
 """
 Tests that check that we ignore the appropriate files when importing courses.
 """
+import hashlib
 import unittest
 from mock import Mock
+from xmodule.contentstore.content import StaticContent
 from xmodule.modulestore.xml_importer import import_static_content
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from xmodule.tests import DATA_DIR
@@ -39,3 +41,32 @@ class IgnoredFilesTestCase(unittest.TestCase):
         self.assertNotIn(".DS_Store", name_val)
         self.assertIn("GREEN", name_val["example.txt"])
         self.assertIn("BLUE", name_val[".example.txt"])
+
+
+class UnchangedFilesTestCase(unittest.TestCase):
+    "Tests for re-importing static files"
+    def test_skip_unchanged_static_files(self):
+        course_dir = DATA_DIR / "tilde"
+        course_id = SlashSeparatedCourseKey("edX", "tilde", "Fall_2012")
+        asset_key = StaticContent.compute_location(course_id, "example.txt")
+        with open(course_dir / "static" / "example.txt", "rb") as f:
+            md5 = hashlib.md5(f.read()).hexdigest()
+
+        content_store = Mock()
+        content_store.generate_thumbnail.return_value = ("content", "location")
+        content_store.get_all_content_summaries_for_course.return_value = {
+            unicode(asset_key): {
+                'md5': md5,
+                'displayname': "example.txt",
+                'contentType': "text/plain",
+                'import_path': "example.txt",
+            }
+        }
+        remap_dict = import_static_content(course_dir, content_store, course_id)
+        self.assertEqual(remap_dict, {"example.txt": asset_key})
+        self.assertFalse(content_store.save.called)
+
+        # changed attributes cause the asset to be saved again
+        content_store.get_all_content_summaries_for_course.return_value[unicode(asset_key)]['locked'] = True
+        import_static_content(course_dir, content_store, course_id)
+        self.assertTrue(content_store.save.called)
@@ -0,0 +1,78 @@
+"""
+Tests for the in-process LRU cache.
+"""
+import unittest
+
+from ..util.lru_cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    """
+    Test `LRUCache`.
+    """
+
+    def test_get_and_set(self):
+        cache = LRUCache(2)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('a', 'default'), 'default')
+
+        cache.set('a', 1)
+        cache.set('a', 2)
+        self.assertEqual(cache.get('a'), 2)
+        self.assertEqual(len(cache), 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        # Reading 'a' makes 'b' the least recently used entry
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_bounded_by_size(self):
+        cache = LRUCache(10, size_of=len)
+        cache.set('a', 'aaaa')
+        cache.set('b', 'bbbb')
+        self.assertEqual(cache.size, 8)
+
+        cache.set('c', 'cccc')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 'bbbb')
+        self.assertEqual(cache.get('c'), 'cccc')
+        self.assertEqual(cache.size, 8)
+
+        # Replacing an entry counts its new size only
+        cache.set('b', 'bb')
+        self.assertEqual(cache.size, 6)
+
+    def test_value_larger_than_cache(self):
+        cache = LRUCache(10, size_of=len)
+        cache.set('a', 'aaaa')
+        cache.set('a', 'a' * 11)
+
+        # The value is not cached, and neither is the previous one
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size, 0)
+
+    def test_value_of_unknown_size(self):
+        cache = LRUCache(10, size_of=lambda value: None)
+        cache.set('a', 'aaaa')
+        self.assertIsNone(cache.get('a'))
+
+    def test_delete_and_clear(self):
+        cache = LRUCache(10, size_of=len)
+        cache.set('a', 'aaaa')
+        cache.set('b', 'bbbb')
+
+        cache.delete('a')
+        cache.delete('missing')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size, 4)
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.size, 0)
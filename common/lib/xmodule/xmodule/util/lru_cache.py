@@ -0,0 +1,68 @@
+"""
+A thread-safe, in-process LRU cache.
+"""
+from collections import OrderedDict
+import threading
+
+
+class LRUCache(object):
+    """
+    A thread-safe, in-process cache holding at most `max_size` entries. The
+    least recently used entries are evicted first.
+
+    If `size_of` is given, the cache is bounded by the total `size_of(value)`
+    of its entries instead, e.g. by their length in bytes.  Values whose size
+    is None or more than `max_size` are not cached.
+    """
+
+    def __init__(self, max_size, size_of=None):
+        self.max_size = max_size
+        self.size_of = size_of
+        self.size = 0
+        # key -> (value, size)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value cached for `key`, or `default`."""
+        with self._lock:
+            try:
+                entry = self._entries.pop(key)
+            except KeyError:
+                return default
+            # Mark the entry as the most recently used one
+            self._entries[key] = entry
+            return entry[0]
+
+    def set(self, key, value):
+        """Cache `value` for `key`, evicting the least recently used entries if the cache is full."""
+        size = self.size_of(value) if self.size_of is not None else 1
+        with self._lock:
+            self._remove(key)
+            if size is None or size > self.max_size:
+                return
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_size:
+                __, (__, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def delete(self, key):
+        """Remove the entry for `key`, if any."""
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        """Remove all the entries."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        """Remove the entry for `key`. The caller must hold the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def __len__(self):
+        return len(self._entries)
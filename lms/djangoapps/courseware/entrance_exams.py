@@ -138,7 +138,8 @@ def get_entrance_exam_score(request, course):
         Delegate to get_module_for_descriptor (imported here to avoid circular reference)
         """
         from courseware.module_render import get_module_for_descriptor
-        field_data_cache = FieldDataCache([descriptor], course.id, request.user)
+        field_data_cache = FieldDataCache.for_request(request, course.id)
+        field_data_cache.add_descriptors_to_cache([descriptor])
         return get_module_for_descriptor(
             request.user,
             request,
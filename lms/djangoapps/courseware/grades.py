@@ -1,27 +1,31 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
 from collections import defaultdict
+import hashlib
 import json
 import random
 import logging
 
 from contextlib import contextmanager
+from itertools import islice
 from django.conf import settings
 from django.db import transaction
 from django.test.client import RequestFactory
+from django.utils import timezone
 
 import dogstats_wrapper as dog_stats_api
 
 from courseware import courses
 from courseware.model_data import FieldDataCache
-from student.models import anonymous_id_for_user
+from student.models import anonymous_id_for_user, anonymous_ids_for_users
 from util.module_utils import yield_dynamic_descriptor_descendents
 from xmodule import graders
 from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.util.duedate import get_extended_due_date
-from .models import StudentModule
+from opaque_keys.edx.keys import UsageKey
+from .models import StudentModule, StudentSubsectionGrade
 from .module_render import get_module_for_descriptor
 from submissions import api as sub_api  # installed from the edx-submissions repository
 from opaque_keys import InvalidKeyError
@@ -121,17 +125,272 @@ def answer_distributions(course_key):
     return answer_counts
 
 
+class PersistedSubsectionGrades(object):
+    """
+    The StudentSubsectionGrade rows of one student in one course, together with
+    what is needed to decide whether each of them is still valid.
+
+    All rows and the student's StudentModule rows modified since the oldest of
+    them are loaded with one query each, so checking a subsection does not hit
+    the database.
+    """
+    def __init__(self, student, course_key):
+        self.student = student
+        self.course_key = course_key
+        self.enabled = (
+            settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES', False) and
+            not settings.GENERATE_PROFILE_SCORES and
+            student.is_authenticated()
+        )
+        self._grades = {}
+        self._modified = {}
+        self._dynamic_containers = {}
+
+        if not self.enabled:
+            return
+
+        for subsection_grade in StudentSubsectionGrade.objects.filter(user=student, course_id=course_key):
+            self._grades[subsection_grade.usage_key.map_into_course(course_key)] = subsection_grade
+
+        if self._grades:
+            oldest = min(subsection_grade.computed for subsection_grade in self._grades.values())
+            student_modules = StudentModule.objects.filter(
+                student=student, course_id=course_key, modified__gte=oldest
+            ).only('module_state_key', 'modified')
+            for student_module in student_modules:
+                self._modified[student_module.module_state_key.map_into_course(course_key)] = student_module.modified
+
+    def get(self, section_descriptor, descriptors):
+        """
+        Return the persisted list of Scores for `section_descriptor`, or None if
+        there is no valid entry for it.
+
+        `descriptors` are all the scorable descriptors in the section; the entry
+        is invalid if the student's state for any of them, or for any block with
+        dynamic children in the section (which selects the problems the student
+        gets, e.g. randomize), changed after it was computed.
+        """
+        subsection_grade = self._grades.get(section_descriptor.location)
+        if subsection_grade is None:
+            return None
+
+        if subsection_grade.content_version != _content_version(section_descriptor, descriptors):
+            return None
+
+        locations = [descriptor.location for descriptor in descriptors]
+        locations.extend(self._dynamic_container_locations(section_descriptor))
+        for location in locations:
+            modified = self._modified.get(location)
+            if modified is not None and modified >= subsection_grade.computed:
+                return None
+
+        return [Score(*score) for score in json.loads(subsection_grade.scores)]
+
+    def _dynamic_container_locations(self, section_descriptor):
+        """
+        Return the locations of the blocks with dynamic children in `section_descriptor`.
+        """
+        location = section_descriptor.location
+        if location not in self._dynamic_containers:
+            container_locations = []
+            stack = [section_descriptor]
+            while stack:
+                descriptor = stack.pop()
+                if descriptor.has_dynamic_children():
+                    container_locations.append(descriptor.location)
+                stack.extend(descriptor.get_children())
+            self._dynamic_containers[location] = container_locations
+        return self._dynamic_containers[location]
+
+    def save(self, section_descriptor, descriptors, scores, computed):
+        """
+        Persist `scores` for `section_descriptor`, whose scorable descriptors
+        are `descriptors`, computed starting at the datetime `computed`.
+        """
+        if not self.enabled:
+            return
+
+        subsection_grade = self._grades.get(section_descriptor.location)
+        if subsection_grade is None:
+            subsection_grade = StudentSubsectionGrade(
+                user=self.student,
+                course_id=self.course_key,
+                usage_key=section_descriptor.location,
+            )
+            self._grades[section_descriptor.location] = subsection_grade
+
+        subsection_grade.content_version = _content_version(section_descriptor, descriptors)
+        subsection_grade.computed = computed
+        subsection_grade.scores = json.dumps([list(score) for score in scores])
+        subsection_grade.save()
+
+
+def _content_version(section_descriptor, descriptors):
+    """
+    Return a hash of the content the scores of `section_descriptor` depend on:
+    its grading settings, and the locations, weights, grading settings and
+    content of its scorable `descriptors`.  It changes whenever problems are
+    added, removed, reweighted or edited.
+    """
+    content = [
+        section_descriptor.location,
+        section_descriptor.format,
+        section_descriptor.graded,
+        section_descriptor.due,
+    ]
+    for descriptor in descriptors:
+        content.extend([
+            descriptor.location,
+            descriptor.graded,
+            getattr(descriptor, 'weight', None),
+            descriptor.display_name_with_default,
+            getattr(descriptor, 'data', None),
+        ])
+    return hashlib.sha1(json.dumps(content, default=unicode)).hexdigest()
+
+
+class BulkScoreContext(object):
+    """
+    Data shared while grading a batch of students in one course.
+
+    The grade and max_grade of every StudentModule row of the students are
+    loaded with a single query, so that checking whether a student has touched
+    a section and reading stored problem scores don't hit the database. The
+    scorable descendants of sections without dynamic children are the same for
+    every student, so they are only walked once per context. The anonymous ids
+    of the students in the course, needed to read their submissions scores and
+    to render their modules, are resolved (and created if needed) in bulk too.
+
+    `loaded` is the time just before the scores were loaded: changes made
+    since then may be missing from them.
+    """
+    def __init__(self, course_key, students):
+        self.course_key = course_key
+        self.loaded = timezone.now()
+        self._stored_scores = {}
+        self._section_descendants = {}
+
+        student_ids = [student.id for student in students if student.is_authenticated()]
+        if not student_ids:
+            return
+
+        # Caches the ids on the student objects for anonymous_id_for_user
+        anonymous_ids_for_users(students, course_key)
+
+        student_modules = StudentModule.objects.filter(
+            course_id=course_key,
+            student__in=student_ids,
+        ).values_list('student_id', 'module_state_key', 'grade', 'max_grade')
+
+        for student_id, module_state_key, grade, max_grade in student_modules:
+            try:
+                usage_key = UsageKey.from_string(module_state_key).map_into_course(course_key)
+            except InvalidKeyError:
+                continue
+            self._stored_scores[(student_id, usage_key)] = (grade, max_grade)
+
+    def has_state(self, student, descriptors):
+        """
+        Return whether `student` has a StudentModule row for any of `descriptors`.
+        """
+        return any((student.id, descriptor.location) in self._stored_scores for descriptor in descriptors)
+
+    def stored_score(self, student, usage_key):
+        """
+        Return the (grade, max_grade) stored for `student` on `usage_key`.
+
+        Raises:
+            StudentModule.DoesNotExist: if the student has no state for `usage_key`.
+        """
+        try:
+            return self._stored_scores[(student.id, usage_key)]
+        except KeyError:
+            raise StudentModule.DoesNotExist(usage_key)
+
+    def section_descendants(self, section_descriptor, module_creator):
+        """
+        Return the descendants of `section_descriptor` (including itself) in the
+        order `yield_dynamic_descriptor_descendents` produces them.
+
+        Sections that contain blocks with dynamic children are walked for every
+        call with `module_creator`, since their descendants depend on the student.
+        """
+        location = section_descriptor.location
+        if location not in self._section_descendants:
+            descendants = []
+            stack = [section_descriptor]
+            while stack:
+                descriptor = stack.pop()
+                if descriptor.has_dynamic_children():
+                    descendants = None
+                    break
+                stack.extend(descriptor.get_children())
+                descendants.append(descriptor)
+            self._section_descendants[location] = descendants
+
+        descendants = self._section_descendants[location]
+        if descendants is None:
+            return yield_dynamic_descriptor_descendents(section_descriptor, module_creator)
+        return descendants
+
+
+class GradingFieldDataCache(object):
+    """
+    A single FieldDataCache for `student`, shared by all the modules created
+    while grading `course`.
+
+    The first module created loads all of the student's StudentModules in the
+    course with one query, and the other state of all `descriptors` (the graded
+    descriptors of the course) at once. Descriptors outside of that set, such
+    as containers with dynamic children, are added to the cache as they come.
+    """
+    def __init__(self, course, student, descriptors):
+        self.course = course
+        self.student = student
+        self.descriptors = descriptors
+        self._field_data_cache = None
+        self._cached_locations = set()
+
+    @property
+    def loaded(self):
+        """
+        The time the student's state started being loaded, or None if it hasn't been yet.
+        """
+        return self._field_data_cache.loaded if self._field_data_cache is not None else None
+
+    def _add_descriptors(self, descriptors):
+        """
+        Load the state of `descriptors` into the shared FieldDataCache.
+        """
+        with manual_transaction():
+            if self._field_data_cache is None:
+                self._field_data_cache = FieldDataCache([], self.course.id, self.student)
+                self._field_data_cache.add_all_user_state()
+            self._field_data_cache.add_descriptors_to_cache(descriptors)
+        self._cached_locations.update(descriptor.location for descriptor in descriptors)
+
+    def for_descriptor(self, descriptor):
+        """
+        Return the shared FieldDataCache, making sure it holds the state of `descriptor`.
+        """
+        if self._field_data_cache is None:
+            self._add_descriptors(self.descriptors)
+        if descriptor.location not in self._cached_locations:
+            self._add_descriptors([descriptor])
+        return self._field_data_cache
+
+
 @transaction.commit_manually
-def grade(student, request, course, keep_raw_scores=False):
+def grade(student, request, course, keep_raw_scores=False, bulk_context=None):
     """
     Wraps "_grade" with the manual_transaction context manager just in case
     there are unanticipated errors.
     """
     with manual_transaction():
-        return _grade(student, request, course, keep_raw_scores)
+        return _grade(student, request, course, keep_raw_scores, bulk_context)
 
 
-def _grade(student, request, course, keep_raw_scores):
+def _grade(student, request, course, keep_raw_scores, bulk_context=None):
     """
     Unwrapped version of "grade"
 
@@ -150,6 +409,10 @@ def _grade(student, request, course, keep_raw_scores):
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores
       for every graded module
 
+    If a BulkScoreContext loaded for `student` is passed as `bulk_context`,
+    stored scores are read from it. Otherwise one is loaded for `student`, so
+    that all of the student's stored scores are fetched with a single query.
+
     More information on the format is in the docstring for CourseGrader.
     """
     grading_context = course.grading_context
@@ -162,6 +425,27 @@ def _grade(student, request, course, keep_raw_scores):
         course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id)
     )
 
+    with manual_transaction():
+        persisted_grades = PersistedSubsectionGrades(student, course.id)
+        if bulk_context is None:
+            bulk_context = BulkScoreContext(course.id, [student])
+
+    graded_descriptors = [
+        descriptor
+        for sections in grading_context['graded_sections'].itervalues()
+        for section in sections
+        for descriptor in section['xmoduledescriptors']
+    ]
+    field_data_cache = GradingFieldDataCache(course, student, graded_descriptors)
+
+    def create_module(descriptor):
+        '''creates an XModule instance given a descriptor'''
+        # TODO: We need the request to pass into here. If we could forego that, our arguments
+        # would be simpler
+        return get_module_for_descriptor(
+            student, request, descriptor, field_data_cache.for_descriptor(descriptor), course.id
+        )
+
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
     # passed to the grader
@@ -187,32 +471,31 @@ def _grade(student, request, course, keep_raw_scores):
                     for descriptor in section['xmoduledescriptors']
                 )
 
-            if not should_grade_section:
-                with manual_transaction():
-                    should_grade_section = StudentModule.objects.filter(
-                        student=student,
-                        module_state_key__in=[
-                            descriptor.location for descriptor in section['xmoduledescriptors']
-                        ]
-                    ).exists()
+            # Scores computed earlier can only be reused if neither of the above
+            # forces the section to be regraded.
+            can_persist = not should_grade_section
+            persisted_scores = None
+            if can_persist:
+                persisted_scores = persisted_grades.get(section_descriptor, section['xmoduledescriptors'])
+
+            if persisted_scores is not None:
+                _, graded_total = graders.aggregate_scores(persisted_scores, section_name)
+                if keep_raw_scores:
+                    raw_scores += persisted_scores
+                should_grade_section = False
+            elif not should_grade_section:
+                should_grade_section = bulk_context.has_state(student, section['xmoduledescriptors'])
 
             # If we haven't seen a single problem in the section, we don't have
             # to grade it at all! We can assume 0%
             if should_grade_section:
                 scores = []
 
-                def create_module(descriptor):
-                    '''creates an XModule instance given a descriptor'''
-                    # TODO: We need the request to pass into here. If we could forego that, our arguments
-                    # would be simpler
-                    with manual_transaction():
-                        field_data_cache = FieldDataCache([descriptor], course.id, student)
-                    return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
-
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
+                for module_descriptor in bulk_context.section_descendants(section_descriptor, create_module):
 
                     (correct, total) = get_score(
-                        course.id, student, module_descriptor, create_module, scores_cache=submissions_scores
+                        course.id, student, module_descriptor, create_module, scores_cache=submissions_scores,
+                        bulk_context=bulk_context
                     )
                     if correct is None and total is None:
                         continue
@@ -230,10 +513,18 @@ def _grade(student, request, course, keep_raw_scores):
 
                     scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
 
+                if can_persist:
+                    # The scores are only as recent as the oldest state they were computed from
+                    computed = bulk_context.loaded
+                    if field_data_cache.loaded is not None:
+                        computed = min(computed, field_data_cache.loaded)
+                    with manual_transaction():
+                        persisted_grades.save(section_descriptor, section['xmoduledescriptors'], scores, computed)
+
                 _, graded_total = graders.aggregate_scores(scores, section_name)
                 if keep_raw_scores:
                     raw_scores += scores
-            else:
+            elif persisted_scores is None:
                 graded_total = Score(0.0, 1.0, True, section_name)
 
             #Add the graded total to totaled_scores
@@ -320,9 +611,8 @@ def _progress_summary(student, request, course):
 
     """
     with manual_transaction():
-        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-            course.id, student, course, depth=None
-        )
+        field_data_cache = FieldDataCache.for_request(request, course.id, student)
+        field_data_cache.add_descriptor_descendents(course, depth=None)
         # TODO: We need the request to pass into here. If we could
         # forego that, our arguments would be simpler
         course_module = get_module_for_descriptor(student, request, course, field_data_cache, course.id)
@@ -332,6 +622,17 @@ def _progress_summary(student, request, course):
 
     submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
 
+    with manual_transaction():
+        persisted_grades = PersistedSubsectionGrades(student, course.id)
+
+    # The grading context of each graded section, keyed by section location.
+    # Only graded sections have persisted scores.
+    graded_sections = {
+        section['section_descriptor'].location: section
+        for sections in course.grading_context['graded_sections'].itervalues()
+        for section in sections
+    }
+
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
     for chapter_module in course_module.get_display_items():
@@ -350,17 +651,48 @@ def _progress_summary(student, request, course):
                 graded = section_module.graded
                 scores = []
 
-                module_creator = section_module.xmodule_runtime.get_module
-
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
-                    course_id = course.id
-                    (correct, total) = get_score(
-                        course_id, student, module_descriptor, module_creator, scores_cache=submissions_scores
+                graded_section = graded_sections.get(section_module.location)
+                can_persist = graded_section is not None and not any(
+                    descriptor.always_recalculate_grades or
+                    descriptor.location.to_deprecated_string() in submissions_scores
+                    for descriptor in graded_section['xmoduledescriptors']
+                )
+                persisted_scores = None
+                if can_persist:
+                    persisted_scores = persisted_grades.get(
+                        graded_section['section_descriptor'], graded_section['xmoduledescriptors']
                     )
-                    if correct is None and total is None:
-                        continue
 
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                if persisted_scores is not None:
+                    scores = [
+                        Score(score.earned, score.possible, graded, score.section) for score in persisted_scores
+                    ]
+                else:
+                    # Scores as `_grade` computes them, so that they can be persisted
+                    grading_scores = []
+
+                    module_creator = section_module.xmodule_runtime.get_module
+
+                    for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
+                        course_id = course.id
+                        (correct, total) = get_score(
+                            course_id, student, module_descriptor, module_creator, scores_cache=submissions_scores
+                        )
+                        if correct is None and total is None:
+                            continue
+
+                        scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                        grading_scores.append(Score(
+                            correct, total, module_descriptor.graded and total > 0,
+                            module_descriptor.display_name_with_default
+                        ))
+
+                    if can_persist:
+                        # The scores are only as recent as the state they were computed from
+                        persisted_grades.save(
+                            graded_section['section_descriptor'], graded_section['xmoduledescriptors'],
+                            grading_scores, field_data_cache.loaded
+                        )
 
                 scores.reverse()
                 section_total, _ = graders.aggregate_scores(
@@ -387,7 +719,7 @@ def _progress_summary(student, request, course):
     return chapters
 
 
-def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None):
+def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None, bulk_context=None):
     """
     Return the score for a user on a problem, as a tuple (correct, total).
     e.g. (5,7) if you got 5 out of 7 points.
@@ -401,6 +733,8 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
            Can return None if user doesn't have access, or if something else went wrong.
     scores_cache: A dict of location names to (earned, possible) point tuples.
            If an entry is found in this cache, it takes precedence.
+    bulk_context: A BulkScoreContext loaded for `user`. If given, the stored
+           score is read from it rather than from the database.
     """
     scores_cache = scores_cache or {}
 
@@ -427,18 +761,23 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
         # These are not problems, and do not have a score
         return (None, None)
 
+    student_module = None
     try:
-        student_module = StudentModule.objects.get(
-            student=user,
-            course_id=course_id,
-            module_state_key=problem_descriptor.location
-        )
+        if bulk_context is not None:
+            stored_grade, stored_max_grade = bulk_context.stored_score(user, problem_descriptor.location)
+        else:
+            student_module = StudentModule.objects.get(
+                student=user,
+                course_id=course_id,
+                module_state_key=problem_descriptor.location
+            )
+            stored_grade, stored_max_grade = student_module.grade, student_module.max_grade
     except StudentModule.DoesNotExist:
-        student_module = None
+        stored_grade, stored_max_grade = None, None
 
-    if student_module is not None and student_module.max_grade is not None:
-        correct = student_module.grade if student_module.grade is not None else 0
-        total = student_module.max_grade
+    if stored_max_grade is not None:
+        correct = stored_grade if stored_grade is not None else 0
+        total = stored_max_grade
     else:
         # If the problem was not in the cache, or hasn't been graded yet,
         # we need to instantiate the problem.
@@ -459,7 +798,10 @@ def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=
     weight = problem_descriptor.weight
     if weight is not None:
         if total == 0:
-            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(student_module))
+            log.exception(
+                "Cannot reweight a problem with zero total points. Problem: " +
+                str(student_module if student_module is not None else problem_descriptor.location)
+            )
             return (correct, total)
         correct = correct * weight / total
         total = weight
@@ -480,11 +822,15 @@ def manual_transaction():
         transaction.commit()
 
 
-def iterate_grades_for(course_id, students):
+def iterate_grades_for(course_id, students, chunk_size=100):
     """Given a course_id and an iterable of students (User), yield a tuple of:
 
     (student, gradeset, err_msg) for every student enrolled in the course.
 
+    Students are graded in chunks of `chunk_size`; the stored scores of each
+    chunk are loaded up front with a BulkScoreContext. If that fails, the
+    students of the chunk are graded one by one instead.
+
     If an error occurred, gradeset will be an empty dict and err_msg will be an
     exception message. If there was no error, err_msg is an empty string.
 
@@ -505,25 +851,40 @@ def iterate_grades_for(course_id, students):
     # grading that student.
     request = RequestFactory().get('/')
 
-    for student in students:
-        with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course_id)]):
-            try:
-                request.user = student
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course)
-                yield student, gradeset, ""
-            except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course_id,
-                    exc.message
-                )
-                yield student, {}, exc.message
+    students = iter(students)
+    while True:
+        chunk = list(islice(students, chunk_size))
+        if not chunk:
+            break
+
+        try:
+            bulk_context = BulkScoreContext(course.id, chunk)
+        except Exception:  # pylint: disable=broad-except
+            log.exception(
+                'Cannot load the scores of students %s in course %s, grading them one by one',
+                [student.id for student in chunk],
+                course_id
+            )
+            bulk_context = None
+        for student in chunk:
+            with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course_id)]):
+                try:
+                    request.user = student
+                    # Grading calls problem rendering, which calls masquerading,
+                    # which checks session vars -- thus the empty session dict below.
+                    # It's not pretty, but untangling that is currently beyond the
+                    # scope of this feature.
+                    request.session = {}
+                    gradeset = grade(student, request, course, bulk_context=bulk_context)
+                    yield student, gradeset, ""
+                except Exception as exc:  # pylint: disable=broad-except
+                    # Keep marching on even if this student couldn't be graded for
+                    # some reason, but log it for future reference.
+                    log.exception(
+                        'Cannot grade student %s (%s) in course %s because of exception: %s',
+                        student.username,
+                        student.id,
+                        course_id,
+                        exc.message
+                    )
+                    yield student, {}, exc.message
@@ -3,10 +3,12 @@ Classes to provide the LMS runtime data storage to XBlocks
 """
 
 import json
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from contextlib import contextmanager
 from itertools import chain
 from .models import (
     StudentModule,
+    StudentModuleHistory,
     XModuleUserStateSummaryField,
     XModuleStudentPrefsField,
     XModuleStudentInfoField
@@ -17,6 +19,7 @@ from opaque_keys.edx.block_types import BlockTypeKeyV1
 from opaque_keys.edx.asides import AsideUsageKeyV1
 
 from django.db import DatabaseError
+from django.utils import timezone
 
 from xblock.runtime import KeyValueStore
 from xblock.exceptions import KeyValueMultiSaveError, InvalidScopeError
@@ -42,6 +45,81 @@ def chunks(items, chunk_size):
     return (items[i:i + chunk_size] for i in xrange(0, len(items), chunk_size))
 
 
+# The fields which identify the rows of the models of the scopes other than Scope.user_state
+_FIELD_OBJECT_KEY_FIELDS = {
+    XModuleUserStateSummaryField: ('usage_id', 'field_name'),
+    XModuleStudentPrefsField: ('student_id', 'module_type', 'field_name'),
+    XModuleStudentInfoField: ('student_id', 'field_name'),
+}
+
+
+def _field_object_key(model_class, field_object):
+    """
+    Returns the values identifying `field_object` among the rows of `model_class`.
+    """
+    # usage ids are compared serialized, as deprecated ones are loaded without their run
+    return tuple(unicode(getattr(field_object, name)) for name in _FIELD_OBJECT_KEY_FIELDS[model_class])
+
+
+def flush_field_objects(field_objects):
+    """
+    Writes all the given field objects (models of FieldDataCache) to the database at once.
+
+    Existing StudentModules and fields are updated without loading or signals, and the
+    StudentModuleHistory entries of the StudentModules are inserted with one query. New
+    fields of each scope are inserted with one query too.
+    """
+    now = timezone.now()
+    history_entries = []
+    new_field_objects = defaultdict(list)
+    for field_object in field_objects:
+        model_class = type(field_object)
+        if field_object.pk is None:
+            if model_class is StudentModule:
+                # the primary key is needed by the history entry, which the post_save signal saves
+                field_object.save()
+            else:
+                new_field_objects[model_class].append(field_object)
+            continue
+
+        field_object.modified = now
+        if model_class is StudentModule:
+            StudentModule.objects.filter(pk=field_object.pk).update(
+                state=field_object.state,
+                grade=field_object.grade,
+                max_grade=field_object.max_grade,
+                done=field_object.done,
+                modified=now,
+            )
+            history_entry = StudentModuleHistory.entry_for(field_object)
+            if history_entry is not None:
+                history_entries.append(history_entry)
+        else:
+            model_class.objects.filter(pk=field_object.pk).update(value=field_object.value, modified=now)
+
+    if history_entries:
+        StudentModuleHistory.objects.bulk_create(history_entries)
+
+    for model_class, new_objects in new_field_objects.items():
+        for field_object in new_objects:
+            field_object.created = field_object.modified = now
+        model_class.objects.bulk_create(new_objects)
+
+        # bulk_create doesn't set the primary keys, which later writes of the objects need
+        new_objects_by_key = {
+            _field_object_key(model_class, field_object): field_object for field_object in new_objects
+        }
+        key_field = _FIELD_OBJECT_KEY_FIELDS[model_class][0]
+        stored_objects = model_class.objects.filter(**{
+            'field_name__in': set(field_object.field_name for field_object in new_objects),
+            key_field + '__in': set(getattr(field_object, key_field) for field_object in new_objects),
+        })
+        for stored_object in stored_objects:
+            new_object = new_objects_by_key.get(_field_object_key(model_class, stored_object))
+            if new_object is not None:
+                new_object.pk = stored_object.pk
+
+
 class FieldDataCache(object):
     """
     A cache of django model objects needed to supply the data
@@ -63,6 +141,14 @@ class FieldDataCache(object):
         '''
         self.cache = {}
         self.select_for_update = select_for_update
+        # When the state started being loaded: changes made since may be missing from the cache
+        self.loaded = timezone.now()
+        # The field objects whose writes are deferred, see write_behind
+        self._dirty_field_objects = None
+        # The usage ids of the descriptors whose fields are in the cache
+        self._cached_usage_ids = set()
+        # Whether all of the StudentModules of the user in the course are in the cache
+        self._all_user_state_cached = False
 
         if asides is None:
             self.asides = []
@@ -75,14 +161,59 @@ class FieldDataCache(object):
 
         self.add_descriptors_to_cache(descriptors)
 
+    @classmethod
+    def for_request(cls, request, course_id, user=None):
+        """
+        Returns the FieldDataCache of `user` (the user of `request` by default) in
+        `course_id` which is shared by everything handling `request`.
+
+        The first call loads all of the user's StudentModules in the course with a
+        single query. Later calls return the same cache, to which the callers add
+        the descriptors they need, so that the state already loaded isn't queried
+        again, and the modules of the request see each other's changes.
+        """
+        if user is None:
+            user = request.user
+        if not hasattr(request, '_field_data_caches'):
+            request._field_data_caches = {}  # pylint: disable=protected-access
+
+        cache_key = (user.id, course_id)
+        field_data_cache = request._field_data_caches.get(cache_key)  # pylint: disable=protected-access
+        if field_data_cache is None:
+            field_data_cache = cls([], course_id, user)
+            field_data_cache.add_all_user_state()
+            request._field_data_caches[cache_key] = field_data_cache  # pylint: disable=protected-access
+        return field_data_cache
+
     def add_descriptors_to_cache(self, descriptors):
         """
         Add all `descriptors` to this FieldDataCache.
+
+        Descriptors which are already in the cache are skipped, and the field
+        objects already in the cache are kept, as they may have been changed.
         """
+        descriptors = [
+            descriptor for descriptor in descriptors
+            if descriptor.scope_ids.usage_id not in self._cached_usage_ids
+        ]
         if self.user.is_authenticated():
             for scope, fields in self._fields_to_cache(descriptors).items():
                 for field_object in self._retrieve_fields(scope, fields, descriptors):
-                    self.cache[self._cache_key_from_field_object(scope, field_object)] = field_object
+                    self.cache.setdefault(self._cache_key_from_field_object(scope, field_object), field_object)
+        self._cached_usage_ids.update(descriptor.scope_ids.usage_id for descriptor in descriptors)
+
+    def add_all_user_state(self):
+        """
+        Add all of the user's StudentModules in the course to this FieldDataCache,
+        with a single query, so that no StudentModule is queried for the
+        descriptors added later.
+        """
+        if self._all_user_state_cached or not self.user.is_authenticated():
+            return
+
+        for field_object in self._query(StudentModule, course_id=self.course_id, student=self.user.pk):
+            self.cache.setdefault(self._cache_key_from_field_object(Scope.user_state, field_object), field_object)
+        self._all_user_state_cached = True
 
     def add_descriptor_descendents(self, descriptor, depth=None, descriptor_filter=lambda descriptor: True):
         """
@@ -199,6 +330,8 @@ class FieldDataCache(object):
         Queries the database for all of the fields in the specified scope
         """
         if scope == Scope.user_state:
+            if self._all_user_state_cached:
+                return []
             return self._chunked_query(
                 StudentModule,
                 'module_state_key__in',
@@ -267,6 +400,56 @@ class FieldDataCache(object):
         elif scope == Scope.user_info:
             return (scope, field_object.field_name)
 
+    @contextmanager
+    def write_behind(self):
+        """
+        Defers the writes of the field objects of this cache until the end of the block,
+        e.g. of an xblock handler, so that the several writes of each field object (one per
+        save of the block and grade event) are coalesced into one, and written in bulk.
+
+        The writes made in the block are flushed even if it raises. Nested blocks are
+        flushed with the outermost one.
+        """
+        if self._dirty_field_objects is not None:
+            yield
+            return
+
+        self._dirty_field_objects = OrderedDict()
+        try:
+            yield
+        finally:
+            self.flush()
+            self._dirty_field_objects = None
+
+    def flush(self):
+        """
+        Writes the field objects whose writes are deferred by the current write_behind
+        block now, for code which reads them back from the database.
+        """
+        if self._dirty_field_objects:
+            dirty_field_objects = self._dirty_field_objects.values()
+            self._dirty_field_objects.clear()
+            flush_field_objects(dirty_field_objects)
+
+    def save_field_object(self, field_object):
+        """
+        Saves `field_object` (a model returned by find_or_create), or defers it until
+        the end of the current write_behind block.
+        """
+        if self._dirty_field_objects is not None:
+            self._dirty_field_objects[id(field_object)] = field_object
+        else:
+            field_object.save(force_update=field_object.pk is not None)
+
+    def delete_field_object(self, field_object):
+        """
+        Deletes `field_object`, dropping any deferred write of it.
+        """
+        if self._dirty_field_objects is not None:
+            self._dirty_field_objects.pop(id(field_object), None)
+        if field_object.pk is not None:
+            field_object.delete()
+
     def find(self, key):
         '''
         Look for a model data object using an DjangoKeyValueStore.Key object
@@ -405,7 +588,7 @@ class DjangoKeyValueStore(KeyValueStore):
         for field_object, names in dirty_field_objects.values():
             try:
                 # Save the field object that we made above
-                field_object.save(force_update=field_object.pk is not None)
+                self._field_data_cache.save_field_object(field_object)
                 # If save is successful on this scope, add the saved fields to
                 # the list of successful saves
                 saved_fields.extend(names)
@@ -425,9 +608,9 @@ class DjangoKeyValueStore(KeyValueStore):
             state = json.loads(field_object.state)
             del state[key.field_name]
             field_object.state = json.dumps(state)
-            field_object.save(force_update=field_object.pk is not None)
+            self._field_data_cache.save_field_object(field_object)
         else:
-            field_object.delete()
+            self._field_data_cache.delete_field_object(field_object)
 
     def has(self, key):
         if key.scope not in self._allowed_scopes:
@@ -15,7 +15,7 @@ ASSUMPTIONS: modules have unique IDs, even across different module_types
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField
@@ -114,6 +114,21 @@ class StudentModuleHistory(models.Model):
     grade = models.FloatField(null=True, blank=True)
     max_grade = models.FloatField(null=True, blank=True)
 
+    @classmethod
+    def entry_for(cls, student_module):
+        """
+        Returns an unsaved StudentModuleHistory entry of the current state of
+        `student_module`, or None if its module_type is not one that we save.
+        """
+        if student_module.module_type not in cls.HISTORY_SAVING_TYPES:
+            return None
+        return cls(student_module=student_module,
+                   version=None,
+                   created=student_module.modified,
+                   state=student_module.state,
+                   grade=student_module.grade,
+                   max_grade=student_module.max_grade)
+
     @receiver(post_save, sender=StudentModule)
     def save_history(sender, instance, **kwargs):  # pylint: disable=no-self-argument, unused-argument
         """
@@ -121,13 +136,8 @@ class StudentModuleHistory(models.Model):
         StudentModuleHistory entry if the module_type is one that
         we save.
         """
-        if instance.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES:
-            history_entry = StudentModuleHistory(student_module=instance,
-                                                 version=None,
-                                                 created=instance.modified,
-                                                 state=instance.state,
-                                                 grade=instance.grade,
-                                                 max_grade=instance.max_grade)
+        history_entry = StudentModuleHistory.entry_for(instance)
+        if history_entry is not None:
             history_entry.save()
 
 
@@ -230,3 +240,45 @@ class OfflineComputedGradeLog(models.Model):
 
     def __unicode__(self):
         return "[OCGLog] %s: %s" % (self.course_id.to_deprecated_string(), self.created)  # pylint: disable=no-member
+
+
+class StudentSubsectionGrade(models.Model):
+    """
+    Scores a student earned on the problems of one graded subsection, as last
+    computed by `courseware.grades`.
+
+    A row stays valid for as long as the subsection's content is unchanged
+    (tracked through `content_version`) and none of the student's
+    StudentModule rows in the subsection were modified after `computed`.
+    The rows of a student in a course are deleted with any of their
+    StudentModule rows there.
+    """
+    class Meta(object):  # pylint: disable=missing-docstring
+        unique_together = (('user', 'course_id', 'usage_key'),)
+
+    user = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    usage_key = LocationKeyField(max_length=255, db_index=True)
+
+    # Version stamp of the subsection content the scores were computed against
+    content_version = models.CharField(max_length=255, null=True, blank=True)
+
+    # When the computation of these scores started
+    computed = models.DateTimeField(db_index=True)
+
+    # JSON list of [earned, possible, graded, display_name] entries, one per problem
+    scores = models.TextField(default='[]')
+
+    def __unicode__(self):
+        return u"[StudentSubsectionGrade] {}: {} {} = {}".format(
+            self.user_id, self.course_id, self.usage_key, self.scores
+        )
+
+    @receiver(post_delete, sender=StudentModule)
+    def delete_for_student_module(sender, instance, **kwargs):  # pylint: disable=no-self-argument, unused-argument
+        """
+        Deletes the subsection grades of the student in the course of a deleted
+        StudentModule.  Whether a grade is valid is decided from the state
+        modified after it was computed, which doesn't show deleted state.
+        """
+        StudentSubsectionGrade.objects.filter(user_id=instance.student_id, course_id=instance.course_id).delete()
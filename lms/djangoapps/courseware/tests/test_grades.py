@@ -5,13 +5,13 @@ from django.http import Http404
 from mock import patch
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
-from courseware.grades import grade, iterate_grades_for
+from courseware.grades import BulkScoreContext, grade, iterate_grades_for
 from student.tests.factories import UserFactory
 from xmodule.modulestore.tests.factories import CourseFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 
-def _grade_with_errors(student, request, course, keep_raw_scores=False):
+def _grade_with_errors(student, request, course, keep_raw_scores=False, bulk_context=None):
     """This fake grade method will throw exceptions for student3 and
     student4, but allow any other students to go through normal grading.
 
@@ -22,7 +22,18 @@ def _grade_with_errors(student, request, course, keep_raw_scores=False):
     if student.username in ['student3', 'student4']:
         raise Exception("I don't like {}".format(student.username))
 
-    return grade(student, request, course, keep_raw_scores=keep_raw_scores)
+    return grade(student, request, course, keep_raw_scores=keep_raw_scores, bulk_context=bulk_context)
+
+
+def _bulk_context_with_errors(course_key, students):
+    """This fake BulkScoreContext throws an exception when loading the scores
+    of a chunk of students, but not those of a single student, which is what
+    grading one student does.
+    """
+    if len(students) > 1:
+        raise Exception("Can't load the scores of {} students".format(len(students)))
+
+    return BulkScoreContext(course_key, students)
 
 
 class TestGradeIteration(ModuleStoreTestCase):
@@ -72,6 +83,25 @@ class TestGradeIteration(ModuleStoreTestCase):
             self.assertIsNone(gradeset['grade'])
             self.assertEqual(gradeset['percent'], 0.0)
 
+    def test_chunked_grading(self):
+        """Students are graded in chunks; every student should still get
+        exactly one gradeset, in order."""
+        gradeset_results = list(iterate_grades_for(self.course.id, self.students, chunk_size=2))
+        self.assertEqual([student for student, _, _ in gradeset_results], self.students)
+        for _, gradeset, err_msg in gradeset_results:
+            self.assertEqual(err_msg, "")
+            self.assertEqual(gradeset['percent'], 0.0)
+
+    @patch('courseware.grades.BulkScoreContext', _bulk_context_with_errors)
+    def test_bulk_context_exception(self):
+        """If the stored scores of a chunk can't be loaded up front, its
+        students should still be graded, one by one."""
+        all_gradesets, all_errors = self._gradesets_and_errors_for(self.course.id, self.students)
+        self.assertEqual(all_errors, {})
+        self.assertEqual(len(all_gradesets), 5)
+        for gradeset in all_gradesets.values():
+            self.assertEqual(gradeset['percent'], 0.0)
+
     @patch('courseware.grades.grade', _grade_with_errors)
     def test_grading_exception(self):
         """Test that we correctly capture exception messages that bubble up from
@@ -7,7 +7,7 @@ from functools import partial
 
 from courseware.model_data import DjangoKeyValueStore
 from courseware.model_data import InvalidScopeError, FieldDataCache
-from courseware.models import StudentModule
+from courseware.models import StudentModule, StudentModuleHistory
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
 from student.tests.factories import UserFactory
@@ -19,6 +19,7 @@ from xblock.fields import Scope, BlockScope, ScopeIds
 from xblock.exceptions import KeyValueMultiSaveError
 from xblock.core import XBlock
 from django.test import TestCase
+from django.test.client import RequestFactory
 from django.db import DatabaseError
 
 
@@ -207,6 +208,65 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
                 self.kvs.set_many(kv_dict)
         self.assertEquals(len(exception_context.exception.saved_field_names), 0)
 
+    def test_write_behind(self):
+        "Test that the writes to a StudentModule in a write_behind block are coalesced"
+        history_count = StudentModuleHistory.objects.count()
+
+        # The StudentModule is updated once, and its history written once, at the end of the block
+        with self.assertNumQueries(2):
+            with self.field_data_cache.write_behind():
+                with self.assertNumQueries(0):
+                    self.kvs.set(user_state_key('a_field'), 'new_value')
+                    self.kvs.set_many(self.construct_kv_dict())
+                    self.kvs.delete(user_state_key('b_field'))
+
+        self.assertEquals(history_count + 1, StudentModuleHistory.objects.count())
+        self.assertEquals(
+            {'a_field': 'new_value', 'field_a': 'new value', 'field_b': 'newer value'},
+            json.loads(StudentModule.objects.get().state)
+        )
+        self.assertEquals(StudentModule.objects.get().state, StudentModuleHistory.objects.latest().state)
+
+
+class TestRequestFieldDataCache(TestCase):
+    """Tests for the FieldDataCache shared by a request"""
+    def setUp(self):
+        super(TestRequestFieldDataCache, self).setUp()
+        student_module = StudentModuleFactory(state=json.dumps({'a_field': 'a_value'}))
+        self.user = student_module.student
+        self.assertEqual(self.user.id, 1)   # check our assumption hard-coded in the key functions above.
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+        self.descriptor = mock_descriptor([mock_field(Scope.user_state, 'a_field')])
+
+    def test_shared_cache(self):
+        "Test that the cache of a request loads all of the user's state once"
+        with self.assertNumQueries(1):
+            field_data_cache = FieldDataCache.for_request(self.request, course_id)
+
+        with self.assertNumQueries(0):
+            self.assertIs(field_data_cache, FieldDataCache.for_request(self.request, course_id, self.user))
+            field_data_cache.add_descriptors_to_cache([self.descriptor])
+            kvs = DjangoKeyValueStore(field_data_cache)
+            self.assertEquals('a_value', kvs.get(user_state_key('a_field')))
+
+    def test_cache_per_request(self):
+        "Test that each request has its own cache"
+        field_data_cache = FieldDataCache.for_request(self.request, course_id)
+        other_request = RequestFactory().get('/')
+        other_request.user = self.user
+        self.assertIsNot(field_data_cache, FieldDataCache.for_request(other_request, course_id))
+
+    def test_add_cached_descriptor(self):
+        "Test that adding a descriptor again keeps the state in the cache"
+        field_data_cache = FieldDataCache([self.descriptor], course_id, self.user)
+        kvs = DjangoKeyValueStore(field_data_cache)
+        field_data_cache.find(user_state_key('a_field')).state = json.dumps({'a_field': 'new_value'})
+
+        with self.assertNumQueries(0):
+            field_data_cache.add_descriptors_to_cache([self.descriptor])
+        self.assertEquals('new_value', kvs.get(user_state_key('a_field')))
+
 
 class TestMissingStudentModule(TestCase):
     def setUp(self):
@@ -370,6 +430,27 @@ class StorageTestBase(object):
         exception = exception_context.exception
         self.assertEquals(len(exception.saved_field_names), 1)
 
+    def test_write_behind(self):
+        """Test that the writes in a write_behind block are made in bulk at its end"""
+        # One update of the existing field, and one insert and one lookup of the new fields
+        with self.assertNumQueries(3):
+            with self.field_data_cache.write_behind():
+                with self.assertNumQueries(0):
+                    self.kvs.set(self.key_factory('existing_field'), 'test_value')
+                    self.kvs.set(self.key_factory('missing_field'), 'new_value')
+                    self.kvs.set(self.key_factory('other_missing_field'), 'other_value')
+                    self.kvs.set(self.key_factory('missing_field'), 'newer_value')
+
+        self.assertEquals(3, self.storage_class.objects.all().count())
+        self.assertEquals('test_value', json.loads(self.storage_class.objects.get(field_name='existing_field').value))
+        self.assertEquals('newer_value', json.loads(self.storage_class.objects.get(field_name='missing_field').value))
+
+        # The new fields know their rows, so they are updated rather than inserted again
+        with self.assertNumQueries(1):
+            self.kvs.set(self.key_factory('missing_field'), 'newest_value')
+        self.assertEquals(3, self.storage_class.objects.all().count())
+        self.assertEquals('newest_value', json.loads(self.storage_class.objects.get(field_name='missing_field').value))
+
 
 class TestUserStateSummaryStorage(StorageTestBase, TestCase):
     """Tests for UserStateSummaryStorage"""
@@ -17,7 +17,7 @@ from capa.tests.response_xml_factory import (
     CodeResponseXMLFactory,
 )
 from courseware import grades
-from courseware.models import StudentModule
+from courseware.models import StudentModule, StudentSubsectionGrade
 from courseware.tests.helpers import LoginEnrollmentTestCase
 from lms.djangoapps.lms_xblock.runtime import quote_slashes
 from student.tests.factories import UserFactory
@@ -462,6 +462,34 @@ class TestCourseGrader(TestSubmittingProblems):
         self.check_grade_percent(1.0)
         self.assertEqual(self.get_grade_summary()['grade'], 'A')
 
+    def test_bulk_grading(self):
+        """
+        Check that grading through iterate_grades_for, which reads stored
+        scores from a BulkScoreContext, matches grading a single student.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.submit_question_answer('p2', {'2_1': 'Incorrect'})
+
+        [(student, gradeset, err_msg)] = list(grades.iterate_grades_for(self.course.id, [self.student_user]))
+        self.assertEqual(student, self.student_user)
+        self.assertEqual(err_msg, "")
+        self.assertEqual(gradeset['percent'], self.get_grade_summary()['percent'])
+        self.assertEqual(gradeset['percent'], 0.33)
+
+    def test_shared_field_data_cache(self):
+        """
+        Check that the modules created while grading a student share a single
+        FieldDataCache.
+        """
+        self.basic_setup()
+        # The unanswered problems have no stored score, so modules are created for them
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+
+        with patch('courseware.grades.FieldDataCache', wraps=grades.FieldDataCache) as mock_field_data_cache:
+            self.check_grade_percent(0.33)
+        self.assertEqual(mock_field_data_cache.call_count, 1)
+
     def test_wrong_answers(self):
         """
         Check that answering incorrectly is graded properly.
@@ -593,6 +621,115 @@ class TestCourseGrader(TestSubmittingProblems):
         self.assertEqual(self.score_for_hw('homework3'), [1.0, 1.0])
 
 
+@patch.dict(settings.FEATURES, {'ENABLE_PERSISTENT_SUBSECTION_GRADES': True})
+class TestPersistentSubsectionGrades(TestCourseGrader):
+    """
+    Check that subsection scores are persisted and reused until they change.
+    """
+    def persisted_scores(self):
+        """
+        Return the list of earned points persisted for the homework section, in course order.
+        """
+        subsection_grade = StudentSubsectionGrade.objects.get(
+            user=self.student_user, course_id=self.course.id, usage_key=self.homework.location
+        )
+        # Scores are persisted in the order grading walks the section, the reverse of the course's
+        return [score[0] for score in reversed(json.loads(subsection_grade.scores))]
+
+    def test_scores_persisted(self):
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+        self.assertEqual(self.persisted_scores(), [1.0, 0.0, 0.0])
+
+    def test_persisted_scores_reused(self):
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        with patch('courseware.grades.get_score') as mock_get_score:
+            self.check_grade_percent(0.33)
+            self.assertEqual(self.score_for_hw('homework'), [1.0, 0.0, 0.0])
+            self.assertFalse(mock_get_score.called)
+
+    def test_changed_score_invalidates(self):
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        self.submit_question_answer('p2', {'2_1': 'Correct'})
+        self.check_grade_percent(0.67)
+        self.assertEqual(self.persisted_scores(), [1.0, 1.0, 0.0])
+
+    def test_changes_since_scores_loaded_invalidate(self):
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        bulk_context = grades.BulkScoreContext(self.course.id, [self.student_user])
+        self.submit_question_answer('p2', {'2_1': 'Correct'})
+
+        # Graded with the stored scores loaded before p2 was answered
+        fake_request = self.factory.get(
+            reverse('progress', kwargs={'course_id': self.course.id.to_deprecated_string()})
+        )
+        grade_summary = grades.grade(self.student_user, fake_request, self.course, bulk_context=bulk_context)
+        self.assertEqual(grade_summary['percent'], 0.33)
+        self.assertEqual(self.persisted_scores(), [1.0, 0.0, 0.0])
+
+        self.check_grade_percent(0.67)
+        self.assertEqual(self.persisted_scores(), [1.0, 1.0, 0.0])
+
+    def test_content_edit_invalidates(self):
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        self.add_dropdown_to_section(self.homework.location, 'p4', 1)
+        self.check_grade_percent(0.25)
+        self.assertEqual(self.persisted_scores(), [1.0, 0.0, 0.0, 0.0])
+
+    def test_dynamic_children_state_invalidates(self):
+        self.basic_setup()
+        randomize = ItemFactory.create(
+            parent_location=self.homework.location, category='randomize', display_name='Randomize'
+        )
+        self.add_dropdown_to_section(randomize.location, 'p4', 1)
+        self.add_dropdown_to_section(randomize.location, 'p5', 2)
+        randomize_state = StudentModule.objects.create(
+            student=self.student_user,
+            course_id=self.course.id,
+            module_state_key=randomize.location,
+            module_type='randomize',
+            state=json.dumps({'choice': 0}),
+        )
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.25)
+
+        # The student gets p5 instead of p4
+        randomize_state.state = json.dumps({'choice': 1})
+        randomize_state.save()
+        self.check_grade_percent(0.2)
+        self.assertEqual(self.persisted_scores(), [1.0, 0.0, 0.0, 0.0])
+
+    def test_state_delete_invalidates(self):
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        StudentModule.objects.get(student=self.student_user, module_state_key=self.problem_location('p1')).delete()
+        self.assertFalse(StudentSubsectionGrade.objects.filter(user=self.student_user).exists())
+        self.check_grade_percent(0)
+
+    def test_submissions_api_scores_not_persisted(self):
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        with patch('submissions.api.get_scores') as mock_get_scores:
+            mock_get_scores.return_value = {
+                self.problem_location('p3').to_deprecated_string(): (1, 1)
+            }
+            self.check_grade_percent(0.67)
+        self.assertFalse(StudentSubsectionGrade.objects.filter(user=self.student_user).exists())
+
+
 class ProblemWithUploadedFilesTest(TestSubmittingProblems):
     """Tests of problems with uploaded files."""
 
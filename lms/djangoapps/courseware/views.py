@@ -400,8 +400,8 @@ def _index_bulk_op(request, course_key, chapter, section, position):
     masquerade = setup_masquerade(request, course_key, staff_access)
 
     try:
-        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-            course_key, user, course, depth=2)
+        field_data_cache = FieldDataCache.for_request(request, course_key, user)
+        field_data_cache.add_descriptor_descendents(course, depth=2)
 
         course_module = get_module_for_descriptor(user, request, course, field_data_cache, course_key)
         if course_module is None:
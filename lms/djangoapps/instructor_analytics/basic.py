@@ -35,6 +35,9 @@ AVAILABLE_FEATURES = STUDENT_FEATURES + PROFILE_FEATURES
 COURSE_REGISTRATION_FEATURES = ('code', 'course_id', 'created_by', 'created_at')
 COUPON_FEATURES = ('code', 'course_id', 'percentage_discount', 'description', 'expiration_date', 'is_active')
 
+# How many students `iter_enrolled_students_features` loads per query.
+STUDENT_FEATURES_CHUNK_SIZE = 1000
+
 
 def sale_order_record_features(course_id, features):
     """
@@ -159,6 +162,15 @@ def enrolled_students_features(course_key, features):
         {'username': 'username3', 'first_name': 'firstname3'}
     ]
     """
+    return list(iter_enrolled_students_features(course_key, features))
+
+
+def iter_enrolled_students_features(course_key, features, chunk_size=STUDENT_FEATURES_CHUNK_SIZE):
+    """
+    Yield the student features of `enrolled_students_features` one student at
+    a time, loading `chunk_size` students per query, so that the students of
+    a large course are never all in memory.
+    """
     include_cohort_column = 'cohort' in features
 
     students = User.objects.filter(
@@ -206,7 +218,14 @@ def enrolled_students_features(course_key, features):
             )
         return student_dict
 
-    return [extract_student(student, features) for student in students]
+    # Each chunk starts after the last username of the previous one.
+    chunk = list(students[:chunk_size])
+    while chunk:
+        for student in chunk:
+            yield extract_student(student, features)
+        if len(chunk) < chunk_size:
+            break
+        chunk = list(students.filter(username__gt=chunk[-1].username)[:chunk_size])
 
 
 def coupon_codes_features(features, coupons_list):
@@ -64,19 +64,31 @@ def format_dictlist(dictlist, features):
     }
     """
 
-    def dict_to_entry(dct):
-        """ Convert dictionary to a list for a csv row """
-        relevant_items = [(k, v) for (k, v) in dct.items() if k in features]
-        ordered = sorted(relevant_items, key=lambda (k, v): header.index(k))
-        vals = [v for (_, v) in ordered]
-        return vals
+    header = features
+    datarows = [_dict_to_entry(dct, header) for dct in dictlist]
+
+    return header, datarows
+
 
+def format_dictiter(dicts, features):
+    """
+    Like `format_dictlist`, but `dicts` may be any iterable of dictionaries,
+    such as a generator: `datarows` is an iterator converting them as it goes.
+    """
     header = features
-    datarows = map(dict_to_entry, dictlist)
+    datarows = (_dict_to_entry(dct, header) for dct in dicts)
 
     return header, datarows
 
 
+def _dict_to_entry(dct, header):
+    """ Convert dictionary to a list for a csv row """
+    relevant_items = [(k, v) for (k, v) in dct.items() if k in header]
+    ordered = sorted(relevant_items, key=lambda (k, v): header.index(k))
+    vals = [v for (_, v) in ordered]
+    return vals
+
+
 def format_instances(instances, features):
     """
     Convert a list of instances into a header list and datarows list.
@@ -15,7 +15,7 @@ from shoppingcart.models import (
 from course_modes.models import CourseMode
 from instructor_analytics.basic import (
     sale_record_features, sale_order_record_features, enrolled_students_features, course_registration_features,
-    coupon_codes_features, AVAILABLE_FEATURES, STUDENT_FEATURES, PROFILE_FEATURES
+    coupon_codes_features, iter_enrolled_students_features, AVAILABLE_FEATURES, STUDENT_FEATURES, PROFILE_FEATURES
 )
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 from courseware.tests.factories import InstructorFactory
@@ -65,6 +65,13 @@ class TestAnalyticsBasic(ModuleStoreTestCase):
             self.assertIn(userreport['email'], [user.email for user in self.users])
             self.assertIn(userreport['name'], [user.profile.name for user in self.users])
 
+    def test_iter_enrolled_students_features_chunks(self):
+        userreports = iter_enrolled_students_features(self.course_key, ['username'], chunk_size=7)
+        # 30 students in chunks of 7
+        with self.assertNumQueries(5):
+            usernames = [userreport['username'] for userreport in userreports]
+        self.assertEqual(usernames, sorted(user.username for user in self.users))
+
     def test_enrolled_students_meta_features_keys(self):
         """
         Assert that we can query individual fields in the 'meta' field in the UserProfile
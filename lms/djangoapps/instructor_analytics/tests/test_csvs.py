@@ -3,7 +3,7 @@
 from django.test import TestCase
 from nose.tools import raises
 
-from instructor_analytics.csvs import create_csv_response, format_dictlist, format_instances
+from instructor_analytics.csvs import create_csv_response, format_dictiter, format_dictlist, format_instances
 
 
 class TestAnalyticsCSVS(TestCase):
@@ -71,6 +71,14 @@ class TestAnalyticsFormatDictlist(TestCase):
         self.assertEqual(header, [])
         self.assertEqual(datarows, [])
 
+    def test_format_dictiter(self):
+        dicts = ({'label1': 'value-{},1'.format(i), 'label2': 'value-{},2'.format(i)} for i in (1, 2))
+        header, datarows = format_dictiter(dicts, ['label2'])
+
+        self.assertEqual(header, ['label2'])
+        self.assertEqual(next(datarows), ['value-1,2'])
+        self.assertEqual(list(datarows), [['value-2,2']])
+
     def test_create_csv_response(self):
         header = ['Name', 'Email']
         datarows = [['Jim', 'jim@edy.org'], ['Jake', 'jake@edy.org'], ['Jeeves', 'jeeves@edy.org']]
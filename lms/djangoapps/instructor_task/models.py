@@ -12,14 +12,18 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+from contextlib import contextmanager
 from cStringIO import StringIO
 from gzip import GzipFile
 from uuid import uuid4
 import csv
 import json
 import hashlib
+import os
 import os.path
+import tempfile
 import urllib
+import zlib
 
 from boto.s3.connection import S3Connection
 from boto.s3.key import Key
@@ -193,9 +197,8 @@ class InstructorTask(models.Model):
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download. Rows are written incrementally (see `rows_writer()`), so reports
+    never need to be held in memory as a whole.
     """
     @classmethod
     def from_config(cls):
@@ -209,6 +212,33 @@ class ReportStore(object):
         elif storage_type.lower() == "localfs":
             return LocalFSReportStore.from_config()
 
+    def open_for_writing(self, course_id, filename):
+        """
+        Return a context manager yielding a file-like object to which the
+        contents of `filename` are written. The file only becomes visible
+        once the block exits without raising an exception; otherwise it is
+        discarded. Implemented by subclasses.
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def rows_writer(self, course_id, filename):
+        """
+        Context manager yielding a `CSVRowsWriter` that appends rows to the
+        CSV file `filename` of `course_id` as they are written.
+        """
+        with self.open_for_writing(course_id, filename) as output:
+            yield CSVRowsWriter(output, self._get_utf8_encoded_rows)
+
+    def store_rows(self, course_id, filename, rows):
+        """
+        Given a `course_id`, `filename`, and `rows` (each row is an iterable of
+        strings), write the rows out as a CSV file. `rows` may be a generator;
+        it is consumed incrementally.
+        """
+        with self.rows_writer(course_id, filename) as writer:
+            writer.writerows(rows)
+
     def _get_utf8_encoded_rows(self, rows):
         """
         Given a list of `rows` containing unicode strings, return a
@@ -218,6 +248,14 @@ class ReportStore(object):
         for row in rows:
             yield [unicode(item).encode('utf-8') for item in row]
 
+    def _get_utf8_decoded_rows(self, rows):
+        """
+        Given `rows` read from a CSV file, yield each row with its values
+        decoded from utf-8 into unicode strings.
+        """
+        for row in rows:
+            yield [item.decode('utf-8') for item in row]
+
 
 class S3ReportStore(ReportStore):
     """
@@ -305,32 +343,79 @@ class S3ReportStore(ReportStore):
             }
         )
 
-    def store_rows(self, course_id, filename, rows):
+    @contextmanager
+    def open_for_writing(self, course_id, filename):
         """
-        Given a `course_id`, `filename`, and `rows` (each row is an iterable of
-        strings), create a buffer that is a gzip'd csv file, and then `store()`
-        that buffer.
+        Context manager yielding a file-like object whose contents are gzipped
+        and uploaded to S3 as `filename` for `course_id`.
 
-        Even though we store it in gzip format, browsers will transparently
-        download and decompress it. Filenames should end in `.csv`, not `.gz`.
+        Compressed data is sent in parts of `S3MultipartUpload.PART_SIZE` bytes
+        as it is produced, so memory use doesn't grow with the file size. Even
+        though we store it in gzip format, browsers will transparently download
+        and decompress it. Filenames should end in `.csv`, not `.gz`.
+        """
+        upload = S3MultipartUpload(self.bucket, self.key_for(course_id, filename))
+        gzip_file = GzipFile(fileobj=upload, mode="wb")
+        try:
+            yield gzip_file
+            gzip_file.close()
+            upload.complete()
+        except Exception:
+            upload.cancel()
+            raise
+
+    def read_rows(self, course_id, filename):
         """
-        output_buffer = StringIO()
-        gzip_file = GzipFile(fileobj=output_buffer, mode="wb")
-        csvwriter = csv.writer(gzip_file)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        gzip_file.close()
+        Yield the rows of the CSV file stored by `store_rows()` as `filename`
+        for `course_id`, as lists of unicode strings. The file is downloaded
+        and decompressed incrementally.
+        """
+        def gunzipped_lines(key):
+            """Yield the decompressed lines of the gzipped contents of `key`."""
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            pending = ''
+            for chunk in key:
+                pending += decompressor.decompress(chunk)
+                lines = pending.split('\n')
+                pending = lines.pop()
+                for line in lines:
+                    yield line + '\n'
+            pending += decompressor.flush()
+            if pending:
+                yield pending
+
+        key = self.key_for(course_id, filename)
+        for row in self._get_utf8_decoded_rows(csv.reader(gunzipped_lines(key))):
+            yield row
 
-        self.store(course_id, filename, output_buffer)
+    def delete(self, course_id, filename):
+        """Delete the file stored as `filename` for `course_id`."""
+        self.key_for(course_id, filename).delete()
+
+    def filenames_in(self, course_id, directory):
+        """
+        Return the sorted names of the files stored under `directory` for
+        `course_id`, relative to the course's root.
+        """
+        course_dir = self.key_for(course_id, '')
+        directory_key = self.key_for(course_id, directory + '/')
+        return sorted(
+            key.key[len(course_dir.key):]
+            for key in self.bucket.list(prefix=directory_key.key)
+        )
 
     def links_for(self, course_id):
         """
         For a given `course_id`, return a list of `(filename, url)` tuples. `url`
-        can be plugged straight into an href
+        can be plugged straight into an href. Files stored in subdirectories
+        (e.g. the parts of a report that is still being generated) are not
+        included.
         """
         course_dir = self.key_for(course_id, '')
         return [
             (key.key.split("/")[-1], key.generate_url(expires_in=300))
             for key in sorted(self.bucket.list(prefix=course_dir.key), reverse=True, key=lambda k: k.last_modified)
+            if "/" not in key.key[len(course_dir.key):]
         ]
 
 
@@ -381,21 +466,60 @@ class LocalFSReportStore(ReportStore):
         full_path = self.path_to(course_id, filename)
         directory = os.path.dirname(full_path)
         if not os.path.exists(directory):
-            os.mkdir(directory)
+            os.makedirs(directory)
 
         with open(full_path, "wb") as f:
             f.write(buff.getvalue())
 
-    def store_rows(self, course_id, filename, rows):
+    @contextmanager
+    def open_for_writing(self, course_id, filename):
+        """
+        Context manager yielding a file to which the contents of `filename`
+        for `course_id` are written.
+
+        The data is spooled to a temporary file in a `.spool` subdirectory of
+        the course directory, which is moved into place once the block exits
+        without an exception, so partially written reports are never listed.
         """
-        Given a course_id, filename, and rows (each row is an iterable of strings),
-        write this data out.
+        full_path = self.path_to(course_id, filename)
+        spool_directory = self.path_to(course_id, '.spool')
+        for directory in (os.path.dirname(full_path), spool_directory):
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+
+        spool_fd, spool_path = tempfile.mkstemp(dir=spool_directory)
+        spool_file = os.fdopen(spool_fd, "wb")
+        try:
+            yield spool_file
+            spool_file.close()
+            os.rename(spool_path, full_path)
+        except Exception:
+            spool_file.close()
+            os.remove(spool_path)
+            raise
+
+    def read_rows(self, course_id, filename):
+        """
+        Yield the rows of the CSV file stored by `store_rows()` as `filename`
+        for `course_id`, as lists of unicode strings.
         """
-        output_buffer = StringIO()
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+        with open(self.path_to(course_id, filename), "rb") as f:
+            for row in self._get_utf8_decoded_rows(csv.reader(f)):
+                yield row
+
+    def delete(self, course_id, filename):
+        """Delete the file stored as `filename` for `course_id`."""
+        os.remove(self.path_to(course_id, filename))
 
-        self.store(course_id, filename, output_buffer)
+    def filenames_in(self, course_id, directory):
+        """
+        Return the sorted names of the files stored under `directory` for
+        `course_id`, relative to the course's root.
+        """
+        full_path = self.path_to(course_id, directory)
+        if not os.path.exists(full_path):
+            return []
+        return sorted(os.path.join(directory, filename) for filename in os.listdir(full_path))
 
     def links_for(self, course_id):
         """
@@ -403,15 +527,97 @@ class LocalFSReportStore(ReportStore):
         can be plugged straight into an href. Note that `LocalFSReportStore`
         will generate `file://` type URLs, so you'll need to copy the URL and
         open it in a new browser window. Again, this class is only meant for
-        local development.
+        local development. Subdirectories (e.g. holding the parts of a report
+        that is still being generated) are not included.
         """
         course_dir = self.path_to(course_id, '')
         if not os.path.exists(course_dir):
             return []
         files = [(filename, os.path.join(course_dir, filename)) for filename in os.listdir(course_dir)]
+        files = [(filename, full_path) for filename, full_path in files if os.path.isfile(full_path)]
         files.sort(key=lambda (filename, full_path): os.path.getmtime(full_path), reverse=True)
 
         return [
             (filename, ("file://" + urllib.quote(full_path)))
             for filename, full_path in files
         ]
+
+
+class CSVRowsWriter(object):
+    """
+    Writes rows of unicode values to a CSV file, encoding them with
+    `encode_rows` (see `ReportStore._get_utf8_encoded_rows`).
+    """
+    def __init__(self, output, encode_rows):
+        self._csvwriter = csv.writer(output)
+        self._encode_rows = encode_rows
+
+    def writerow(self, row):
+        """Append a single row."""
+        self._csvwriter.writerows(self._encode_rows([row]))
+
+    def writerows(self, rows):
+        """Append all of `rows`, which may be a generator."""
+        self._csvwriter.writerows(self._encode_rows(rows))
+
+
+class S3MultipartUpload(object):
+    """
+    Write-only file-like object that uploads what is written to it to an S3
+    `key` in parts of at least PART_SIZE bytes.
+
+    Files smaller than PART_SIZE are uploaded with a single request when
+    `complete()` is called. Call `cancel()` to abandon the upload.
+    """
+    # S3 requires every part of a multipart upload but the last to be at least 5MB
+    PART_SIZE = 5 * 1024 * 1024
+
+    HEADERS = {
+        "Content-Encoding": "gzip",
+        "Content-Type": "text/csv",
+    }
+
+    def __init__(self, bucket, key):
+        self.bucket = bucket
+        self.key = key
+        self._buffer = StringIO()
+        self._multipart_upload = None
+        self._num_parts = 0
+
+    def write(self, data):
+        """Buffer `data`, uploading a part once enough has accumulated."""
+        self._buffer.write(data)
+        if self._buffer.tell() >= self.PART_SIZE:
+            self._upload_part()
+
+    def flush(self):
+        """Parts are uploaded as soon as they are complete; nothing to do."""
+        pass
+
+    def _upload_part(self):
+        """Upload the buffered data as the next part."""
+        if self._multipart_upload is None:
+            self._multipart_upload = self.bucket.initiate_multipart_upload(self.key.key, headers=self.HEADERS)
+        self._num_parts += 1
+        self._multipart_upload.upload_part_from_file(StringIO(self._buffer.getvalue()), self._num_parts)
+        self._buffer = StringIO()
+
+    def complete(self):
+        """Upload any remaining data and make the file visible."""
+        if self._multipart_upload is None:
+            data = self._buffer.getvalue()
+            self.key.size = len(data)
+            self.key.content_encoding = "gzip"
+            self.key.content_type = "text/csv"
+            headers = dict(self.HEADERS)
+            headers["Content-Length"] = len(data)
+            self.key.set_contents_from_string(data, headers=headers)
+        else:
+            if self._buffer.tell() > 0:
+                self._upload_part()
+            self._multipart_upload.complete_upload()
+
+    def cancel(self):
+        """Abandon the upload, discarding any parts already sent."""
+        if self._multipart_upload is not None:
+            self._multipart_upload.cancel_upload()
@@ -34,7 +34,8 @@ from instructor_task.tasks_helper import (
     rescore_problem_module_state,
     reset_attempts_module_state,
     delete_problem_module_state,
-    upload_grades_csv,
+    perform_delegate_grade_report_batches,
+    write_grade_report_part,
     upload_students_csv,
     cohort_students_and_upload
 )
@@ -143,6 +144,8 @@ def send_bulk_course_email(entry_id, _xmodule_instance_args):
 def calculate_grades_csv(entry_id, xmodule_instance_args):
     """
     Grade a course and push the results to an S3 bucket for download.
+
+    Large courses are graded in parallel by `calculate_grades_csv_subtask`s.
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('graded')
@@ -151,10 +154,23 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
         xmodule_instance_args.get('task_id'), entry_id, action_name
     )
 
-    task_fn = partial(upload_grades_csv, xmodule_instance_args)
+    task_fn = partial(perform_delegate_grade_report_batches, xmodule_instance_args)
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def calculate_grades_csv_subtask(entry_id, course_id, student_ids, report_time, subtask_status_dict):
+    """
+    Grade one batch of students for the grade report of the InstructorTask
+    `entry_id`, and store their rows for merging into the final report.
+
+    `course_id` is the course key as a string, `student_ids` the ids of the
+    users to grade, `report_time` the time() at which the parent task started
+    and `subtask_status_dict` the initial SubtaskStatus of this subtask as a dict.
+    """
+    return write_grade_report_part(entry_id, course_id, student_ids, report_time, subtask_status_dict)
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
 def calculate_students_features_csv(entry_id, xmodule_instance_args):
     """
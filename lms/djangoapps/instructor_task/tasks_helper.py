@@ -5,15 +5,20 @@ running state of a course.
 """
 import json
 from datetime import datetime
+from itertools import chain
 from time import time
+import traceback
 import unicodecsv
 import logging
 
 from celery import Task, current_task
 from celery.states import SUCCESS, FAILURE
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.files.storage import DefaultStorage
 from django.db import transaction, reset_queries
+from django.utils.translation import ugettext_noop
 import dogstats_wrapper as dog_stats_api
 from pytz import UTC
 
@@ -27,13 +32,20 @@ from courseware.grades import iterate_grades_for
 from courseware.models import StudentModule
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
-from instructor_analytics.basic import enrolled_students_features
-from instructor_analytics.csvs import format_dictlist
+from instructor_analytics.basic import iter_enrolled_students_features
+from instructor_analytics.csvs import format_dictiter
 from instructor_task.models import ReportStore, InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    SUBTASK_LOCK_EXPIRE,
+    SubtaskStatus,
+    check_subtask_is_valid,
+    queue_subtasks_for_query,
+    update_subtask_status,
+)
 from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
 from openedx.core.djangoapps.course_groups.cohorts import get_cohort
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
-from opaque_keys.edx.keys import UsageKey
+from opaque_keys.edx.keys import CourseKey, UsageKey
 from openedx.core.djangoapps.course_groups.cohorts import add_user_to_cohort, is_course_cohorted
 from student.models import CourseEnrollment
 
@@ -525,7 +537,8 @@ def delete_problem_module_state(xmodule_instance_args, _module_descriptor, stude
 
 def upload_csv_to_report_store(rows, csv_name, course_id, timestamp):
     """
-    Upload data as a CSV using ReportStore.
+    Upload data as a CSV using ReportStore. `rows` may be a generator, in which
+    case it is streamed to the ReportStore.
 
     Arguments:
         rows: CSV data in the following format (first column may be a
@@ -549,57 +562,26 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp):
     )
 
 
-def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+def _grade_report_rows(course, students, task_progress, task_info_string, action_name, current_step):
     """
-    For a given `course_id`, generate a grades CSV file for all students that
-    are enrolled, and store using a `ReportStore`. Once created, the files can
-    be accessed by instantiating another `ReportStore` (via
-    `ReportStore.from_config()`) and calling `link_for()` on it. Writes are
-    buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
-    that are visible in ReportStore will be complete ones.
+    Grade `students` in `course` and yield `(is_error, row)` tuples for the
+    grade report.
 
-    As we start to add more CSV downloads, it will probably be worthwhile to
-    make a more general CSVDoc class instead of building out the rows like we
-    do here.
+    The first non-error row is the report's header. Error rows are the data
+    rows of the error report, i.e. `["id", "username", "error_msg"]` entries.
+    `task_progress` is updated for every student.
     """
-    start_time = time()
-    start_date = datetime.now(UTC)
     status_interval = 100
-    enrolled_students = CourseEnrollment.users_enrolled_in(course_id)
-    task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
-
-    fmt = u'Task: {task_id}, InstructorTask ID: {entry_id}, Course: {course_id}, Input: {task_input}'
-    task_info_string = fmt.format(
-        task_id=_xmodule_instance_args.get('task_id') if _xmodule_instance_args is not None else None,
-        entry_id=_entry_id,
-        course_id=course_id,
-        task_input=_task_input
-    )
-    TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
-
-    course = get_course_by_id(course_id)
-    course_is_cohorted = is_course_cohorted(course.id)
+    course_id = course.id
+    course_is_cohorted = is_course_cohorted(course_id)
     cohorts_header = ['Cohort Name'] if course_is_cohorted else []
 
     experiment_partitions = get_split_user_partitions(course.user_partitions)
     group_configs_header = [u'Experiment Group ({})'.format(partition.name) for partition in experiment_partitions]
 
-    # Loop over all our students and build our CSV lists in memory
     header = None
-    rows = []
-    err_rows = [["id", "username", "error_msg"]]
-    current_step = {'step': 'Calculating Grades'}
-
-    total_enrolled_students = enrolled_students.count()
     student_counter = 0
-    TASK_LOG.info(
-        u'%s, Task type: %s, Current step: %s, Starting grade calculation for total students: %s',
-        task_info_string,
-        action_name,
-        current_step,
-        total_enrolled_students
-    )
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
+    for student, gradeset, err_msg in iterate_grades_for(course_id, students):
         # Periodically update task status (this is a cache write)
         if task_progress.attempted % status_interval == 0:
             task_progress.update_task_state(extra_meta=current_step)
@@ -614,7 +596,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
                 action_name,
                 current_step,
                 student_counter,
-                total_enrolled_students
+                task_progress.total
             )
 
         if gradeset:
@@ -622,9 +604,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             task_progress.succeeded += 1
             if not header:
                 header = [section['label'] for section in gradeset[u'section_breakdown']]
-                rows.append(
-                    ["id", "email", "username", "grade"] + header + cohorts_header + group_configs_header
-                )
+                yield False, ["id", "email", "username", "grade"] + header + cohorts_header + group_configs_header
 
             percents = {
                 section['label']: section.get('percent', 0.0)
@@ -649,32 +629,82 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             # possible for a student to have a 0.0 show up in their row but
             # still have 100% for the course.
             row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append(
+            yield False, (
                 [student.id, student.email, student.username, gradeset['percent']] +
                 row_percents + cohorts_group_name + group_configs_group_names
             )
         else:
             # An empty gradeset means we failed to grade a student.
             task_progress.failed += 1
-            err_rows.append([student.id, student.username, err_msg])
+            yield True, [student.id, student.username, err_msg]
+
+
+def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+    """
+    For a given `course_id`, generate a grades CSV file for all students that
+    are enrolled, and store using a `ReportStore`. Once created, the files can
+    be accessed by instantiating another `ReportStore` (via
+    `ReportStore.from_config()`) and calling `link_for()` on it. Rows are
+    streamed to the ReportStore as students are graded, but files only become
+    visible in the ReportStore once they are complete.
+    """
+    start_time = time()
+    start_date = datetime.now(UTC)
+    enrolled_students = CourseEnrollment.users_enrolled_in(course_id)
+    task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
+
+    fmt = u'Task: {task_id}, InstructorTask ID: {entry_id}, Course: {course_id}, Input: {task_input}'
+    task_info_string = fmt.format(
+        task_id=_xmodule_instance_args.get('task_id') if _xmodule_instance_args is not None else None,
+        entry_id=_entry_id,
+        course_id=course_id,
+        task_input=_task_input
+    )
+    TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
+
+    course = get_course_by_id(course_id)
+
+    # Loop over all our students, streaming the grade rows to the report
+    # store. Errors are expected to be rare, so they're kept in memory.
+    err_rows = [["id", "username", "error_msg"]]
+    current_step = {'step': 'Calculating Grades'}
+
+    total_enrolled_students = task_progress.total
+    TASK_LOG.info(
+        u'%s, Task type: %s, Current step: %s, Starting grade calculation for total students: %s',
+        task_info_string,
+        action_name,
+        current_step,
+        total_enrolled_students
+    )
+    report_rows = _grade_report_rows(
+        course, enrolled_students.iterator(), task_progress, task_info_string, action_name, current_step
+    )
+
+    def _grade_rows():
+        """Yield the grade rows, setting aside the error rows."""
+        for is_error, row in report_rows:
+            if is_error:
+                err_rows.append(row)
+            else:
+                yield row
+
+    upload_csv_to_report_store(_grade_rows(), 'grade_report', course_id, start_date)
 
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, Grade calculation completed for students: %s/%s',
         task_info_string,
         action_name,
         current_step,
-        student_counter,
+        task_progress.attempted,
         total_enrolled_students
     )
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
+    # By this point, the grade report has been uploaded.
     current_step = {'step': 'Uploading CSVs'}
     task_progress.update_task_state(extra_meta=current_step)
     TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
-    # Perform the actual upload
-    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
-
     # If there are any error rows (don't count the header), write them out as well
     if len(err_rows) > 1:
         upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
@@ -684,6 +714,259 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     return task_progress.update_task_state(extra_meta=current_step)
 
 
+def _grade_report_parts_directory(entry_id):
+    """
+    Return the ReportStore directory holding the partial grade reports written
+    by the subtasks of the InstructorTask `entry_id`.
+    """
+    return u"grade_report_parts_{}".format(entry_id)
+
+
+def perform_delegate_grade_report_batches(xmodule_instance_args, entry_id, course_id, task_input, action_name):
+    """
+    Generate the grade report for `course_id`, splitting the enrolled
+    students into batches of at most settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK
+    that are graded by subtasks running in parallel.
+
+    Each subtask stores the rows of its batch in the ReportStore, and the last
+    subtask to complete merges them into the final grade report (see
+    `write_grade_report_part`). Courses with no more than one batch of
+    students are graded directly by `upload_grades_csv`.
+    """
+    # Import the subtask here to avoid a circular import.
+    from instructor_task.tasks import calculate_grades_csv_subtask
+
+    enrolled_students = CourseEnrollment.users_enrolled_in(course_id)
+    total_students = enrolled_students.count()
+    if total_students <= settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK:
+        return upload_grades_csv(xmodule_instance_args, entry_id, course_id, task_input, action_name)
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+
+    # As with bulk email, if subtasks have already been defined then this task
+    # has been requeued, and the subtasks are taking care of the work.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already been processed for grade report!  InstructorTask = %s", entry.task_id, entry)
+        return json.loads(entry.task_output)
+
+    report_time = time()
+
+    def _create_grade_report_subtask(student_list, initial_subtask_status):
+        """Creates a subtask to grade a given list of students."""
+        return calculate_grades_csv_subtask.subtask(
+            (
+                entry_id,
+                course_id.to_deprecated_string(),
+                [student['pk'] for student in student_list],
+                report_time,
+                initial_subtask_status.to_dict(),
+            ),
+            task_id=initial_subtask_status.task_id,
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+        )
+
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        _create_grade_report_subtask,
+        [enrolled_students],
+        [],
+        settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK,
+        total_students,
+    )
+
+
+def write_grade_report_part(entry_id, course_id, student_ids, report_time, subtask_status_dict):
+    """
+    Grade the students with ids `student_ids` and store their rows of the
+    grade report as a part file in the ReportStore.
+
+    `report_time` is the time() at which the parent task started; it is used
+    to name the final report. Once all subtasks of the InstructorTask
+    `entry_id` have completed, the parts are merged into the final report.
+
+    Returns the subtask status as a dict.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    TASK_LOG.info(
+        u"Preparing to grade %d students as subtask %s for instructor task %d", len(student_ids), current_task_id, entry_id
+    )
+
+    # Reject duplicate or already-completed subtasks, as bulk email does.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    course_key = CourseKey.from_string(course_id)
+    parts_directory = _grade_report_parts_directory(entry_id)
+    part_name = u"{}/{:010d}".format(parts_directory, min(student_ids))
+    task_progress = TaskProgress(ugettext_noop('graded'), len(student_ids), time())
+    current_step = {'step': 'Calculating Grades'}
+
+    try:
+        course = get_course_by_id(course_key)
+        students = User.objects.filter(pk__in=student_ids).order_by('pk')
+        fmt = u'Subtask: {task_id}, InstructorTask ID: {entry_id}, Course: {course_id}'
+        task_info_string = fmt.format(task_id=current_task_id, entry_id=entry_id, course_id=course_id)
+
+        err_rows = []
+        report_rows = _grade_report_rows(
+            course, students.iterator(), task_progress, task_info_string, task_progress.action_name, current_step
+        )
+
+        def _grade_rows():
+            """Yield the grade rows, setting aside the error rows."""
+            for is_error, row in report_rows:
+                if is_error:
+                    err_rows.append(row)
+                else:
+                    yield row
+
+        report_store = ReportStore.from_config()
+        report_store.store_rows(course_key, part_name + u".csv", _grade_rows())
+        if err_rows:
+            report_store.store_rows(course_key, part_name + u"_err.csv", err_rows)
+    except Exception as exc:
+        # Since we don't know how far the grading got, count all students as failed,
+        # and list them all in the error report so that the report doesn't silently miss them.
+        TASK_LOG.exception(u"Grade report subtask %s for instructor task %d: failed unexpectedly!", current_task_id, entry_id)
+        try:
+            _store_failed_grade_report_part(course_key, part_name, student_ids, exc)
+        except Exception:
+            # The students are missing from the parts, so the report can't be completed.
+            TASK_LOG.exception(
+                u"Grade report subtask %s for instructor task %d: failed to store its error rows!",
+                current_task_id, entry_id
+            )
+            subtask_status.increment(failed=len(student_ids), state=FAILURE)
+            update_subtask_status(entry_id, current_task_id, subtask_status, complete_parent=False)
+            _merge_grade_report_parts_if_done(entry_id, course_key, report_time)
+            raise
+        subtask_status.increment(failed=len(student_ids), state=SUCCESS)
+    else:
+        subtask_status.increment(succeeded=task_progress.succeeded, failed=task_progress.failed, state=SUCCESS)
+
+    update_subtask_status(entry_id, current_task_id, subtask_status, complete_parent=False)
+    _merge_grade_report_parts_if_done(entry_id, course_key, report_time)
+    return subtask_status.to_dict()
+
+
+def _store_failed_grade_report_part(course_id, part_name, student_ids, exc):
+    """
+    Replace the part `part_name` of the grade report, whose subtask failed with
+    `exc`, with error rows for all of its students `student_ids`.
+    """
+    report_store = ReportStore.from_config()
+    # Drop whatever the subtask stored before failing, so that no student is listed twice.
+    for filename in report_store.filenames_in(course_id, part_name.rpartition(u"/")[0]):
+        if filename in (part_name + u".csv", part_name + u"_err.csv"):
+            report_store.delete(course_id, filename)
+
+    students = User.objects.filter(pk__in=student_ids).order_by('pk').values_list('id', 'username')
+    err_msg = u"Grading failed: {}".format(exc)
+    report_store.store_rows(
+        course_id, part_name + u"_err.csv", ([student_id, username, err_msg] for student_id, username in students)
+    )
+
+
+def _merge_grade_report_parts_if_done(entry_id, course_id, report_time):
+    """
+    If every subtask of the InstructorTask `entry_id` has completed, merge the
+    partial grade reports they stored into the final grade report (and error
+    report), then delete the parts.
+
+    The subtasks leave the InstructorTask in progress, so that it is only
+    marked as succeeded once the report exists.  If a subtask failed without
+    storing its part, or the merge fails, the InstructorTask is marked as
+    failed instead, and the report has to be requested again: nothing calls
+    this again by itself (a later call, e.g. from a requeued subtask, would
+    retry a failed merge).  A cache lock makes sure that only one of the
+    subtasks performs the merge at a time; if its worker dies while holding
+    the lock, the InstructorTask stays in progress.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    subtask_dict = json.loads(entry.subtasks)
+    if entry.task_state == SUCCESS or subtask_dict['succeeded'] + subtask_dict['failed'] < subtask_dict['total']:
+        return
+
+    lock_key = u"grade-report-merge-{}".format(entry_id)
+    if not cache.add(lock_key, 'true', SUBTASK_LOCK_EXPIRE):
+        return
+
+    try:
+        # Another subtask may have merged the parts before the lock was taken.
+        entry = InstructorTask.objects.get(pk=entry_id)
+        if entry.task_state == SUCCESS:
+            return
+        try:
+            failed_subtasks = json.loads(entry.subtasks)['failed']
+            if failed_subtasks:
+                _delete_grade_report_parts(entry_id, course_id)
+                raise ValueError(u"{} grade report subtasks failed to store their part".format(failed_subtasks))
+            _merge_grade_report_parts(entry_id, course_id, report_time)
+        except Exception as exc:
+            TASK_LOG.exception(u"Merging the grade report parts of instructor task %d failed", entry_id)
+            InstructorTask.objects.filter(pk=entry_id).update(
+                task_state=FAILURE,
+                task_output=InstructorTask.create_output_for_failure(exc, traceback.format_exc()),
+            )
+            raise
+        InstructorTask.objects.filter(pk=entry_id).update(task_state=SUCCESS)
+    finally:
+        cache.delete(lock_key)
+
+
+def _merge_grade_report_parts(entry_id, course_id, report_time):
+    """
+    Merge the partial grade reports stored by the subtasks of the
+    InstructorTask `entry_id` into the final grade report (and error report),
+    then delete the parts.
+    """
+    report_store = ReportStore.from_config()
+    part_names = report_store.filenames_in(course_id, _grade_report_parts_directory(entry_id))
+    grade_parts = [name for name in part_names if not name.endswith(u"_err.csv")]
+    err_parts = [name for name in part_names if name.endswith(u"_err.csv")]
+
+    def _merged_grade_rows():
+        """Yield the rows of all grade parts, keeping only the first header."""
+        header_written = False
+        for part_name in grade_parts:
+            part_rows = report_store.read_rows(course_id, part_name)
+            header = next(part_rows, None)
+            if header is None:
+                # No student in this part could be graded
+                continue
+            if not header_written:
+                yield header
+                header_written = True
+            for row in part_rows:
+                yield row
+
+    def _merged_err_rows():
+        """Yield the header of the error report followed by the rows of all error parts."""
+        yield ["id", "username", "error_msg"]
+        for part_name in err_parts:
+            for row in report_store.read_rows(course_id, part_name):
+                yield row
+
+    report_date = datetime.fromtimestamp(report_time, UTC)
+    upload_csv_to_report_store(_merged_grade_rows(), 'grade_report', course_id, report_date)
+    if err_parts:
+        upload_csv_to_report_store(_merged_err_rows(), 'grade_report_err', course_id, report_date)
+
+    _delete_grade_report_parts(entry_id, course_id)
+
+    TASK_LOG.info(u"Merged %d grade report parts for instructor task %d", len(part_names), entry_id)
+
+
+def _delete_grade_report_parts(entry_id, course_id):
+    """
+    Delete the partial grade reports stored by the subtasks of the InstructorTask `entry_id`.
+    """
+    report_store = ReportStore.from_config()
+    for part_name in report_store.filenames_in(course_id, _grade_report_parts_directory(entry_id)):
+        report_store.delete(course_id, part_name)
+
+
 def upload_students_csv(_xmodule_instance_args, _entry_id, course_id, task_input, action_name):
     """
     For a given `course_id`, generate a CSV file containing profile
@@ -696,21 +979,24 @@ def upload_students_csv(_xmodule_instance_args, _entry_id, course_id, task_input
     current_step = {'step': 'Calculating Profile Info'}
     task_progress.update_task_state(extra_meta=current_step)
 
-    # compute the student features table and format it
+    # compute the student features table as it is uploaded
     query_features = task_input.get('features')
-    student_data = enrolled_students_features(course_id, query_features)
-    header, rows = format_dictlist(student_data, query_features)
-
-    task_progress.attempted = task_progress.succeeded = len(rows)
-    task_progress.skipped = task_progress.total - task_progress.attempted
+    student_data = iter_enrolled_students_features(course_id, query_features)
+    header, rows = format_dictiter(student_data, query_features)
 
-    rows.insert(0, header)
+    def _counted_rows():
+        """Yield the rows, counting them in the task progress."""
+        for row in rows:
+            task_progress.attempted += 1
+            task_progress.succeeded += 1
+            yield row
 
     current_step = {'step': 'Uploading CSV'}
     task_progress.update_task_state(extra_meta=current_step)
 
-    # Perform the upload
-    upload_csv_to_report_store(rows, 'student_profile_info', course_id, start_date)
+    # Perform the upload, streaming the rows after the header
+    upload_csv_to_report_store(chain([header], _counted_rows()), 'student_profile_info', course_id, start_date)
+    task_progress.skipped = task_progress.total - task_progress.attempted
 
     return task_progress.update_task_state(extra_meta=current_step)
 
@@ -7,6 +7,7 @@ import mock
 import time
 from datetime import datetime
 from unittest import TestCase
+from uuid import uuid4
 
 from instructor_task.models import LocalFSReportStore, S3ReportStore
 from instructor_task.tests.test_base import TestReportMixin
@@ -20,6 +21,7 @@ class MockKey(object):
     def __init__(self, bucket):
         self.last_modified = datetime.now()
         self.bucket = bucket
+        self.key = None
 
     def set_contents_from_string(self, contents, headers):  # pylint: disable=unused-argument
         """ Expected method on a Key object. """
@@ -30,10 +32,39 @@ class MockKey(object):
         return "http://fake-edx-s3.edx.org/"
 
 
+class MockMultiPartUpload(object):
+    """ Mocking a boto S3 MultiPartUpload object. """
+    def __init__(self, bucket, key_name):
+        self.bucket = bucket
+        self.key_name = key_name
+        self.parts = []
+
+    def upload_part_from_file(self, fp, part_num):
+        """ Expected method on a MultiPartUpload object. """
+        self.parts.append((part_num, fp.read()))
+
+    def complete_upload(self):
+        """ Expected method on a MultiPartUpload object. """
+        key = MockKey(self.bucket)
+        key.key = self.key_name
+        self.bucket.store_key(key)
+
+    def cancel_upload(self):
+        """ Expected method on a MultiPartUpload object. """
+        self.parts = []
+
+
 class MockBucket(object):
     """ Mocking a boto S3 Bucket object. """
     def __init__(self, _name):
         self.keys = []
+        self.multipart_uploads = []
+
+    def initiate_multipart_upload(self, key_name, headers):  # pylint: disable=unused-argument
+        """ Expected method on a Bucket object. """
+        upload = MockMultiPartUpload(self, key_name)
+        self.multipart_uploads.append(upload)
+        return upload
 
     def store_key(self, key):
         """ Not a Bucket method, created just to store the keys in the Bucket for testing purposes. """
@@ -84,6 +115,27 @@ class ReportStoreTestMixin(object):
             ['new_file', 'middle_file', 'old_file']
         )
 
+    def test_store_rows_from_generator(self):
+        """
+        Test that rows produced by a generator are stored.
+        """
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'report.csv', ([index, u'\u2603'] for index in xrange(10)))
+
+        self.assertEqual([link[0] for link in report_store.links_for(self.course_id)], ['report.csv'])
+
+    def test_rows_writer_discards_failed_file(self):
+        """
+        Test that a file whose rows could not all be written is not stored.
+        """
+        report_store = self.create_report_store()
+        with self.assertRaises(ValueError):
+            with report_store.rows_writer(self.course_id, 'report.csv') as writer:
+                writer.writerow(['id', 'username'])
+                raise ValueError()
+
+        self.assertEqual(report_store.links_for(self.course_id), [])
+
 
 class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     """
@@ -93,6 +145,20 @@ class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase
         """ Create and return a LocalFSReportStore. """
         return LocalFSReportStore.from_config()
 
+    def test_read_rows(self):
+        """
+        Test that rows written with rows_writer() are read back as unicode.
+        """
+        report_store = self.create_report_store()
+        with report_store.rows_writer(self.course_id, 'report.csv') as writer:
+            writer.writerow(['id', 'username'])
+            writer.writerows([index, u'\u2603'] for index in xrange(3))
+
+        self.assertEqual(
+            list(report_store.read_rows(self.course_id, 'report.csv')),
+            [[u'id', u'username'], [u'0', u'\u2603'], [u'1', u'\u2603'], [u'2', u'\u2603']]
+        )
+
 
 @mock.patch('instructor_task.models.S3Connection', new=MockS3Connection)
 @mock.patch('instructor_task.models.Key', new=MockKey)
@@ -105,3 +171,15 @@ class S3ReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     def create_report_store(self):
         """ Create and return a S3ReportStore. """
         return S3ReportStore.from_config()
+
+    @mock.patch('instructor_task.models.S3MultipartUpload.PART_SIZE', 64)
+    def test_multipart_upload(self):
+        """
+        Test that large files are uploaded in parts as they are written.
+        """
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'report.csv', ([uuid4().hex] for _ in xrange(100)))
+
+        self.assertEqual(len(report_store.bucket.multipart_uploads), 1)
+        self.assertGreater(len(report_store.bucket.multipart_uploads[0].parts), 1)
+        self.assertEqual([link[0] for link in report_store.links_for(self.course_id)], ['report.csv'])
@@ -7,8 +7,12 @@ Tests that CSV grade report generation works with unicode emails.
 
 """
 import ddt
+from celery.states import SUCCESS, FAILURE, PROGRESS
+from django.test.utils import override_settings
 from mock import Mock, patch
+import json
 import tempfile
+import time
 import unicodecsv
 
 from xmodule.modulestore.tests.factories import CourseFactory
@@ -20,11 +24,27 @@ from openedx.core.djangoapps.course_groups.models import CourseUserGroupPartitio
 from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 import openedx.core.djangoapps.user_api.course_tag.api as course_tag_api
 from openedx.core.djangoapps.user_api.partition_schemes import RandomUserPartitionScheme
-from instructor_task.models import ReportStore
-from instructor_task.tasks_helper import cohort_students_and_upload, upload_grades_csv, upload_students_csv
+from courseware.grades import iterate_grades_for
+from instructor_task.models import InstructorTask, ReportStore
+from instructor_task.tasks_helper import (
+    cohort_students_and_upload, perform_delegate_grade_report_batches, upload_grades_csv, upload_students_csv,
+    _merge_grade_report_parts_if_done,
+)
+from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_task.tests.test_base import InstructorTaskCourseTestCase, TestReportMixin
 
 
+def _iterate_grades_with_errors(course_id, students):
+    """This fake iterate_grades_for fails outright for the batch of students
+    holding student4, as if the database went away while grading it.
+    """
+    students = list(students)
+    if any(student.username == 'student4' for student in students):
+        raise Exception("Lost the database")
+
+    return iterate_grades_for(course_id, students)
+
+
 @ddt.ddt
 class TestInstructorGradeReport(TestReportMixin, InstructorTaskCourseTestCase):
     """
@@ -257,6 +277,116 @@ class TestInstructorGradeReport(TestReportMixin, InstructorTaskCourseTestCase):
         result = upload_grades_csv(None, None, self.course.id, None, 'graded')
         self.assertDictContainsSubset({'attempted': 1, 'succeeded': 1, 'failed': 0}, result)
 
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=2)
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_grading_in_subtasks(self, _mock_current_task):
+        """
+        Test that a course with more students than fit in one batch is graded
+        by subtasks whose rows are merged into a single report.
+        """
+        students = [self.create_student('student{}'.format(i)) for i in range(5)]
+        entry = InstructorTaskFactory.create(task_type='grade_course', course_id=self.course.id, task_output='')
+
+        perform_delegate_grade_report_batches(None, entry.id, self.course.id, {}, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertEqual(json.loads(entry.subtasks)['succeeded'], 3)
+        self.assertDictContainsSubset(
+            {'attempted': 5, 'succeeded': 5, 'failed': 0}, json.loads(entry.task_output)
+        )
+
+        # Only the merged report is listed; the parts have been removed.
+        report_store = ReportStore.from_config()
+        self.assertEqual(len(report_store.links_for(self.course.id)), 1)
+        self.assertItemsEqual(
+            [row['username'] for row in self._report_rows(report_store)],
+            [student.username for student in students]
+        )
+
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=2)
+    @patch('instructor_task.tasks_helper._get_current_task')
+    @patch('instructor_task.tasks_helper.iterate_grades_for', _iterate_grades_with_errors)
+    def test_failed_subtask_students_in_error_report(self, _mock_current_task):
+        """
+        Test that the students of a subtask which failed outright are listed in
+        the error report, rather than silently missing from the report.
+        """
+        students = [self.create_student('student{}'.format(i)) for i in range(5)]
+        entry = InstructorTaskFactory.create(task_type='grade_course', course_id=self.course.id, task_output='')
+
+        perform_delegate_grade_report_batches(None, entry.id, self.course.id, {}, 'graded')
+
+        report_store = ReportStore.from_config()
+        usernames = [row['username'] for row in self._report_rows(report_store)]
+        err_rows = self._report_rows(report_store, errors=True)
+        err_usernames = [row['username'] for row in err_rows]
+        self.assertIn('student4', err_usernames)
+        self.assertItemsEqual(usernames + err_usernames, [student.username for student in students])
+        for err_row in err_rows:
+            self.assertEqual(err_row['error_msg'], 'Grading failed: Lost the database')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertDictContainsSubset(
+            {'attempted': 5, 'succeeded': len(usernames), 'failed': len(err_usernames)}, json.loads(entry.task_output)
+        )
+
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=2)
+    @patch('instructor_task.tasks_helper._get_current_task')
+    @patch('instructor_task.tasks_helper.iterate_grades_for', _iterate_grades_with_errors)
+    @patch('instructor_task.tasks_helper._store_failed_grade_report_part', side_effect=IOError('Storage failed'))
+    def test_failed_subtask_without_part(self, _mock_store_failed_part, _mock_current_task):
+        """
+        Test that the task fails, rather than producing an incomplete report, if
+        a subtask failed and couldn't store its part either.
+        """
+        for i in range(5):
+            self.create_student('student{}'.format(i))
+        entry = InstructorTaskFactory.create(task_type='grade_course', course_id=self.course.id, task_output='')
+
+        perform_delegate_grade_report_batches(None, entry.id, self.course.id, {}, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertEqual(json.loads(entry.task_output)['message'], '1 grade report subtasks failed to store their part')
+        self.assertEqual(ReportStore.from_config().links_for(self.course.id), [])
+
+    def test_grade_report_merge_failure(self):
+        """
+        Test that a failed merge of the report parts marks the task as failed,
+        and doesn't keep the next attempt from merging them.
+        """
+        entry = InstructorTaskFactory.create(
+            task_type='grade_course',
+            course_id=self.course.id,
+            task_state=PROGRESS,
+            task_output=json.dumps({}),
+            subtasks=json.dumps({'total': 1, 'succeeded': 1, 'failed': 0, 'status': {}}),
+        )
+
+        with patch('instructor_task.tasks_helper._merge_grade_report_parts', side_effect=ValueError('Merge failed')):
+            with self.assertRaises(ValueError):
+                _merge_grade_report_parts_if_done(entry.id, self.course.id, time.time())
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertEqual(json.loads(entry.task_output)['message'], 'Merge failed')
+
+        with patch('instructor_task.tasks_helper._merge_grade_report_parts') as mock_merge:
+            _merge_grade_report_parts_if_done(entry.id, self.course.id, time.time())
+            _merge_grade_report_parts_if_done(entry.id, self.course.id, time.time())
+        self.assertEqual(mock_merge.call_count, 1)
+        self.assertEqual(InstructorTask.objects.get(pk=entry.id).task_state, SUCCESS)
+
+    def _report_rows(self, report_store, errors=False):
+        """Return the rows of the latest report, or error report if `errors`, as dicts."""
+        report_csv_filename = next(
+            filename for filename, __ in report_store.links_for(self.course.id)
+            if ('grade_report_err' in filename) == errors
+        )
+        with open(report_store.path_to(self.course.id, report_csv_filename)) as csv_file:
+            return list(unicodecsv.DictReader(csv_file))
+
 
 @ddt.ddt
 class TestStudentReport(TestReportMixin, InstructorTaskCourseTestCase):
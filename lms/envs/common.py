@@ -255,6 +255,11 @@ FEATURES = {
     # grades CSV files to S3 and give links for downloads.
     'ENABLE_S3_GRADE_DOWNLOADS': False,
 
+    # Store per-subsection scores for each student and reuse them in grading
+    # and on the progress page until the subsection or the student's state in
+    # it changes.
+    'ENABLE_PERSISTENT_SUBSECTION_GRADES': False,
+
     # whether to use password policy enforcement or not
     'ENFORCE_PASSWORD_POLICY': True,
 
@@ -647,6 +652,10 @@ XBLOCK_SELECT_FUNCTION = prefer_xmodules
 ############# ModuleStore Configuration ##########
 
 MODULESTORE_BRANCH = 'published-only'
+
+# Budget (in bytes of BSON) of the in-process cache of split modulestore structures and
+# definitions. The 'split_documents' cache, if defined, backs it across processes.
+SPLIT_DOCUMENT_CACHE_MAX_BYTES = 128 * 1024 * 1024
 CONTENTSTORE = None
 DOC_STORE_CONFIG = {
     'host': 'localhost',
@@ -708,6 +717,12 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # How many warm sandbox workers to keep in each process, to run the code
+    # without starting a new jailed Python every time.  0 to not use them.
+    # The workers import all the sandbox packages (numpy, scipy, ...) up front,
+    # which counts against the VMEM limit of every execution.
+    'worker_pool_size': 0,
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1692,6 +1707,7 @@ INSTALLED_APPS = (
     'lms.djangoapps.lms_xblock',
 
     'openedx.core.djangoapps.content.course_structures',
+    'openedx.core.djangoapps.content.course_overviews',
     'course_structure_api',
 
     # CORS and cross-domain CSRF
@@ -1867,6 +1883,10 @@ CERT_NAME_LONG = "Certificate of Achievement"
 ###################### Grade Downloads ######################
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
+# Number of students graded by each subtask of a grade report. Courses with
+# fewer enrolled students are graded in a single task.
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = 1000
+
 GRADES_DOWNLOAD = {
     'STORAGE_TYPE': 'localfs',
     'BUCKET': 'edx-grades',
@@ -2172,6 +2192,13 @@ API_DATE_FORMAT = '%Y-%m-%d'
 # Enrollment API Cache Timeout
 ENROLLMENT_COURSE_DETAILS_CACHE_TIMEOUT = 60
 
+# How long enrollment statuses (is_enrolled, enrollment mode) are kept in the default cache.
+# They are invalidated whenever an enrollment is saved, 0 disables caching them.
+ENROLLMENT_STATUS_CACHE_TIMEOUT = 60 * 60
+# How long the status of a changed enrollment isn't cached, so that requests which read it before
+# the change was committed can't cache the old status. Must be longer than the enrollment transactions.
+ENROLLMENT_STATUS_PENDING_TIMEOUT = 60
+
 # for Student Notes we would like to avoid too frequent token refreshes (default is 30 seconds)
 if FEATURES['ENABLE_EDXNOTES']:
     OAUTH_ID_TOKEN_EXPIRATION = 60 * 60
@@ -39,6 +39,9 @@ def run():
     if settings.FEATURES.get('ENABLE_THIRD_PARTY_AUTH', False):
         enable_third_party_auth()
 
+    if settings.CODE_JAIL.get('python_bin') and settings.CODE_JAIL.get('worker_pool_size'):
+        enable_sandbox_worker_pool()
+
     # Initialize Segment.io analytics module. Flushes first time a message is received and
     # every 50 messages thereafter, or if 10 seconds have passed since last flush
     if settings.FEATURES.get('SEGMENT_IO_LMS') and hasattr(settings, 'SEGMENT_IO_LMS_KEY'):
@@ -151,6 +154,19 @@ def enable_third_party_auth():
     auth_settings.apply_settings(settings.THIRD_PARTY_AUTH, settings)
 
 
+def enable_sandbox_worker_pool():
+    """
+    Run the Python code of capa problems in a pool of warm sandbox workers.
+    """
+    from capa.safe_exec import configure_worker_pool
+    configure_worker_pool(
+        settings.CODE_JAIL['python_bin'],
+        user=settings.CODE_JAIL.get('user'),
+        size=settings.CODE_JAIL['worker_pool_size'],
+        limits=settings.CODE_JAIL.get('limits'),
+    )
+
+
 def get_keyword_function_map():
     """
     Define the mapping of keywords and filtering functions
@@ -0,0 +1,335 @@
+"""
+Declaration of CourseOverview model
+"""
+from datetime import datetime
+import json
+import logging
+
+from django.db import IntegrityError
+from django.db.models.fields import BooleanField, DateTimeField, FloatField, NullBooleanField, TextField
+from django.utils.timezone import UTC
+from django.utils.translation import ugettext
+from model_utils.models import TimeStampedModel
+
+from openedx.core.lib.courses import course_image_url
+from util.date_utils import strftime_localized
+from xmodule import course_module
+from xmodule.course_module import CourseDescriptor
+from xmodule.modulestore.django import modulestore
+from xmodule_django.models import CourseKeyField, UsageKeyField
+
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class CourseOverview(TimeStampedModel):
+    """
+    Model for storing and caching basic information about a course.
+
+    This model contains the course metadata needed to list, sort and filter courses and to
+    check access to them, so that dashboards, the course catalog and the enrollment API don't
+    have to load whole course descriptors from the modulestore. It quacks like a
+    CourseDescriptor for the attributes it stores.
+
+    Rows are rebuilt whenever their course is published and deleted along with their course
+    (see signals.py). The existing courses are backfilled by a data migration; the overviews of
+    courses which haven't been published since are otherwise created lazily by get_from_id, or by
+    the generate_course_overview command.
+    """
+    # Course identification
+    id = CourseKeyField(db_index=True, primary_key=True, max_length=255)  # pylint: disable=invalid-name
+    _location = UsageKeyField(max_length=255)
+    display_name = TextField(null=True)
+    display_number_with_default = TextField()
+    display_org_with_default = TextField()
+
+    # Start/end dates
+    start = DateTimeField(null=True)
+    end = DateTimeField(null=True)
+    advertised_start = TextField(null=True)
+    announcement = DateTimeField(null=True)
+    is_new = NullBooleanField()
+
+    # Enrollment window and restrictions
+    enrollment_start = DateTimeField(null=True)
+    enrollment_end = DateTimeField(null=True)
+    enrollment_domain = TextField(null=True)
+    invitation_only = BooleanField(default=False)
+
+    # URLs
+    course_image_url = TextField()
+    static_asset_path = TextField(blank=True)
+    end_of_course_survey_url = TextField(null=True)
+
+    # Certification data
+    certificates_display_behavior = TextField(null=True)
+    certificates_show_before_end = BooleanField(default=False)
+    cert_name_short = TextField()
+    cert_name_long = TextField()
+    lowest_passing_grade = FloatField(null=True)
+
+    # Access parameters
+    catalog_visibility = TextField(null=True)
+    mobile_available = BooleanField(default=False)
+    visible_to_staff_only = BooleanField(default=False)
+    ispublic = NullBooleanField()
+    days_early_for_beta = FloatField(null=True)
+    _pre_requisite_courses_json = TextField()  # JSON list of course key strings
+
+    @classmethod
+    def _create_from_course(cls, course):
+        """
+        Creates a CourseOverview object from a CourseDescriptor.
+
+        Does not touch the database, simply constructs and returns an overview
+        from the given course.
+        """
+        is_new = course.is_new
+        if isinstance(is_new, basestring):
+            is_new = is_new.lower() in ['true', 'yes', 'y']
+        elif is_new is not None:
+            is_new = bool(is_new)
+
+        return cls(
+            id=course.id,
+            _location=course.location,
+            display_name=course.display_name,
+            display_number_with_default=course.display_number_with_default,
+            display_org_with_default=course.display_org_with_default,
+
+            start=course.start,
+            end=course.end,
+            advertised_start=course.advertised_start,
+            announcement=course.announcement,
+            is_new=is_new,
+
+            enrollment_start=course.enrollment_start,
+            enrollment_end=course.enrollment_end,
+            enrollment_domain=course.enrollment_domain,
+            invitation_only=course.invitation_only,
+
+            course_image_url=course_image_url(course),
+            static_asset_path=course.static_asset_path or '',
+            end_of_course_survey_url=course.end_of_course_survey_url,
+
+            certificates_display_behavior=course.certificates_display_behavior,
+            certificates_show_before_end=course.certificates_show_before_end,
+            cert_name_short=course.cert_name_short,
+            cert_name_long=course.cert_name_long,
+            lowest_passing_grade=course.lowest_passing_grade,
+
+            catalog_visibility=course.catalog_visibility,
+            mobile_available=course.mobile_available,
+            visible_to_staff_only=course.visible_to_staff_only,
+            ispublic=course.ispublic,
+            days_early_for_beta=course.days_early_for_beta,
+            _pre_requisite_courses_json=json.dumps(course.pre_requisite_courses),
+        )
+
+    @classmethod
+    def load_from_module_store(cls, course_id):
+        """
+        Load a CourseDescriptor, create a new CourseOverview from it, cache the
+        overview, replacing the current one if any, and return it.
+
+        Raises CourseOverview.DoesNotExist if the course doesn't exist or
+        didn't load (i.e. it is an ErrorDescriptor).
+        """
+        store = modulestore()
+        with store.bulk_operations(course_id):
+            course = store.get_course(course_id)
+
+        if not isinstance(course, CourseDescriptor):
+            log.error(
+                u"Could not create an overview of %s course %s",
+                "broken" if course else "non-existent",
+                course_id
+            )
+            raise cls.DoesNotExist()
+
+        return cls._save_from_course(course)
+
+    @classmethod
+    def _save_from_course(cls, course):
+        """
+        Create a CourseOverview from a CourseDescriptor, save it and return it.
+
+        As overviews are keyed by course id, saving it replaces the current
+        overview of the course in place.
+        """
+        course_overview = cls._create_from_course(course)
+        try:
+            course_overview.save()
+        except IntegrityError:
+            # Another request created the same overview in the meantime.
+            pass
+        return course_overview
+
+    @classmethod
+    def get_from_id(cls, course_id):
+        """
+        Load a CourseOverview object for a given course ID.
+
+        First, we try to load the CourseOverview from the database. If it
+        doesn't exist, we load the entire course from the modulestore,
+        create a CourseOverview object from it, and then cache it in the
+        database for future use.
+
+        Raises CourseOverview.DoesNotExist if the course specified by
+        course_id was not found or doesn't load.
+        """
+        try:
+            return cls.objects.get(id=course_id)
+        except cls.DoesNotExist:
+            return cls.load_from_module_store(course_id)
+
+    @classmethod
+    def get_from_ids(cls, course_ids):
+        """
+        Load the CourseOverview objects for the given course IDs with one query,
+        falling back to the modulestore for the ones which aren't cached yet.
+
+        Returns a dict of course ID -> CourseOverview, which doesn't include the
+        courses that weren't found or don't load.
+        """
+        course_ids = set(course_ids)
+        overviews = {overview.id: overview for overview in cls.objects.filter(id__in=course_ids)}
+        for course_id in course_ids.difference(overviews):
+            try:
+                overviews[course_id] = cls.load_from_module_store(course_id)
+            except cls.DoesNotExist:
+                pass
+        return overviews
+
+    @classmethod
+    def get_all_courses(cls, org=None):
+        """
+        Returns the overviews of all the courses, or of those of the given org.
+
+        Only the courses which have been published or loaded since the table was
+        backfilled are included. If the table is still empty, e.g. when the courses
+        were only loaded from XML since, the overviews of all the courses are
+        created from the modulestore.
+        """
+        overviews = list(cls.objects.all())
+        if not overviews:
+            overviews = [
+                cls._save_from_course(course)
+                for course in modulestore().get_courses()
+                if isinstance(course, CourseDescriptor)
+            ]
+        return [overview for overview in overviews if org is None or overview.id.org == org]
+
+    @property
+    def location(self):
+        """
+        Returns the UsageKey of the root of this course.
+        """
+        # deprecated usage keys don't serialize their run
+        if self._location.run is None:
+            self._location = self._location.map_into_course(self.id)
+        return self._location
+
+    @property
+    def number(self):
+        """
+        Returns this course's number.
+        """
+        return self.location.course
+
+    @property
+    def org(self):
+        """
+        Returns this course's org.
+        """
+        return self.location.org
+
+    @property
+    def url_name(self):
+        """
+        Returns this course's URL name.
+        """
+        return self.location.name
+
+    @property
+    def display_name_with_default(self):
+        """
+        Return a display name for the course: use display_name if defined,
+        otherwise convert the url name.
+        """
+        name = self.display_name
+        if name is None:
+            name = self.url_name.replace('_', ' ')
+        return name.replace('<', '&lt;').replace('>', '&gt;')
+
+    @property
+    def pre_requisite_courses(self):
+        """
+        Returns a list of the course key strings of the prerequisite courses.
+        """
+        return json.loads(self._pre_requisite_courses_json)
+
+    @property
+    def is_newish(self):
+        """
+        Returns if the course has been flagged as new, see CourseDescriptor.is_newish
+        """
+        return course_module.course_is_newish(self.is_new, self.start, self.advertised_start, self.announcement)
+
+    @property
+    def sorting_score(self):
+        """
+        Returns a number to sort courses by how "new" they are, see CourseDescriptor.sorting_score
+        """
+        return course_module.course_sorting_score(self.start, self.advertised_start, self.announcement)
+
+    @property
+    def start_date_is_still_default(self):
+        """
+        Checks if the start date set for the course is still default, i.e. .start has not been modified,
+        and .advertised_start has not been set.
+        """
+        return course_module.course_start_date_is_still_default(self.start, self.advertised_start)
+
+    def has_started(self):
+        """
+        Returns whether the current time is after the start date of the course.
+        """
+        return self.start is None or datetime.now(UTC()) > self.start
+
+    def has_ended(self):
+        """
+        Returns True if the current time is after the specified course end date.
+        Returns False if there is no end date specified.
+        """
+        return self.end is not None and datetime.now(UTC()) > self.end
+
+    def may_certify(self):
+        """
+        Return True if it is acceptable to show the student a certificate download link
+        """
+        show_early = (
+            self.certificates_display_behavior in ('early_with_info', 'early_no_info') or
+            self.certificates_show_before_end
+        )
+        return show_early or self.has_ended()
+
+    def start_datetime_text(self, format_string="SHORT_DATE"):
+        """
+        Returns the desired text corresponding the course's start date and time in UTC.  Prefers .advertised_start,
+        then falls back to .start
+        """
+        return course_module.course_start_datetime_text(
+            self.start, self.advertised_start, format_string, ugettext, strftime_localized
+        )
+
+    def end_datetime_text(self, format_string="SHORT_DATE"):
+        """
+        Returns the end date or date_time for the course formatted as a string.
+        """
+        return course_module.course_end_datetime_text(self.end, format_string, strftime_localized)
+
+
+# Signals must be imported in a file that is automatically loaded at app startup (e.g. models.py). We import them
+# at the end of this file to avoid circular dependencies.
+import signals  # pylint: disable=unused-import
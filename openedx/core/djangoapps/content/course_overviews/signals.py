@@ -0,0 +1,34 @@
+"""
+Signal handlers to keep the course overviews in sync with the modulestore.
+"""
+from django.dispatch.dispatcher import receiver
+
+from xmodule.modulestore.django import SignalHandler
+
+
+@receiver(SignalHandler.course_published)
+def listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Rebuilds the overview of the published course from the modulestore.
+
+    The new overview replaces the current one once it is built, so that the
+    course is never missing from the overviews meanwhile.
+    """
+    # Import here to avoid a circular import.
+    from .models import CourseOverview
+
+    try:
+        CourseOverview.load_from_module_store(course_key)
+    except CourseOverview.DoesNotExist:
+        # The course doesn't load, keep its current overview.
+        pass
+
+
+@receiver(SignalHandler.course_deleted)
+def listen_for_course_delete(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Deletes the overview of the deleted course.
+    """
+    from .models import CourseOverview
+
+    CourseOverview.objects.filter(id=course_key).delete()
@@ -0,0 +1,200 @@
+"""
+Tests for course_overviews app.
+"""
+import datetime
+
+import ddt
+from mock import patch
+import pytz
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, check_mongo_calls
+
+from .models import CourseOverview
+
+
+@ddt.ddt
+class CourseOverviewTestCase(ModuleStoreTestCase):
+    """
+    Tests for the CourseOverview model.
+    """
+
+    TODAY = datetime.datetime.now(pytz.UTC)
+    NEXT_WEEK = TODAY + datetime.timedelta(days=7)
+    LAST_WEEK = TODAY - datetime.timedelta(days=7)
+
+    # Attributes which are copied as they are from the course descriptor
+    COPIED_ATTRIBUTES = [
+        'id',
+        'location',
+        'display_name',
+        'display_name_with_default',
+        'display_number_with_default',
+        'display_org_with_default',
+        'start',
+        'end',
+        'advertised_start',
+        'announcement',
+        'enrollment_start',
+        'enrollment_end',
+        'enrollment_domain',
+        'invitation_only',
+        'end_of_course_survey_url',
+        'certificates_display_behavior',
+        'certificates_show_before_end',
+        'cert_name_short',
+        'cert_name_long',
+        'lowest_passing_grade',
+        'catalog_visibility',
+        'mobile_available',
+        'visible_to_staff_only',
+        'ispublic',
+        'days_early_for_beta',
+        'pre_requisite_courses',
+        'is_newish',
+        'sorting_score',
+        'start_date_is_still_default',
+        'number',
+        'org',
+        'url_name',
+    ]
+
+    # Methods which must return the same values for the course and its overview
+    COMPARED_METHODS = [
+        'has_started',
+        'has_ended',
+        'may_certify',
+        'start_datetime_text',
+        'end_datetime_text',
+    ]
+
+    def check_course_overview_against_course(self, course):
+        """
+        Compares a CourseOverview object against its corresponding
+        CourseDescriptor object, both as created and as loaded back from the
+        database.
+        """
+        course_overview_cache_miss = CourseOverview.get_from_id(course.id)
+        course_overview_cache_hit = CourseOverview.get_from_id(course.id)
+
+        for course_overview in (course_overview_cache_miss, course_overview_cache_hit):
+            for attribute_name in self.COPIED_ATTRIBUTES:
+                self.assertEqual(
+                    getattr(course, attribute_name),
+                    getattr(course_overview, attribute_name),
+                    attribute_name
+                )
+            for method_name in self.COMPARED_METHODS:
+                self.assertEqual(
+                    getattr(course, method_name)(),
+                    getattr(course_overview, method_name)(),
+                    method_name
+                )
+
+    @ddt.data(
+        {
+            'display_name': 'Test Course',
+            'start': LAST_WEEK,
+            'end': NEXT_WEEK,
+            'advertised_start': 'Very soon',
+            'is_new': True,
+            'certificates_display_behavior': 'end',
+            'mobile_available': True,
+            'days_early_for_beta': 3,
+        },
+        {
+            'display_name': None,
+            'start': NEXT_WEEK,
+            'end': None,
+            'is_new': False,
+            'certificates_show_before_end': True,
+            'visible_to_staff_only': True,
+            'catalog_visibility': 'none',
+        },
+    )
+    def test_course_overview_matches_course(self, course_kwargs):
+        for store_type in (ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split):
+            with self.store.default_store(store_type):
+                course = CourseFactory.create(**course_kwargs)
+                self.check_course_overview_against_course(course)
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_course_overview_updated_on_publish(self, modulestore_type):
+        with self.store.default_store(modulestore_type):
+            course = CourseFactory.create(display_name='Original Name')
+            self.assertEqual(CourseOverview.get_from_id(course.id).display_name, 'Original Name')
+
+            course.display_name = 'Updated Name'
+            self.store.update_item(course, self.user.id)
+            self.store.publish(course.location, self.user.id)
+
+            with check_mongo_calls(0):
+                self.assertEqual(CourseOverview.get_from_id(course.id).display_name, 'Updated Name')
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_course_overview_kept_if_rebuild_fails(self, modulestore_type):
+        with self.store.default_store(modulestore_type):
+            course = CourseFactory.create(display_name='Original Name')
+            CourseOverview.get_from_id(course.id)
+
+            course.display_name = 'Updated Name'
+            with patch.object(CourseOverview, '_create_from_course', side_effect=Exception("Can't build it")):
+                self.store.update_item(course, self.user.id)
+                self.store.publish(course.location, self.user.id)
+
+            # The course is still listed, with its last overview
+            self.assertEqual([overview.id for overview in CourseOverview.get_all_courses()], [course.id])
+            self.assertEqual(CourseOverview.get_from_id(course.id).display_name, 'Original Name')
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_course_overview_deleted_with_course(self, modulestore_type):
+        with self.store.default_store(modulestore_type):
+            course = CourseFactory.create()
+            CourseOverview.get_from_id(course.id)
+
+            self.store.delete_course(course.id, self.user.id)
+
+            self.assertFalse(CourseOverview.objects.filter(id=course.id).exists())
+            with self.assertRaises(CourseOverview.DoesNotExist):
+                CourseOverview.get_from_id(course.id)
+
+    def test_get_from_ids(self):
+        courses = [CourseFactory.create() for __ in range(3)]
+        # Only keep the overview of the first course
+        CourseOverview.objects.exclude(id=courses[0].id).delete()
+        missing_course_key = courses[0].id.replace(run='missing')
+
+        overviews = CourseOverview.get_from_ids([course.id for course in courses] + [missing_course_key])
+
+        self.assertEqual(set(overviews), set(course.id for course in courses))
+        for course in courses:
+            self.assertEqual(overviews[course.id].location, course.location)
+        self.assertEqual(CourseOverview.objects.count(), 3)
+
+    def test_get_all_courses(self):
+        org_courses = [CourseFactory.create(org='TestOrg') for __ in range(2)]
+        other_course = CourseFactory.create(org='OtherOrg')
+        for course in org_courses + [other_course]:
+            CourseOverview.get_from_id(course.id)
+
+        self.assertEqual(
+            set(overview.id for overview in CourseOverview.get_all_courses(org='TestOrg')),
+            set(course.id for course in org_courses)
+        )
+        self.assertEqual(len(CourseOverview.get_all_courses()), 3)
+
+    def test_get_all_courses_before_backfill(self):
+        courses = [CourseFactory.create(org=org) for org in ('TestOrg', 'OtherOrg')]
+        CourseOverview.objects.all().delete()
+
+        self.assertEqual([overview.id for overview in CourseOverview.get_all_courses(org='TestOrg')], [courses[0].id])
+        # the overviews of all the courses were created
+        self.assertEqual(CourseOverview.objects.count(), 2)
+
+    def test_cached_overview_does_not_hit_modulestore(self):
+        course = CourseFactory.create()
+        CourseOverview.get_from_id(course.id)
+
+        with check_mongo_calls(0):
+            CourseOverview.get_from_id(course.id)